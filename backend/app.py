@@ -4,31 +4,40 @@ import os
 # If a local venv exists at backend/venv, re-exec this script with that Python interpreter.
 # This makes `python app.py` work even when the system Python doesn't have the project's
 # dependencies installed (fixes ModuleNotFoundError for packages like flask_cors).
-venv_python = os.path.join(os.path.dirname(__file__), 'venv', 'Scripts', 'python.exe')
-try:
-    if os.path.exists(venv_python):
-        venv_python_abs = os.path.abspath(venv_python)
-        current_python_abs = os.path.abspath(sys.executable)
-        # Compare case-insensitively on Windows
-        if current_python_abs.lower() != venv_python_abs.lower():
-            os.execv(venv_python_abs, [venv_python_abs] + sys.argv)
-except Exception:
-    # If anything goes wrong with re-exec, fall back to current interpreter and let imports fail
-    pass
-
-from flask import Flask, jsonify, request
+# Only for direct runs on Windows: imports by gunicorn/updater.py must not re-exec the process.
+if __name__ == '__main__' and os.name == 'nt':
+    venv_python = os.path.join(os.path.dirname(__file__), 'venv', 'Scripts', 'python.exe')
+    try:
+        if os.path.exists(venv_python):
+            venv_python_abs = os.path.abspath(venv_python)
+            current_python_abs = os.path.abspath(sys.executable)
+            # Compare case-insensitively on Windows
+            if current_python_abs.lower() != venv_python_abs.lower():
+                os.execv(venv_python_abs, [venv_python_abs] + sys.argv)
+    except Exception:
+        # If anything goes wrong with re-exec, fall back to current interpreter and let imports fail
+        pass
+
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from services.yahoo_finance import YahooFinanceService
 from apscheduler.schedulers.background import BackgroundScheduler
 import json
 import os
-from datetime import datetime
-from services.analytics import fetch_adjusted_close, compute_log_returns, compute_correlation_matrix, rmt_denoise_correlation, compute_momentum, compute_rsi, compute_annualized_volatility
+from datetime import datetime, timedelta
+from services.analytics import fetch_adjusted_close, compute_log_returns, compute_correlation_matrix, rmt_denoise_correlation, compute_momentum, compute_rsi, compute_annualized_volatility, sentiment_adjusted_correlation
+from services import news as news_service
 from services.news import fetch_news_for_tickers
+from services import sentiment as finbert
 from services.sentiment import analyze_texts
+from services import article_store, backtest, eigen_cache, encoding, governor, indicators, lazy_imports, leader, metrics, price_panel, profiling, risk, screener, tail_risk
+from services.analysis import ANALYZE_SECTIONS, PRICE_SECTIONS, Analysis, parse_fields, ticker_sentiment
+from services.result_cache import cached_result
+from services.singleflight import coalesce
 from dotenv import load_dotenv
 import numpy as np
 import pandas as pd
+import time
 # volatility_model may be intentionally removed in some distributions (placeholder removed).
 # Import it if available; otherwise provide safe placeholders and a flag so endpoints can
 # return informative errors instead of crashing the whole server during import.
@@ -46,27 +55,16 @@ except Exception as e:
     load_model = _missing
     predict_from_recent = _missing
 from services.analytics import marchenko_pastur_bounds
-ARCH_AVAILABLE = True
-STATS_AVAILABLE = True
-try:
-    from arch import arch_model
-    print("[OK] arch package imported successfully")
-except Exception as _e:
-    ARCH_AVAILABLE = False
-    print(f"[WARNING] arch import failed: {_e}")
-    def arch_model(*args, **kwargs):
-        raise ImportError('arch package not installed or importable')
-
-try:
-    from statsmodels.tsa.arima.model import ARIMA
-    STATS_AVAILABLE = True
-    print("[OK] statsmodels ARIMA imported successfully")
-except Exception as _e:
-    STATS_AVAILABLE = False
-    print(f"[WARNING] statsmodels import failed: {_e}")
-    class ARIMA:
-        def __init__(self, *a, **k):
-            raise ImportError('statsmodels not installed or importable')
+# arch and statsmodels (with scipy) dominate import time; they are probed here and only
+# imported when a GARCH/ARIMA endpoint first needs them (see services/lazy_imports.py)
+ARCH_AVAILABLE = lazy_imports.available('arch')
+STATS_AVAILABLE = lazy_imports.available('statsmodels')
+if not ARCH_AVAILABLE:
+    print("[WARNING] arch package not installed; GARCH endpoints disabled")
+if not STATS_AVAILABLE:
+    print("[WARNING] statsmodels not installed; ARIMA endpoints disabled")
+if os.getenv('PRELOAD_HEAVY_IMPORTS', '0') == '1':
+    lazy_imports.preload(['arch', 'statsmodels.tsa.arima.model'])
 
 load_dotenv()
 app = Flask(__name__)
@@ -88,60 +86,243 @@ cache = {
 
 def load_cache_from_file():
     """Load cache from file if exists"""
-    global cache
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, 'r') as f:
-                cache = json.load(f)
-            print("Cache loaded from file")
-        except Exception as e:
-            print(f"Error loading cache: {e}")
+    global cache, _snapshot_mtime
+    snapshot, mtime = leader.read_snapshot_if_changed(CACHE_FILE, None)
+    if snapshot is not None:
+        cache = snapshot
+        _snapshot_mtime = mtime
+        print("Cache loaded from file")
 
 def save_cache_to_file():
-    """Save cache to file"""
+    """Save cache to file (atomically, as a new snapshot version)"""
+    global _snapshot_mtime
     try:
-        os.makedirs(CACHE_DIR, exist_ok=True)
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(cache, f, indent=2)
+        leader.write_snapshot(CACHE_FILE, cache)
+        _snapshot_mtime = os.stat(CACHE_FILE).st_mtime_ns
         print("Cache saved to file")
     except Exception as e:
         print(f"Error saving cache: {e}")
 
 def update_cache():
     """Fetch fresh data and update cache"""
+    with metrics.stage('update_cache'):
+        _update_cache()
+
+def _update_cache():
     global cache
+    if governor.circuit_open(finance_service.provider.name):
+        # Upstream is failing; keep serving the last good snapshot instead of hammering it
+        print(f"[WARNING] [{datetime.now()}] Upstream circuit open, keeping cached stock data")
+        return
     print(f"[{datetime.now()}] Updating stock data...")
     
     try:
-        # Fetch all stocks
-        cache['stocks'] = finance_service.get_all_stocks()
+        # Build the new snapshot aside so readers never see a half-updated cache
+        fresh = dict(cache)
+
+        # Fetch all stocks; symbols that failed (throttled, circuit opened mid-run) keep their last quote
+        stocks = finance_service.get_all_stocks()
+        fetched = {s.get('symbol') for s in stocks}
+        stocks += [s for s in cache.get('stocks', []) if s.get('symbol') not in fetched]
+        order = {symbol: i for i, symbol in enumerate(finance_service.stocks)}
+        fresh['stocks'] = sorted(stocks, key=lambda s: order.get(s.get('symbol'), len(order)))
         
         # Fetch both indices (Nifty 50 and Sensex)
-        cache['indices'] = finance_service.get_all_indices()
+        indices = finance_service.get_all_indices()
+        fresh['indices'] = {k: v if v is not None else cache.get('indices', {}).get(k) for k, v in indices.items()}
         
         # Update timestamp
-        cache['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        fresh['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # Latest trading session in the quotes; the price panel serves open-ended requests only while it has it
+        fresh['session'] = max((s['lastTradeDate'] for s in fresh['stocks'] if s.get('lastTradeDate')),
+                               default=cache.get('session'))
+        cache = fresh
         
         # Save to file
         save_cache_to_file()
+        request_panel_for_session(fresh['session'])
         
         print(f"[OK] Cache updated successfully! ({len(cache['stocks'])} stocks + 2 indices)")
         
     except Exception as e:
         print(f"[ERR] Error updating cache: {e}")
 
-# Load existing cache on startup
-load_cache_from_file()
-
-# Update cache immediately on startup
-update_cache()
-
-# Schedule automatic updates every 15 minutes
+def scheduled_job(name, func):
+    """Wrap a scheduler job so each run records its duration and outcome"""
+    def run():
+        start = time.perf_counter()
+        outcome = 'success'
+        try:
+            func()
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            metrics.observe('scheduler_job_duration_seconds', time.perf_counter() - start, job=name)
+            metrics.inc('scheduler_job_runs_total', job=name, outcome=outcome)
+    return run
+
+def ingest_articles():
+    """Fetch, filter and score headlines for the universe into the local article store"""
+    if not news_service.configured():
+        return
+    stats = article_store.ingest(finance_service.stocks)
+    print(f"[OK] Article store: {stats['new']} new of {stats['fetched']} relevant articles, {stats['scored']} scored"
+          f" ({stats['skipped']} tickers left for later passes)")
+
+def refresh_price_panel():
+    """Rebuild the shared memory-mapped adjusted-close panel for the whole universe, then its indicators"""
+    version = price_panel.build(finance_service.stocks + finance_service.indices, years=finance_service.historical_years)
+    panel = price_panel.current_panel() if version and indicators.enabled() else None
+    if panel is not None:
+        indicators.refresh(panel.frame(panel.symbols), panel_version=panel.version)
+
+_panel_session_requested = None
+
+def request_panel_for_session(session):
+    """Leader: rebuild the price panel now (once per session) when the quotes reached a session it lacks"""
+    global _panel_session_requested
+    if not price_panel.enabled() or not session or session == _panel_session_requested:
+        return
+    panel = price_panel.current_panel()
+    if panel is not None and panel.is_current():
+        return
+    job = scheduler.get_job('refresh_price_panel')
+    if job is not None:
+        _panel_session_requested = session
+        job.modify(next_run_time=datetime.now())
+
+# ==================== BACKGROUND JOBS ====================
+# Only the leader process talks to upstream providers; followers reload its snapshots.
+
+_snapshot_mtime = None
+_leader_active = False
+leader_lock = leader.LeaderLock(os.path.join(CACHE_DIR, 'updater.lock'))
+REFRESH_REQUEST_FILE = os.path.join(CACHE_DIR, 'refresh.request')
 scheduler = BackgroundScheduler()
-scheduler.add_job(func=update_cache, trigger="interval", minutes=15)
-scheduler.start()
 
-print("[INFO] Stock data updater scheduled (every 15 minutes)")
+def is_leader():
+    return _leader_active
+
+def become_leader():
+    """Start the upstream refresh jobs in this process"""
+    global _leader_active
+    _leader_active = True
+    print(f"[INFO] Process {os.getpid()} is the data updater (leader)")
+    # First update runs in the background as soon as the scheduler starts (startup serves the
+    # file snapshot meanwhile), then every 15 minutes
+    scheduler.add_job(func=scheduled_job('update_cache', update_cache), trigger="interval", minutes=15,
+                      next_run_time=datetime.now(), id='update_cache', replace_existing=True)
+    if price_panel.enabled():
+        # First build runs in the background right away, then every few hours
+        scheduler.add_job(func=scheduled_job('refresh_price_panel', refresh_price_panel), trigger="interval",
+                          hours=int(os.getenv('PRICE_PANEL_REFRESH_HOURS', '6')), next_run_time=datetime.now(),
+                          id='refresh_price_panel', replace_existing=True)
+    if article_store.enabled():
+        scheduler.add_job(func=scheduled_job('ingest_articles', ingest_articles), trigger="interval",
+                          minutes=article_store.INGEST_MINUTES, next_run_time=datetime.now(),
+                          id='ingest_articles', replace_existing=True)
+
+def sync_snapshot():
+    """Follower: reload a newer snapshot, and take over if the leader has gone away"""
+    global cache, _snapshot_mtime
+    if is_leader():
+        if os.path.exists(REFRESH_REQUEST_FILE):
+            try:
+                os.remove(REFRESH_REQUEST_FILE)
+            except OSError:
+                pass
+            update_cache()
+        return
+    if leader.updater_mode() == 'auto' and leader_lock.try_acquire():
+        become_leader()
+        return
+    snapshot, mtime = leader.read_snapshot_if_changed(CACHE_FILE, _snapshot_mtime)
+    if snapshot is not None:
+        cache = snapshot
+        _snapshot_mtime = mtime
+        print(f"[INFO] Loaded snapshot version {snapshot.get('version')}")
+
+def start_background_jobs():
+    mode = leader.updater_mode()
+    if mode == 'leader':
+        # Best effort, so that 'auto' processes sharing the cache dir stay followers
+        leader_lock.try_acquire()
+        become_leader()
+    elif mode == 'auto' and leader_lock.try_acquire():
+        become_leader()
+    else:
+        print(f"[INFO] Process {os.getpid()} follows the data updater (mode: {mode})")
+    scheduler.add_job(func=scheduled_job('sync_snapshot', sync_snapshot), trigger="interval",
+                      seconds=int(os.getenv('SNAPSHOT_POLL_SECONDS', '5')), id='sync_snapshot')
+    scheduler.start()
+    print("[INFO] Stock data updater scheduled (every 15 minutes)")
+
+# Load existing cache on startup
+load_cache_from_file()
+start_background_jobs()
+# Load FinBERT off the request path (no-op if the gunicorn master already loaded it before forking)
+if finbert.preload_mode() != 'off':
+    finbert.preload()
+
+# ==================== REQUEST METRICS ====================
+
+def _debug_requested():
+    if request.args.get('debug') in ('1', 'true'):
+        return True
+    if request.method == 'POST':
+        body = request.get_json(force=True, silent=True)
+        return isinstance(body, dict) and bool(body.get('debug'))
+    return False
+
+@app.before_request
+def _start_request_timer():
+    request.environ['metrics.start'] = time.perf_counter()
+    metrics.begin_request_timings()
+    # Admin-only single-request profile: ?profile=1 (store) or ?profile=inline (return report)
+    if profiling.profiling_requested(request.args.get('profile'), request.headers.get('X-Admin-Token')):
+        request.environ['profiling.profiler'] = profiling.start()
+
+@app.after_request
+def _record_request_metrics(response):
+    start = request.environ.get('metrics.start')
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    # Label by URL rule (not raw path) to keep label cardinality bounded
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.observe('http_request_duration_seconds', elapsed,
+                    method=request.method, route=route, status=response.status_code)
+
+    timings = metrics.end_request_timings()
+    if timings:
+        response.headers['Server-Timing'] = metrics.server_timing_header(timings + [('total', elapsed)])
+        if response.is_json and _debug_requested():
+            data = response.get_json(silent=True)
+            if isinstance(data, dict):
+                data['timings'] = {name: round(sec * 1000.0, 2) for name, sec in timings + [('total', elapsed)]}
+                response.set_data(json.dumps(data))
+
+    profiler = request.environ.pop('profiling.profiler', None)
+    if profiler is not None:
+        path, report = profiling.finish(profiler, route)
+        response.headers['X-Profile-Path'] = path
+        if request.args.get('profile') == 'inline':
+            response = Response(report, mimetype='text/plain', headers={'X-Profile-Path': path})
+    return response
+
+def _provisional(response):
+    """Mark a response built on placeholder sentiment so HTTP and result caches do not keep it."""
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def _sentiment_tier(body, key='sentiment_tier'):
+    """Requested sentiment tier ('auto' unless given); ValueError for unknown tiers."""
+    tier = str(body.get(key) or 'auto').lower()
+    if tier not in finbert.TIERS:
+        raise ValueError(f"{key} must be one of {', '.join(finbert.TIERS)}")
+    return tier
 
 # ==================== API ROUTES ====================
 
@@ -162,13 +343,20 @@ def home():
             '/api/prices': 'Get adjusted close and log returns for tickers',
             '/api/correlations': 'Compute correlation matrix from returns',
             '/api/rmt': 'Denoise correlation matrix using RMT',
-            '/api/news': 'Fetch recent news via NewsAPI',
-            '/api/sentiment': 'Run FinBERT sentiment on texts',
+            '/api/news': 'Recent news per ticker (local article store, else NewsAPI/MediaStack/Twitter); query= searches stored articles',
+            '/api/sentiment': 'Score sentiment of texts (FinBERT or lexicon tier)',
             '/api/sentiment-adjusted-corr': 'Adjust correlations with sentiment',
             '/api/predict': 'Simple momentum+sentiment predictions',
+            '/api/backtest': 'Backtest the prediction rule over history (with parameter sweeps)',
+            '/api/indicators': 'Full-series technical indicators (SMA, EMA, RSI, MACD, Bollinger, ATR, momentum)',
+            '/api/screener': 'Screen the universe on indicator and quote fields (e.g. "rsi_14 < 30 and volatility < 25%")',
+            '/api/portfolio_var': 'Monte Carlo portfolio VaR/ES from the RMT-denoised correlation',
+            '/api/tail_risk': 'Rolling historical VaR/ES per symbol (tickers or the whole universe)',
             '/api/refresh': 'Refresh data manually',
             '/api/health': 'Health check',
-            '/api/stats': 'Get statistics'
+            '/api/ready': 'Readiness probe (503 while FinBERT is loading)',
+            '/api/stats': 'Get statistics',
+            '/api/metrics': 'Prometheus metrics (latency, upstream calls, cache hits)'
         }
     })
 
@@ -181,9 +369,30 @@ def health():
         'stocksCount': len(cache['stocks']),
         'indicesCount': 2,
         'hasNifty50': bool(cache['indices'].get('nifty50')),
-        'hasSensex': bool(cache['indices'].get('sensex'))
+        'hasSensex': bool(cache['indices'].get('sensex')),
+        'role': 'leader' if is_leader() else 'follower',
+        'snapshotVersion': cache.get('version'),
+        'upstreamCircuit': 'open' if governor.circuit_open(finance_service.provider.name) else 'closed',
+        'sentimentModel': finbert.status()
     })
 
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 503 while FinBERT is still loading, so load balancers hold traffic back"""
+    state = finbert.status()
+    if state == 'loading':
+        response = jsonify({'ready': False, 'sentimentModel': state})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    # 'failed'/'idle' still serve (sentiment falls back to the returns proxy)
+    return jsonify({'ready': True, 'sentimentModel': state})
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of request, stage, upstream and cache metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/stocks', methods=['GET'])
 def get_stocks():
     """Get all stocks data"""
@@ -311,6 +520,16 @@ def get_historical(symbol):
 def refresh_data():
     """Manually refresh stock data"""
     try:
+        if not is_leader():
+            # Followers never fetch; ask the updater process to refresh on its next poll
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(REFRESH_REQUEST_FILE, 'w') as f:
+                f.write(datetime.now().isoformat())
+            return jsonify({
+                'success': True,
+                'message': 'Refresh requested from the data updater process',
+                'lastUpdate': cache['last_update']
+            }), 202
         update_cache()
         return jsonify({
             'success': True,
@@ -360,20 +579,23 @@ def api_prices():
     if not isinstance(tickers, list) or len(tickers) < 1:
         return jsonify({'success': False, 'message': 'tickers must be a non-empty list'}), 400
     try:
-        adj = fetch_adjusted_close(tickers, start=start, end=end)
-        rets = compute_log_returns(adj)
-        return jsonify({
-            'success': True,
-            'tickers': list(adj.columns),
-            'dates': [d.strftime('%Y-%m-%d') for d in adj.index],
-            'prices': {t: adj[t].dropna().round(6).tolist() for t in adj.columns},
-            'returns': {t: rets[t].dropna().round(8).tolist() for t in rets.columns}
-        })
+        precision = encoding.requested_precision()
+        fields = parse_fields(dict(request.args.to_dict(), **body), PRICE_SECTIONS)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    try:
+        analysis = Analysis(tickers, start=start, end=end, precision=precision)
+        payload = analysis.payload(fields)
+        payload['tickers'] = list(analysis.adj.columns)
+        # JSON (orjson), MessagePack or Arrow per Accept, compressed per Accept-Encoding
+        return encoding.respond(payload, table=lambda: analysis.price_table(fields), table_keys=PRICE_SECTIONS)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
 @app.route('/api/correlations', methods=['POST'])
+@cached_result(defaults={'tickers': [], 'start': None, 'end': None})
+@coalesce
 def api_correlations():
     body = request.get_json(force=True, silent=True) or {}
     tickers = body.get('tickers') or []
@@ -383,8 +605,10 @@ def api_correlations():
         return jsonify({'success': False, 'message': 'tickers must be a list of at least 2'}), 400
     try:
         adj = fetch_adjusted_close(tickers, start=start, end=end)
-        rets = compute_log_returns(adj)
-        corr = compute_correlation_matrix(rets)
+        with metrics.stage('returns'):
+            rets = compute_log_returns(adj)
+        with metrics.stage('correlation'):
+            corr = compute_correlation_matrix(rets)
         return jsonify({
             'success': True,
             'tickers': list(corr.columns),
@@ -395,6 +619,7 @@ def api_correlations():
 
 
 @app.route('/api/rmt', methods=['POST'])
+@cached_result(market_data=False)
 def api_rmt():
     body = request.get_json(force=True, silent=True) or {}
     matrix = body.get('correlation')
@@ -406,7 +631,8 @@ def api_rmt():
         import numpy as np
         import pandas as pd
         corr_df = pd.DataFrame(np.array(matrix))
-        result = rmt_denoise_correlation(corr_df, int(T))
+        with metrics.stage('rmt'):
+            result = rmt_denoise_correlation(corr_df, int(T))
         return jsonify({
             'success': True,
             'eigenvalues': result['eigenvalues_sorted'],
@@ -423,9 +649,19 @@ def api_news():
     body = request.get_json(force=True, silent=True) or {}
     tickers = body.get('tickers') or []
     lookback_days = int(body.get('lookback_days', 7))
+    query = (body.get('query') or '').strip()
     if not isinstance(tickers, list) or len(tickers) < 1:
         return jsonify({'success': False, 'message': 'tickers must be a non-empty list'}), 400
     try:
+        if query:
+            if not article_store.enabled():
+                return jsonify({'success': False, 'message': 'article store disabled; query search unavailable'}), 501
+            news = {t: [] for t in tickers}
+            for article in article_store.search(query, tickers, lookback_days=lookback_days):
+                news[article.pop('ticker')].append(article)
+            return jsonify({'success': True, 'news': news, 'source': 'store'})
+        if article_store.covers(tickers, lookback_days):
+            return jsonify({'success': True, 'news': article_store.articles(tickers, lookback_days), 'source': 'store'})
         news = fetch_news_for_tickers(tickers, lookback_days=lookback_days)
         return jsonify({'success': True, 'news': news})
     except Exception as e:
@@ -439,7 +675,19 @@ def api_sentiment():
     if not isinstance(texts, list) or len(texts) < 1:
         return jsonify({'success': False, 'message': 'texts must be a non-empty list'}), 400
     try:
-        results = analyze_texts(texts)
+        tier = _sentiment_tier(body, 'tier')
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if tier != 'lexicon' and not finbert.is_ready():
+        finbert.preload()
+        # Only an explicit FinBERT request waits for the model; 'auto' gets lexicon scores meanwhile
+        if tier == 'finbert' and finbert.status() != 'failed':
+            response = jsonify({'success': False, 'message': 'Sentiment model is loading, retry shortly'})
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+    try:
+        results = analyze_texts(texts, tier=tier)
         return jsonify({'success': True, 'results': results})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -455,66 +703,56 @@ def api_sentiment_adjusted_corr():
     alpha = float(body.get('alpha', 0.3))
     if not isinstance(tickers, list) or len(tickers) < 2:
         return jsonify({'success': False, 'message': 'tickers must be a list of at least 2'}), 400
+    try:
+        tier = _sentiment_tier(body)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     try:
         # Raw corr
         adj = fetch_adjusted_close(tickers, start=start, end=end)
-        rets = compute_log_returns(adj)
-        corr = compute_correlation_matrix(rets)
+        with metrics.stage('returns'):
+            rets = compute_log_returns(adj)
+        with metrics.stage('correlation'):
+            corr = compute_correlation_matrix(rets)
 
-        # News per ticker (graceful fallback on provider failure)
-        try:
-            news = fetch_news_for_tickers(tickers, lookback_days=lookback_days)
-        except Exception:
-            news = {t: [] for t in tickers}
-
-        # Sentiment per ticker from their headlines
-        per_ticker_sent = {}
-        per_ticker_examples = {}
-        for t in tickers:
-            headlines = [n['title'] for n in news.get(t, []) if n.get('title')]
-            if not headlines:
-                # Fallback: proxy sentiment from recent returns if no headlines found
-                try:
-                    look = max(1, min(lookback_days, rets.shape[0]))
-                    mean_ret = float(rets[t].dropna().tail(look).mean()) if t in rets.columns else 0.0
-                    proxy = float(np.tanh(mean_ret * 10.0) * 0.5)
-                    per_ticker_sent[t] = proxy
-                    per_ticker_examples[t] = []
-                except Exception:
-                    per_ticker_sent[t] = 0.0
-                    per_ticker_examples[t] = []
-                continue
-            sentiments = analyze_texts(headlines)
-            avg = float(np.mean([s['score'] for s in sentiments])) if sentiments else 0.0
-            per_ticker_sent[t] = avg
-            per_ticker_examples[t] = news.get(t, [])[:3]
+        # Headline sentiment per ticker (returns proxy when there are no headlines)
+        per_ticker_sent, per_ticker_examples, pending, used_tier = ticker_sentiment(tickers, lookback_days,
+                                                                                    returns=rets, tier=tier)
 
         # Adjust correlations
-        corr_mat = corr.values.astype(float)
-        adjusted = corr_mat.copy()
-        for i, ti in enumerate(corr.columns):
-            for j, tj in enumerate(corr.columns):
-                adj_factor = 1.0 + alpha * (per_ticker_sent.get(ti, 0.0) + per_ticker_sent.get(tj, 0.0)) / 2.0
-                adjusted[i, j] = float(np.clip(corr_mat[i, j] * adj_factor, -1.0, 1.0))
+        with metrics.stage('adjusted_correlation'):
+            adjusted = sentiment_adjusted_correlation(corr, per_ticker_sent, alpha)
 
-        return jsonify({
+        payload = {
             'success': True,
             'tickers': list(corr.columns),
             'raw': corr.round(6).values.tolist(),
             'adjusted': np.round(adjusted, 6).tolist(),
             'sentiment': per_ticker_sent,
             'examples': per_ticker_examples
-        })
+        }
+        if used_tier:
+            payload['sentiment_tier'] = used_tier
+        if pending:
+            payload['sentiment_model'] = 'loading'
+            return _provisional(jsonify(payload))
+        return jsonify(payload)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
 @app.route('/api/analyze', methods=['POST'])
+@cached_result(defaults={'tickers': [], 'start': None, 'end': None, 'lookback_days': 7, 'alpha': 0.3, 'use_news': True,
+                         'sentiment_tier': 'auto'},
+               unordered=('fields', 'include'))
+@coalesce
 def api_analyze():
     """
     One-shot analysis endpoint combining prices, returns, correlations, RMT,
     news+sentiment, adjusted correlation, and predictions.
     Returns the unified JSON structure requested by the frontend.
+    `fields` (or `include`) limits the response to the named sections; only
+    those and their dependencies are computed.
     """
     body = request.get_json(force=True, silent=True) or {}
     tickers = body.get('tickers') or []
@@ -526,136 +764,25 @@ def api_analyze():
     if not isinstance(tickers, list) or len(tickers) < 2:
         return jsonify({'success': False, 'message': 'tickers must be a list of at least 2'}), 400
     try:
-        # Prices and returns
-        adj = fetch_adjusted_close(tickers, start=start, end=end)
-        rets = compute_log_returns(adj)
-        prices = {t: adj[t].dropna().round(6).tolist() for t in adj.columns}
-        returns = {t: rets[t].dropna().round(8).tolist() for t in rets.columns}
-        dates = [d.strftime('%Y-%m-%d') for d in adj.index]
-
-        # Correlations
-        corr_df = compute_correlation_matrix(rets)
-        corr_raw = corr_df.round(6).values.tolist()
-        corr_tickers = list(corr_df.columns)
-
-        # RMT
-        T = rets.shape[0]
-        rmt = rmt_denoise_correlation(corr_df, T)
-        rmt_payload = {
-            'eigenvalues': rmt['eigenvalues_sorted'],
-            'lambda_min': rmt['lambda_min'],
-            'lambda_max': rmt['lambda_max'],
-            'denoised': rmt['denoised_correlation'].round(6).values.tolist(),
-        }
-
-        # Compute RSI and volatility for predictions
-        try:
-            rsi = compute_rsi(adj, period=14)
-        except Exception:
-            rsi = pd.Series(index=adj.columns, dtype=float)
-        try:
-            vol = compute_annualized_volatility(rets)
-        except Exception:
-            vol = pd.Series(index=rets.columns, dtype=float)
-
-        # News + sentiment
-        per_ticker_sent = {t: 0.0 for t in tickers}
-        per_ticker_examples = {t: [] for t in tickers}
-        if use_news:
-            try:
-                news = fetch_news_for_tickers(tickers, lookback_days=lookback_days)
-                for t in tickers:
-                    heads = [n['title'] for n in news.get(t, []) if n.get('title')]
-                    if not heads:
-                        # fallback: proxy sentiment from recent returns when no headlines
-                        try:
-                            look = max(1, min(lookback_days, rets.shape[0]))
-                            mean_ret = float(rets[t].dropna().tail(look).mean()) if t in rets.columns else 0.0
-                            per_ticker_sent[t] = float(np.tanh(mean_ret * 10.0) * 0.5)
-                            per_ticker_examples[t] = []
-                        except Exception:
-                            per_ticker_sent[t] = 0.0
-                            per_ticker_examples[t] = []
-                        continue
-                    sentiments = analyze_texts(heads)
-                    per_ticker_sent[t] = float(np.mean([s['score'] for s in sentiments])) if sentiments else 0.0
-                    per_ticker_examples[t] = news.get(t, [])[:3]
-            except Exception:
-                # news provider failed entirely — keep zero sentiments as fallback
-                pass
-
-        # Adjusted correlation
-        corr_mat = corr_df.values.astype(float)
-        adjusted = corr_mat.copy()
-        for i, ti in enumerate(corr_df.columns):
-            for j, tj in enumerate(corr_df.columns):
-                adj_factor = 1.0 + alpha * (per_ticker_sent.get(ti, 0.0) + per_ticker_sent.get(tj, 0.0)) / 2.0
-                adjusted[i, j] = float(np.clip(corr_mat[i, j] * adj_factor, -1.0, 1.0))
-
-        # Predictions (inline logic from api_predict)
-        mom = compute_momentum(adj, window_days=7)
-        predictions = {}
-        for t in tickers:
-            s = per_ticker_sent.get(t, 0.0)
-            m = float(mom.get(t, 0.0)) if t in mom.index else 0.0
-            try:
-                r = float(rsi.loc[t]) if t in rsi.index else float('nan')
-            except Exception:
-                r = float('nan')
-            try:
-                v = float(vol.loc[t]) if t in vol.index else float('nan')
-            except Exception:
-                v = float('nan')
-            likely_up = (m > 0) and (np.isnan(r) or r < 70) and ((s > 0.2) if use_news else True)
-            likely_down = (m < 0) and (np.isnan(r) or r > 30) and ((s < -0.2) if use_news else True)
-            if likely_up:
-                label = 'Likely Up'
-            elif likely_down:
-                label = 'Likely Down'
-            else:
-                label = 'Uncertain'
-            predictions[t] = {
-                'sentiment': s,
-                'momentum_7d': m,
-                'rsi_14': r,
-                'vol_annualized': v,
-                'prediction': label
-            }
-
-        payload = {
-            'success': True,
-            'tickers': tickers,
-            'prices': prices,
-            'returns': returns,
-            'dates': dates,
-            'correlations': {
-                'tickers': corr_tickers,
-                'raw': corr_raw
-            },
-            'rmt': rmt_payload,
-            'sentiment': per_ticker_sent,
-            'adjusted_correlation': {
-                'tickers': corr_tickers,
-                'raw': corr_raw,
-                'adjusted': np.round(adjusted, 6).tolist(),
-                'examples': per_ticker_examples
-            },
-            'predictions': predictions
-        }
-        # include model info if available
-        try:
-            metrics_path = os.path.join(os.path.dirname(__file__), 'models', 'volatility_metrics.json')
-            if os.path.exists(metrics_path):
-                with open(metrics_path, 'r') as mf:
-                    payload['model_info'] = json.load(mf)
-        except Exception:
-            pass
-        return jsonify(payload)
+        precision = encoding.requested_precision()
+        fields = parse_fields(dict(request.args.to_dict(), **body), ANALYZE_SECTIONS)
+        tier = _sentiment_tier(body)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    try:
+        analysis = Analysis(tickers, start=start, end=end, lookback_days=lookback_days,
+                            alpha=alpha, use_news=use_news, precision=precision, sentiment_tier=tier)
+        payload = analysis.payload(fields)
+        response = encoding.respond(payload, table=lambda: analysis.price_table(fields), table_keys=PRICE_SECTIONS)
+        return _provisional(response) if analysis.sentiment_pending else response
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
 @app.route('/api/predict', methods=['POST'])
+@cached_result(defaults={'tickers': [], 'start': None, 'end': None, 'lookback_days': 7, 'use_news': True,
+                         'sentiment_tier': 'auto'},
+               unordered=('tickers',))
 def api_predict():
     body = request.get_json(force=True, silent=True) or {}
     tickers = body.get('tickers') or []
@@ -665,24 +792,24 @@ def api_predict():
     use_news = bool(body.get('use_news', True))
     if not isinstance(tickers, list) or len(tickers) < 1:
         return jsonify({'success': False, 'message': 'tickers must be a non-empty list'}), 400
+    try:
+        tier = _sentiment_tier(body)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     try:
         adj = fetch_adjusted_close(tickers, start=start, end=end)
-        mom = compute_momentum(adj, window_days=7)
-        rets = compute_log_returns(adj)
-        rsi = compute_rsi(adj, period=14)
-        vol = compute_annualized_volatility(rets)
+        with metrics.stage('indicators'):
+            mom = compute_momentum(adj, window_days=7)
+            rets = compute_log_returns(adj)
+            rsi = compute_rsi(adj, period=14)
+            vol = compute_annualized_volatility(rets)
 
         # sentiment per ticker (optional + graceful fallback)
         sent_avg = {t: 0.0 for t in tickers}
+        pending = False
+        used_tier = None
         if use_news:
-            try:
-                news = fetch_news_for_tickers(tickers, lookback_days=lookback_days)
-                for t in tickers:
-                    heads = [n['title'] for n in news.get(t, []) if n.get('title')]
-                    sentiments = analyze_texts(heads) if heads else []
-                    sent_avg[t] = float(np.mean([s['score'] for s in sentiments])) if sentiments else 0.0
-            except Exception:
-                pass
+            sent_avg, _, pending, used_tier = ticker_sentiment(tickers, lookback_days, tier=tier)
 
         predictions = {}
         for t in tickers:
@@ -699,15 +826,8 @@ def api_predict():
                     r = float('nan')
             v = float(vol.get(t, float('nan'))) if hasattr(vol, 'get') else (float(vol.loc[t]) if t in vol.index else float('nan'))
 
-            likely_up = (m > 0) and (np.isnan(r) or r < 70) and ((s > 0.2) if use_news else True)
-            likely_down = (m < 0) and (np.isnan(r) or r > 30) and ((s < -0.2) if use_news else True)
-
-            if likely_up:
-                label = 'Likely Up'
-            elif likely_down:
-                label = 'Likely Down'
-            else:
-                label = 'Uncertain'
+            # Same rule /api/backtest evaluates historically
+            label = backtest.LABELS[int(backtest.classify(m, r, s if use_news else None, backtest.DEFAULT_PARAMS))]
             predictions[t] = {
                 'sentiment': s,
                 'momentum_7d': m,
@@ -716,7 +836,278 @@ def api_predict():
                 'prediction': label
             }
 
-        return jsonify({'success': True, 'predictions': predictions})
+        payload = {'success': True, 'predictions': predictions}
+        if used_tier:
+            payload['sentiment_tier'] = used_tier
+        if pending:
+            payload['sentiment_model'] = 'loading'
+            return _provisional(jsonify(payload))
+        return jsonify(payload)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@app.route('/api/backtest', methods=['POST'])
+@cached_result(defaults={'tickers': [], 'start': None, 'end': None, 'sentiment': 'none', 'objective': 'hit_rate',
+                         'folds': 0, 'top': 20, 'per_ticker': False},
+               unordered=('tickers',))
+@coalesce
+def api_backtest():
+    """
+    Walk-forward backtest of the /api/predict rule over every date and ticker.
+    Rule parameters (momentum_window, rsi_period, rsi_upper, rsi_lower,
+    sentiment_threshold, sentiment_lookback, horizon) default to the live
+    rule; `sweep` maps parameter names to lists of values to try, and
+    `folds` >= 2 adds a walk-forward selection of the swept parameters.
+    """
+    body = request.get_json(force=True, silent=True) or {}
+    tickers = body.get('tickers') or []
+    start = body.get('start')
+    end = body.get('end')
+    sentiment = str(body.get('sentiment') or 'none').lower()
+    objective = str(body.get('objective') or 'hit_rate').lower()
+    grid = body.get('sweep')
+    if not isinstance(tickers, list) or len(tickers) < 1:
+        return jsonify({'success': False, 'message': 'tickers must be a non-empty list'}), 400
+    if sentiment not in backtest.SENTIMENT_SOURCES:
+        return jsonify({'success': False,
+                        'message': f"sentiment must be one of {', '.join(backtest.SENTIMENT_SOURCES)}"}), 400
+    if grid is not None and not isinstance(grid, dict):
+        return jsonify({'success': False, 'message': 'sweep must map parameter names to lists of values'}), 400
+    try:
+        params = backtest.parse_params(body)
+        combos = backtest.parse_grid(grid, params) if grid else None
+        folds = int(body.get('folds', 0))
+        top = int(body.get('top', 20))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    try:
+        adj = fetch_adjusted_close(tickers, start=start, end=end)
+        result = backtest.evaluate(adj, params, sentiment=sentiment, per_ticker=bool(body.get('per_ticker', False)))
+        payload = {'success': True, 'tickers': list(adj.columns), 'sentiment': sentiment, 'result': result}
+        if combos:
+            swept = backtest.sweep(adj, combos, sentiment=sentiment, objective=objective, folds=folds)
+            swept['results'] = swept['results'][:max(1, top)]
+            payload['sweep'] = swept
+        return jsonify(payload)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@app.route('/api/indicators', methods=['POST'])
+@cached_result(defaults={'tickers': [], 'indicators': None, 'start': None, 'end': None, 'latest': False},
+               unordered=('tickers', 'indicators'))
+@coalesce
+def api_indicators():
+    """
+    Full series of technical indicators per ticker. Served from the indicators
+    the leader publishes after each price panel build when they cover the
+    request, otherwise computed from the tickers' adjusted closes.
+    `latest: true` returns only the last value of each series.
+    """
+    body = request.get_json(force=True, silent=True) or {}
+    tickers = body.get('tickers') or []
+    start = body.get('start')
+    end = body.get('end')
+    names = body.get('indicators') or list(indicators.NAMES)
+    if isinstance(names, str):
+        names = [n.strip() for n in names.split(',') if n.strip()]
+    if not isinstance(tickers, list) or len(tickers) < 1:
+        return jsonify({'success': False, 'message': 'tickers must be a non-empty list'}), 400
+    if not isinstance(names, list) or any(n not in indicators.NAMES for n in names):
+        return jsonify({'success': False,
+                        'message': f"indicators must be drawn from {', '.join(indicators.NAMES)}"}), 400
+    try:
+        published = indicators.current() if indicators.enabled() else None
+        if published is not None and published.covers(tickers, start, end):
+            frames = published.frames(names, tickers, start, end)
+            source = 'published'
+        else:
+            frames = indicators.compute(fetch_adjusted_close(tickers, start=start, end=end), names)
+            source = 'computed'
+        index = next(iter(frames.values())).index
+        payload = {'success': True, 'tickers': list(next(iter(frames.values())).columns), 'source': source}
+        if body.get('latest'):
+            payload['date'] = index[-1].strftime('%Y-%m-%d') if len(index) else None
+            payload['latest'] = {t: {n: (None if np.isnan(v) else round(float(v), 6))
+                                     for n, v in ((n, f[t].iloc[-1] if len(f) else np.nan) for n, f in frames.items())}
+                                 for t in payload['tickers']}
+            return encoding.respond(payload)
+        payload['dates'] = [d.strftime('%Y-%m-%d') for d in index]
+        # Leading values are undefined until each lookback fills, so keep positions (null) rather than dropping them
+        payload['indicators'] = {n: {t: encoding.aligned_values(f[t], 6) for t in f.columns}
+                                 for n, f in frames.items()}
+
+        def table():
+            parts = [f.add_prefix(f'{n}:') for n, f in frames.items()]
+            out = pd.concat(parts, axis=1)
+            out.index = out.index.rename('date')
+            return out
+        return encoding.respond(payload, table=table, table_keys=('indicators', 'dates'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+def _screener_table():
+    """Screener table for the stock universe, rebuilt when the panel, indicators or quote snapshot change"""
+    panel = price_panel.current_panel() if price_panel.enabled() else None
+    published = indicators.current() if indicators.enabled() else None
+    snapshot = cache
+    key = (panel.version if panel else None, published.version if published else None, snapshot.get('last_update'))
+
+    def load():
+        symbols = finance_service.stocks
+        if panel is not None:
+            prices = panel.frame([s for s in symbols if s in panel.symbols])
+        else:
+            start = (datetime.now() - timedelta(days=2 * 365)).strftime('%Y-%m-%d')
+            prices = fetch_adjusted_close(symbols, start=start)
+        return screener.build(prices, snapshot.get('stocks', []), published)
+    return screener.current(key, load)
+
+
+@app.route('/api/screener', methods=['POST'])
+def api_screener():
+    """
+    Stocks passing every filter of `where` ("rsi_14 < 30 and momentum_7 > 0
+    and volatility < 25%", or a list of {field, op, value}), optionally
+    sorted by a field and limited. Answered from a per-refresh columnar
+    table with a sorted index per field.
+    """
+    body = request.get_json(force=True, silent=True) or {}
+    sort = body.get('sort')
+    order = str(body.get('order') or 'asc').lower()
+    fields = body.get('fields')
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+    try:
+        predicates = screener.parse(body.get('where', body.get('filters')))
+        limit = int(body.get('limit', 50))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if sort is not None and sort not in screener.FIELDS:
+        return jsonify({'success': False, 'message': f"unknown sort field '{sort}'"}), 400
+    if order not in ('asc', 'desc'):
+        return jsonify({'success': False, 'message': 'order must be asc or desc'}), 400
+    if fields is not None and (not isinstance(fields, list) or any(f not in screener.FIELDS for f in fields)):
+        return jsonify({'success': False, 'message': f"fields must be drawn from {', '.join(screener.FIELDS)}"}), 400
+    try:
+        table = _screener_table()
+        with metrics.stage('screen'):
+            result = table.screen(predicates, sort=sort, descending=order == 'desc', limit=limit, fields=fields)
+        return jsonify({'success': True, 'as_of': table.as_of, 'where': [p.as_dict() for p in predicates], **result})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+# Ticker order stays in the cache key: list weights are positional and the order fixes the Cholesky factor
+@app.route('/api/portfolio_var', methods=['POST'])
+@cached_result(defaults={'tickers': [], 'weights': None, 'start': None, 'end': None, 'levels': None,
+                         'paths': risk.DEFAULT_PATHS, 'horizon': 1, 'window': risk.DEFAULT_WINDOW,
+                         'volatility': 'historical', 'correlation': 'denoised', 'distribution': 'normal', 'df': 5,
+                         'seed': 0, 'value': 1.0})
+@coalesce
+def api_portfolio_var():
+    """
+    Monte Carlo VaR and Expected Shortfall of a portfolio of `tickers`
+    (`weights` map or list, default equal weights) at each of `levels`,
+    simulated from the RMT-denoised correlation and per-asset volatilities
+    ('historical', 'ewma' or 'garch' one-day forecasts) of the last `window` days.
+    """
+    body = request.get_json(force=True, silent=True) or {}
+    tickers = body.get('tickers') or []
+    start = body.get('start')
+    end = body.get('end')
+    volatility = str(body.get('volatility') or 'historical').lower()
+    corr_kind = str(body.get('correlation') or 'denoised').lower()
+    distribution = str(body.get('distribution') or 'normal').lower()
+    if not isinstance(tickers, list) or len(tickers) < 1:
+        return jsonify({'success': False, 'message': 'tickers must be a non-empty list'}), 400
+    if volatility not in risk.VOLATILITY_MODELS:
+        return jsonify({'success': False,
+                        'message': f"volatility must be one of {', '.join(risk.VOLATILITY_MODELS)}"}), 400
+    if corr_kind not in risk.CORRELATIONS:
+        return jsonify({'success': False, 'message': f"correlation must be one of {', '.join(risk.CORRELATIONS)}"}), 400
+    if volatility == 'garch' and not ARCH_AVAILABLE:
+        return jsonify({'success': False, 'message': 'arch package not installed on server; garch volatility disabled'}), 501
+    try:
+        levels = risk.parse_levels(body.get('levels'))
+        paths = int(body['paths']) if body.get('paths') is not None else None
+        horizon = int(body.get('horizon', 1))
+        window = int(body.get('window', risk.DEFAULT_WINDOW))
+        df = float(body.get('df', 5))
+        seed = int(body.get('seed', 0))
+        value = float(body.get('value', 1.0))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    try:
+        adj = fetch_adjusted_close(tickers, start=start, end=end)
+        missing = [t for t in tickers if t not in adj.columns]
+        if missing:
+            return jsonify({'success': False, 'message': f"No price data for {', '.join(missing)}"}), 404
+        result = risk.portfolio_var(adj[tickers], weights=body.get('weights'), levels=levels, paths=paths,
+                                    horizon=horizon, window=window, volatility=volatility, corr_kind=corr_kind,
+                                    distribution=distribution, df=df, seed=seed, value=value)
+        return jsonify({'success': True, **result})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except ImportError as e:
+        return jsonify({'success': False, 'message': f'{e}; garch volatility disabled'}), 501
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@app.route('/api/tail_risk', methods=['POST'])
+@cached_result(defaults={'tickers': [], 'universe': False, 'start': None, 'end': None, 'window': tail_risk.DEFAULT_WINDOW,
+                         'levels': None, 'min_periods': None, 'latest': False},
+               unordered=('tickers',))
+@coalesce
+def api_tail_risk():
+    """
+    Rolling historical VaR and Expected Shortfall of daily returns over
+    `window` days for `tickers` (or every stock with `universe: true`), with
+    each symbol's latest values and VaR breach rate. `latest: true` leaves
+    out the series.
+    """
+    body = request.get_json(force=True, silent=True) or {}
+    tickers = list(finance_service.stocks) if body.get('universe') else body.get('tickers') or []
+    start = body.get('start')
+    end = body.get('end')
+    if not isinstance(tickers, list) or len(tickers) < 1:
+        return jsonify({'success': False, 'message': 'tickers must be a non-empty list (or set universe: true)'}), 400
+    try:
+        levels = tail_risk.parse_levels(body.get('levels'))
+        window = int(body.get('window', tail_risk.DEFAULT_WINDOW))
+        min_periods = int(body['min_periods']) if body.get('min_periods') is not None else None
+        if not 20 <= window <= tail_risk.MAX_WINDOW:
+            raise ValueError(f'window must be between 20 and {tail_risk.MAX_WINDOW}')
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    try:
+        adj = fetch_adjusted_close(tickers, start=start, end=end)
+        result = tail_risk.tail_risk(adj, window=window, levels=levels, min_periods=min_periods)
+        payload = {'success': True, 'tickers': list(adj.columns), 'window': window, 'levels': result['levels'],
+                   'latest': result['latest']}
+        if body.get('latest'):
+            return encoding.respond(payload)
+        frames = result['frames']
+        payload['dates'] = [d.strftime('%Y-%m-%d') for d in result['index']]
+        for measure in ('var', 'es'):
+            payload[measure] = {level: {t: encoding.aligned_values(f[t], 6) for t in f.columns}
+                                for level, f in frames[measure].items()}
+
+        def table():
+            out = pd.concat([f.add_prefix(f'{measure}_{level}:') for measure in ('var', 'es')
+                             for level, f in frames[measure].items()], axis=1)
+            out.index = out.index.rename('date')
+            return out
+        return encoding.respond(payload, table=table, table_keys=('var', 'es', 'dates'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -761,6 +1152,7 @@ def api_eigen_timeseries():
     start = body.get('start')
     end = body.get('end')
     window = int(body.get('window', 60))
+    include_spectrum = bool(body.get('spectrum', False))
 
     if not isinstance(tickers, list) or len(tickers) < 2:
         return jsonify({'success': False, 'message': 'tickers must be a list of at least 2'}), 400
@@ -768,31 +1160,23 @@ def api_eigen_timeseries():
     try:
         adj = fetch_adjusted_close(tickers, start=start, end=end)
         rets = compute_log_returns(adj)
-        dates = rets.index
-        lambda1_series = []
-        lambda2_series = []
-        spreads = []
-        out_dates = []
-        for i in range(window, len(dates)):
-            window_rets = rets.iloc[i - window: i]
-            if window_rets.shape[0] < 2:
-                continue
-            corr = compute_correlation_matrix(window_rets)
-            eigvals = np.linalg.eigvalsh(corr.values)
-            eig_sorted = np.sort(eigvals)[::-1]
-            l1 = float(eig_sorted[0])
-            l2 = float(eig_sorted[1]) if len(eig_sorted) > 1 else 0.0
-            lambda1_series.append(l1)
-            lambda2_series.append(l2)
-            spreads.append(l1 - l2)
-            out_dates.append(dates[i].strftime('%Y-%m-%d'))
+        # Windows already computed for this (universe, window) are read from cache/eigen
+        with metrics.stage('eigen_windows'):
+            result = eigen_cache.rolling_spectrum(rets, window)
+        lambda1_series, lambda2_series = result['lambda1'], result['lambda2']
+        spreads = [l1 - l2 for l1, l2 in zip(lambda1_series, lambda2_series)]
+        out_dates = [d.strftime('%Y-%m-%d') for d in result['dates']]
 
         # compute mp bounds using T=window, N=len(tickers)
         T = window
         N = len(tickers)
         lambda_min, lambda_max = marchenko_pastur_bounds(T=T, N=N)
 
-        return jsonify({'success': True, 'dates': out_dates, 'lambda1': lambda1_series, 'lambda2': lambda2_series, 'spread': spreads, 'lambda_min': lambda_min, 'lambda_max': lambda_max})
+        payload = {'success': True, 'dates': out_dates, 'lambda1': lambda1_series, 'lambda2': lambda2_series, 'spread': spreads, 'lambda_min': lambda_min, 'lambda_max': lambda_max, 'computedWindows': result['computed']}
+        if include_spectrum:
+            spectrum = result['spectrum']
+            payload['spectrum'] = spectrum.tolist() if spectrum is not None else None
+        return jsonify(payload)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -801,8 +1185,7 @@ def api_eigen_timeseries():
 def api_warmup_sentiment():
     """Warm-up FinBERT pipeline to reduce latency on first real request."""
     try:
-        from services.sentiment import _load_pipeline
-        _load_pipeline()
+        finbert.load()
         return jsonify({'success': True, 'message': 'FinBERT warmup complete'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -841,6 +1224,7 @@ def api_predict_volatility():
 
 
 @app.route('/api/garch_volatility', methods=['GET'])
+@coalesce
 def api_garch_volatility():
     """Compute GARCH(1,1) conditional volatility and 1-step forecast for a single symbol.
     Query params: symbol (required), start (optional), end (optional)
@@ -852,6 +1236,10 @@ def api_garch_volatility():
         return jsonify({'success': False, 'message': 'symbol query parameter is required'}), 400
     if not ARCH_AVAILABLE:
         return jsonify({'success': False, 'message': 'arch package not installed on server; garch_volatility disabled'}), 501
+    try:
+        arch_model = lazy_imports.load('arch', 'arch_model')
+    except ImportError as e:
+        return jsonify({'success': False, 'message': f'{e}; garch_volatility disabled'}), 501
     try:
         # fetch adjusted close for single symbol
         adj = fetch_adjusted_close([symbol], start=start, end=end)
@@ -865,8 +1253,9 @@ def api_garch_volatility():
             return jsonify({'success': False, 'message': 'Not enough data to fit GARCH (need at least 10 observations)'}), 400
 
         # fit GARCH(1,1)
-        am = arch_model(series * 100.0, vol='GARCH', p=1, q=1)  # scale to percent to improve numeric stability
-        res = am.fit(disp='off')
+        with metrics.stage('garch_fit'):
+            am = arch_model(series * 100.0, vol='GARCH', p=1, q=1)  # scale to percent to improve numeric stability
+            res = am.fit(disp='off')
 
         # conditional volatility (in percent) -- arch returns vol in same units as series
         sigma_t = res.conditional_volatility.tolist()
@@ -933,6 +1322,7 @@ def api_garch_volatility():
 
 
 @app.route('/api/hybrid_forecast', methods=['GET'])
+@cached_result(defaults={'symbol': None, 'start': None, 'end': None, 'p': 1, 'd': 0, 'q': 1})
 def api_hybrid_forecast():
     """Hybrid ARIMA (mean) + GARCH(1,1) (volatility) forecast for next day.
     Query params: symbol (required), start (optional), end (optional), p,d,q (optional ARIMA order)
@@ -954,6 +1344,11 @@ def api_hybrid_forecast():
         return jsonify({'success': False, 'message': 'statsmodels not installed on server; ARIMA is unavailable'}), 501
     if not ARCH_AVAILABLE:
         return jsonify({'success': False, 'message': 'arch package not installed on server; GARCH is unavailable'}), 501
+    try:
+        ARIMA = lazy_imports.load('statsmodels.tsa.arima.model', 'ARIMA')
+        arch_model = lazy_imports.load('arch', 'arch_model')
+    except ImportError as e:
+        return jsonify({'success': False, 'message': f'{e}; hybrid forecast is unavailable'}), 501
 
     try:
         # Fetch adjusted close for single symbol
@@ -969,8 +1364,9 @@ def api_hybrid_forecast():
 
         # ---------------------- ARIMA (mean forecast) ----------------------
         try:
-            arima_model = ARIMA(series, order=(p, d, q))
-            arima_res = arima_model.fit()
+            with metrics.stage('arima_fit'):
+                arima_model = ARIMA(series, order=(p, d, q))
+                arima_res = arima_model.fit()
             arima_fore = arima_res.forecast(steps=1)
             arima_pred = float(arima_fore.iloc[0]) if hasattr(arima_fore, 'iloc') else float(arima_fore[0])
             try:
@@ -983,8 +1379,9 @@ def api_hybrid_forecast():
         # ---------------------- GARCH (volatility forecast) ----------------------
         try:
             # scale returns to percent for numeric stability (consistent with garch endpoint)
-            am = arch_model(series * 100.0, vol='GARCH', p=1, q=1)
-            garch_res = am.fit(disp='off')
+            with metrics.stage('garch_fit'):
+                am = arch_model(series * 100.0, vol='GARCH', p=1, q=1)
+                garch_res = am.fit(disp='off')
 
             sigma_t = garch_res.conditional_volatility.tolist()  # percent units
             forecast = garch_res.forecast(horizon=1)
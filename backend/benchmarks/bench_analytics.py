@@ -0,0 +1,257 @@
+"""
+Micro-benchmarks for the analytics kernels over an (N, T) grid.
+
+Runs on synthetic return panels (no network), appends every run to
+benchmarks/results/history.jsonl and compares against a saved baseline.
+Exits with status 1 when any kernel is slower than baseline by more than
+--threshold (default 25%).
+
+Usage (from backend/):
+    python -m benchmarks.bench_analytics                    # quick grid, compare to baseline
+    python -m benchmarks.bench_analytics --grid full        # N in 10..1000, T in 250..5000
+    python -m benchmarks.bench_analytics --save-baseline    # record current run as baseline
+    python -m benchmarks.bench_analytics --kernels correlation,rmt --n 50,200 --t 1000
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.analytics import (  # noqa: E402
+    compute_correlation_matrix,
+    compute_log_returns,
+    compute_rsi,
+    rmt_denoise_correlation,
+    sentiment_adjusted_correlation,
+)
+from services import eigen_cache  # noqa: E402
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+HISTORY_FILE = os.path.join(RESULTS_DIR, 'history.jsonl')
+BASELINE_FILE = os.path.join(RESULTS_DIR, 'baseline.json')
+
+GRIDS = {
+    'quick': ([10, 50, 200], [250, 1000]),
+    'full': ([10, 50, 200, 500, 1000], [250, 1000, 2500, 5000]),
+}
+
+EIGEN_WINDOW = 60
+
+
+def synthetic_panel(n: int, t: int, seed: int = 7, ragged: float = 0.2) -> pd.DataFrame:
+    """Adjusted-close panel from a one-factor model; `ragged` share of names list late."""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0003, 0.01, size=(t, 1))
+    beta = rng.uniform(0.5, 1.5, size=(1, n))
+    rets = market * beta + rng.normal(0.0, 0.015, size=(t, n))
+    prices = 100.0 * np.exp(np.cumsum(rets, axis=0))
+    late = rng.random(n) < ragged
+    starts = rng.integers(0, max(1, t // 2), size=n)
+    for j in np.flatnonzero(late):
+        prices[:starts[j], j] = np.nan
+    index = pd.bdate_range('2005-01-03', periods=t)
+    columns = [f'SYM{j:04d}.NS' for j in range(n)]
+    return pd.DataFrame(prices, index=index, columns=columns)
+
+
+# name -> (max N, max T, builder). builder(adj) returns the zero-arg callable to time.
+# Limits keep the quadratic / per-window kernels from dominating the full grid.
+def _kernels() -> Dict[str, Tuple[int, int, Callable[[pd.DataFrame], Callable[[], object]]]]:
+    def log_returns(adj):
+        return lambda: compute_log_returns(adj)
+
+    def correlation(adj):
+        rets = compute_log_returns(adj)
+        return lambda: compute_correlation_matrix(rets)
+
+    def rmt(adj):
+        rets = compute_log_returns(adj)
+        corr = compute_correlation_matrix(rets).fillna(0.0)
+        return lambda: rmt_denoise_correlation(corr, rets.shape[0])
+
+    def rsi(adj):
+        return lambda: compute_rsi(adj, period=14)
+
+    def _eigen_returns(adj):
+        # Windows over late-listing names yield NaN correlations, which eigvalsh rejects
+        return compute_log_returns(synthetic_panel(adj.shape[1], adj.shape[0], ragged=0.0))
+
+    def _eigen_dir():
+        directory = tempfile.mkdtemp(prefix='bench-eigen-')
+        atexit.register(shutil.rmtree, directory, True)
+        return directory
+
+    def eigen_cold(adj):
+        # Every window computed: an empty cache directory and no decoded entries in memory
+        rets, directory = _eigen_returns(adj), _eigen_dir()
+
+        def cold():
+            shutil.rmtree(directory, ignore_errors=True)
+            eigen_cache.clear_memory()
+            return eigen_cache.rolling_spectrum(rets, EIGEN_WINDOW, directory=directory)
+        return cold
+
+    def eigen_warm(adj):
+        # Every window cached, as for a repeated /api/eigen-timeseries request
+        rets, directory = _eigen_returns(adj), _eigen_dir()
+        eigen_cache.rolling_spectrum(rets, EIGEN_WINDOW, directory=directory)
+        return lambda: eigen_cache.rolling_spectrum(rets, EIGEN_WINDOW, directory=directory)
+
+    def sentiment_adjust(adj):
+        corr = compute_correlation_matrix(compute_log_returns(adj))
+        rng = np.random.default_rng(0)
+        sentiment = {t: float(s) for t, s in zip(corr.columns, rng.uniform(-1, 1, corr.shape[0]))}
+        return lambda: sentiment_adjusted_correlation(corr, sentiment, 0.3)
+
+    return {
+        'log_returns': (1000, 5000, log_returns),
+        'correlation': (1000, 5000, correlation),
+        'rmt': (1000, 5000, rmt),
+        'rsi': (1000, 5000, rsi),
+        'eigen_cold': (200, 1000, eigen_cold),
+        'eigen_warm': (200, 1000, eigen_warm),
+        'sentiment_adjust': (500, 5000, sentiment_adjust),
+    }
+
+
+def time_callable(fn: Callable[[], object], repeat: int, min_time: float = 0.05) -> Dict[str, float]:
+    """Best-of-`repeat` per-call timing; loops each sample until it lasts at least `min_time`."""
+    fn()  # warm-up (allocations, lazy imports)
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1000:
+            break
+        loops *= 2
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+    return {'min': min(samples), 'median': float(np.median(samples)), 'loops': loops}
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def run(kernels: List[str], ns: List[int], ts: List[int], repeat: int) -> Dict[str, Dict[str, float]]:
+    registry = _kernels()
+    results: Dict[str, Dict[str, float]] = {}
+    for t in ts:
+        for n in ns:
+            adj = synthetic_panel(n, t)
+            for name in kernels:
+                max_n, max_t, build = registry[name]
+                if n > max_n or t > max_t:
+                    continue
+                key = f'{name}|N={n}|T={t}'
+                stats = time_callable(build(adj), repeat)
+                results[key] = stats
+                print(f"  {key:<36} min {stats['min'] * 1000:10.3f} ms   median {stats['median'] * 1000:10.3f} ms")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    regressions = []
+    print("\nComparison against baseline (min times):")
+    for key, stats in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        ratio = stats['min'] / base['min'] if base['min'] > 0 else float('inf')
+        flag = ''
+        if ratio > 1.0 + threshold:
+            flag = '  <-- REGRESSION'
+            regressions.append(key)
+        print(f"  {key:<36} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--grid', choices=sorted(GRIDS), default='quick')
+    parser.add_argument('--n', help='comma-separated N values (overrides --grid)')
+    parser.add_argument('--t', help='comma-separated T values (overrides --grid)')
+    parser.add_argument('--kernels', help='comma-separated subset of: ' + ','.join(_kernels()))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown vs baseline (0.25 = 25%%)')
+    parser.add_argument('--save-baseline', action='store_true', help='write this run as the new baseline')
+    parser.add_argument('--no-history', action='store_true', help='do not append this run to history.jsonl')
+    args = parser.parse_args(argv)
+
+    ns, ts = GRIDS[args.grid]
+    if args.n:
+        ns = [int(x) for x in args.n.split(',')]
+    if args.t:
+        ts = [int(x) for x in args.t.split(',')]
+    kernels = args.kernels.split(',') if args.kernels else list(_kernels())
+    unknown = [k for k in kernels if k not in _kernels()]
+    if unknown:
+        parser.error(f"unknown kernels: {', '.join(unknown)}")
+
+    print("=" * 60)
+    print(f"Analytics micro-benchmarks  N={ns}  T={ts}")
+    print("=" * 60)
+    results = run(kernels, ns, ts, args.repeat)
+
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.platform(),
+        'results': results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    if not args.no_history:
+        with open(HISTORY_FILE, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(record, f, indent=2)
+        print(f"\n[OK] Baseline saved to {BASELINE_FILE}")
+        return 0
+
+    if not os.path.exists(BASELINE_FILE):
+        print("\n[INFO] No baseline yet; run with --save-baseline to create one")
+        return 0
+
+    with open(BASELINE_FILE, 'r') as f:
+        baseline = json.load(f).get('results', {})
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n[ERR] {len(regressions)} kernel(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    print("\n[OK] No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Cold-start benchmark for the API process.
+
+Imports `app` in fresh interpreters (as a gunicorn worker or updater would),
+times the import and the first request, and reports per-package import cost
+from `python -X importtime`. Runs start as UPDATER_MODE=follower so no
+upstream calls are made. Every run is appended to
+benchmarks/results/startup_history.jsonl; with --budget the script exits 1
+when the median import time exceeds it.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup                  # 5 cold starts, top 15 packages
+    python -m benchmarks.bench_startup --repeat 10 --top 30
+    python -m benchmarks.bench_startup --budget 1.5     # fail if `import app` takes > 1.5 s
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.bench_analytics import RESULTS_DIR, _git_revision
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_FILE = os.path.join(RESULTS_DIR, 'startup_history.jsonl')
+
+# Runs in the child interpreter; prints one JSON line with its timings
+_CHILD = """
+import json, time
+start = time.perf_counter()
+import {module} as target
+imported = time.perf_counter()
+response = target.app.test_client().get('/api/health')
+done = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'first_request': done - imported, 'status': response.status_code}}))
+"""
+
+
+def cold_start(module: str) -> Tuple[Dict[str, float], str]:
+    """One fresh-interpreter import of `module`; returns (timings, -X importtime report)."""
+    env = dict(os.environ, UPDATER_MODE='follower')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', _CHILD.format(module=module)],
+                          cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=300)
+    if proc.returncode != 0:
+        raise RuntimeError(f'import {module} failed:\n{proc.stderr[-2000:]}')
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    return timings, proc.stderr
+
+
+def parse_importtime(report: str) -> List[Tuple[str, float, float]]:
+    """(module, self seconds, cumulative seconds) for each line of an -X importtime report."""
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            rows.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+        except ValueError:
+            continue
+    return rows
+
+
+def by_package(rows: List[Tuple[str, float, float]]) -> Dict[str, float]:
+    """Self import time summed per top-level package (so nested imports are not double counted)."""
+    totals: Dict[str, float] = defaultdict(float)
+    for name, self_s, _ in rows:
+        totals[name.split('.')[0]] += self_s
+    return dict(totals)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app', help='module exposing the Flask `app` (default: app)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='packages to list')
+    parser.add_argument('--budget', type=float, help='max median import seconds before exiting 1')
+    parser.add_argument('--no-history', action='store_true', help='do not append this run to startup_history.jsonl')
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print(f"Cold start of `{args.module}`  ({args.repeat} fresh interpreters)")
+    print("=" * 60)
+    runs, packages = [], defaultdict(list)
+    for i in range(args.repeat):
+        timings, report = cold_start(args.module)
+        runs.append(timings)
+        for name, seconds in by_package(parse_importtime(report)).items():
+            packages[name].append(seconds)
+        print(f"  run {i + 1}: import {timings['import'] * 1000:8.1f} ms   "
+              f"first request {timings['first_request'] * 1000:7.1f} ms")
+
+    import_median = float(np.median([r['import'] for r in runs]))
+    request_median = float(np.median([r['first_request'] for r in runs]))
+    package_medians = {name: float(np.median(v)) for name, v in packages.items()}
+    ranked = sorted(package_medians.items(), key=lambda kv: kv[1], reverse=True)
+
+    print(f"\n  median import {import_median * 1000:.1f} ms, first request {request_median * 1000:.1f} ms")
+    print(f"\nImport cost by package (median self time, top {args.top}):")
+    for name, seconds in ranked[:args.top]:
+        print(f"  {name:<28} {seconds * 1000:9.1f} ms")
+
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'module': args.module,
+        'import_seconds': import_median,
+        'first_request_seconds': request_median,
+        'packages': dict(ranked[:50]),
+    }
+    if not args.no_history:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(HISTORY_FILE, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    if args.budget is not None and import_median > args.budget:
+        print(f"\n[ERR] Median import {import_median:.2f}s exceeds budget {args.budget:.2f}s")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""
+Shared fixtures for the offline tests (synthetic data only: no market data,
+network access or API keys), runnable from backend/ or the repository root:
+
+    python -m pytest -q backend/test_risk.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.bench_analytics import synthetic_panel  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def synthetic_prices():
+    """
+    benchmarks.bench_analytics.synthetic_panel(n, t, seed=7, ragged=0.2), the
+    one-factor adjusted-close panel (SYMnnnn.NS columns) the benchmarks time,
+    for tests and module fixtures that need their own panel sizes.
+    """
+    return synthetic_panel
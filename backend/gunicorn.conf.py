@@ -0,0 +1,29 @@
+# Gunicorn settings for multi-worker deployments:
+#     gunicorn -c gunicorn.conf.py app:app
+# Workers elect a single data updater among themselves (UPDATER_MODE=auto), or run
+# `python updater.py` separately and start the workers with UPDATER_MODE=follower.
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = 120
+
+# Each worker imports the app itself so its scheduler threads and leader lock belong to it
+preload_app = False
+
+
+def on_starting(server):
+    """SENTIMENT_PRELOAD=fork: load FinBERT in the master so workers share its weights copy-on-write"""
+    if os.getenv('SENTIMENT_PRELOAD', 'background').lower() != 'fork':
+        return
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from services import sentiment
+    try:
+        sentiment.load()
+        server.log.info("FinBERT loaded in master; workers will share it")
+    except Exception as e:
+        # Workers fall back to loading it themselves in the background
+        server.log.warning(f"FinBERT preload in master failed: {e}")
@@ -0,0 +1,237 @@
+"""
+Drive a realistic traffic mix against the API and report latency/throughput.
+
+By default the driver spawns `loadtest.server` (stubbed upstreams) and tears it
+down afterwards; pass --url to target an already running server instead.
+
+Usage (from backend/):
+    python -m loadtest.driver --concurrency 16 --duration 60
+    python -m loadtest.driver --url http://127.0.0.1:5000 --mix stocks=5,historical=2,analyze=1,garch=2
+    python -m loadtest.driver --concurrency 32 --duration 30 --json report.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.news import TICKER_QUERY_MAP  # noqa: E402
+
+
+UNIVERSE = sorted(TICKER_QUERY_MAP)
+DEFAULT_MIX = {'stocks': 40, 'historical': 25, 'analyze': 15, 'garch': 20}
+HISTORICAL_PERIODS = ['1mo', '6mo', '1y', '5y']
+
+# name -> builder(rng) returning (method, path, json body or None)
+RequestSpec = Tuple[str, str, Optional[dict]]
+
+
+def _stocks(rng: random.Random) -> RequestSpec:
+    return 'GET', '/api/stocks', None
+
+
+def _historical(rng: random.Random) -> RequestSpec:
+    return 'GET', f"/api/historical/{rng.choice(UNIVERSE)}?period={rng.choice(HISTORICAL_PERIODS)}", None
+
+
+def _analyze(rng: random.Random) -> RequestSpec:
+    tickers = rng.sample(UNIVERSE, rng.choice([3, 5, 10]))
+    start = rng.choice(['2023-01-01', '2024-01-01', '2025-01-01'])
+    return 'POST', '/api/analyze', {'tickers': tickers, 'start': start, 'lookback_days': 7}
+
+
+def _garch(rng: random.Random) -> RequestSpec:
+    return 'GET', f"/api/garch_volatility?symbol={rng.choice(UNIVERSE)}&start=2022-01-01", None
+
+
+SCENARIOS: Dict[str, Callable[[random.Random], RequestSpec]] = {
+    'stocks': _stocks,
+    'historical': _historical,
+    'analyze': _analyze,
+    'garch': _garch,
+}
+
+
+def parse_mix(text: Optional[str]) -> Dict[str, int]:
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise ValueError(f"unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, scenario: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.samples.setdefault(scenario, []).append(seconds)
+            if not ok:
+                self.errors[scenario] = self.errors.get(scenario, 0) + 1
+
+
+def _worker(base_url: str, mix: Dict[str, int], deadline: float, max_requests: Optional[int],
+            counter: List[int], counter_lock: threading.Lock, recorder: Recorder, seed: int, timeout: float) -> None:
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        if max_requests is not None:
+            with counter_lock:
+                if counter[0] >= max_requests:
+                    return
+                counter[0] += 1
+        scenario = rng.choices(names, weights)[0]
+        method, path, body = SCENARIOS[scenario](rng)
+        start = time.perf_counter()
+        try:
+            resp = session.request(method, base_url + path, json=body, timeout=timeout)
+            ok = resp.status_code < 400
+        except requests.RequestException:
+            ok = False
+        recorder.add(scenario, time.perf_counter() - start, ok)
+
+
+def summarize(recorder: Recorder, wall: float) -> Dict[str, Dict[str, float]]:
+    report = {}
+    everything: List[float] = []
+    total_errors = 0
+    for scenario, samples in sorted(recorder.samples.items()):
+        arr = np.asarray(samples)
+        everything.extend(samples)
+        errors = recorder.errors.get(scenario, 0)
+        total_errors += errors
+        report[scenario] = _stats(arr, errors, wall)
+    if everything:
+        report['ALL'] = _stats(np.asarray(everything), total_errors, wall)
+    return report
+
+
+def _stats(arr: np.ndarray, errors: int, wall: float) -> Dict[str, float]:
+    return {
+        'requests': int(arr.size),
+        'errors': int(errors),
+        'throughput_rps': float(arr.size / wall) if wall > 0 else 0.0,
+        'mean_ms': float(arr.mean() * 1000.0),
+        'p50_ms': float(np.percentile(arr, 50) * 1000.0),
+        'p90_ms': float(np.percentile(arr, 90) * 1000.0),
+        'p99_ms': float(np.percentile(arr, 99) * 1000.0),
+        'max_ms': float(arr.max() * 1000.0),
+    }
+
+
+def print_report(report: Dict[str, Dict[str, float]], concurrency: int, wall: float) -> None:
+    print("\n" + "=" * 86)
+    print(f"Load test: concurrency={concurrency}  wall={wall:.1f}s")
+    print("=" * 86)
+    print(f"{'scenario':<12}{'reqs':>7}{'errs':>6}{'rps':>9}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for name, s in report.items():
+        print(f"{name:<12}{s['requests']:>7}{s['errors']:>6}{s['throughput_rps']:>9.1f}"
+              f"{s['mean_ms']:>10.1f}{s['p50_ms']:>10.1f}{s['p90_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    print("(latencies in ms)")
+
+
+def _wait_until_serving(base_url: str, timeout: float, proc: Optional[subprocess.Popen] = None) -> None:
+    """
+    Block until /api/stocks answers 200. /api/health is up as soon as the app
+    imports, but the first quote refresh runs in the background and
+    /api/stocks returns 503 until it lands; timing that would measure startup.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f'load-test server exited with status {proc.returncode}')
+        try:
+            if requests.get(base_url + '/api/stocks', timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f'{base_url} did not serve /api/stocks within {timeout:.0f}s')
+
+
+def _spawn_server(port: int, server_args: List[str]) -> subprocess.Popen:
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cmd = [sys.executable, '-m', 'loadtest.server', '--port', str(port)] + server_args
+    proc = subprocess.Popen(cmd, cwd=backend_dir, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    try:
+        _wait_until_serving(f'http://127.0.0.1:{port}', 120, proc)
+    except RuntimeError:
+        proc.terminate()
+        raise
+    return proc
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='target an existing server instead of spawning the stubbed one')
+    parser.add_argument('--port', type=int, default=5055, help='port for the spawned server')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run')
+    parser.add_argument('--requests', type=int, help='stop after this many requests (overrides duration)')
+    parser.add_argument('--mix', help='weights, e.g. stocks=40,historical=25,analyze=15,garch=20')
+    parser.add_argument('--timeout', type=float, default=120.0, help='per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='also write the report to this JSON file')
+    parser.add_argument('--yf-latency-ms', default='50')
+    parser.add_argument('--news-latency-ms', default='100')
+    parser.add_argument('--finbert-latency-ms', default='30')
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    proc = None
+    base_url = args.url
+    if not base_url:
+        proc = _spawn_server(args.port, ['--yf-latency-ms', args.yf_latency_ms,
+                                         '--news-latency-ms', args.news_latency_ms,
+                                         '--finbert-latency-ms', args.finbert_latency_ms])
+        base_url = f'http://127.0.0.1:{args.port}'
+    else:
+        _wait_until_serving(base_url.rstrip('/'), 120)
+
+    recorder = Recorder()
+    counter = [0]
+    counter_lock = threading.Lock()
+    deadline = time.monotonic() + (args.duration if args.requests is None else 10 ** 9)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for i in range(args.concurrency):
+                pool.submit(_worker, base_url.rstrip('/'), mix, deadline, args.requests,
+                            counter, counter_lock, recorder, args.seed + i, args.timeout)
+        wall = time.perf_counter() - start
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    report = summarize(recorder, wall)
+    print_report(report, args.concurrency, wall)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'concurrency': args.concurrency, 'wall_seconds': wall, 'mix': mix, 'scenarios': report}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
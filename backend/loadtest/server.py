@@ -0,0 +1,60 @@
+"""
+Start the Flask app with every upstream replaced by a local stand-in.
+
+Usage (from backend/):
+    python -m loadtest.server --port 5055 --yf-latency-ms 80 --news-latency-ms 150 --finbert-latency-ms 40
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest.stubs import NewsStubServer, install_sentiment_stub, install_yfinance_stub  # noqa: E402
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--yf-latency-ms', type=float, default=50.0, help='latency of each yfinance call')
+    parser.add_argument('--news-latency-ms', type=float, default=100.0, help='latency of each news provider call')
+    parser.add_argument('--finbert-latency-ms', type=float, default=30.0, help='latency of each sentiment batch')
+    parser.add_argument('--workdir', help='working directory for the app cache (default: fresh temp dir)')
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+
+    news = NewsStubServer(latency_ms=args.news_latency_ms).start()
+    # Must be in place before services.news is imported (endpoints are read at import time)
+    os.environ.update(news.environ())
+    install_yfinance_stub(latency_ms=args.yf_latency_ms)
+    install_sentiment_stub(latency_ms=args.finbert_latency_ms)
+
+    # The app writes cache/ relative to the cwd; keep stub data out of the real cache
+    os.chdir(args.workdir or tempfile.mkdtemp(prefix='indstock-loadtest-'))
+
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    print("=" * 50)
+    print(f"[INFO] Load-test server (stubbed upstreams) at http://{args.host}:{args.port}")
+    print(f"[INFO] News stand-ins at {news.base_url}")
+    print("=" * 50)
+    server = make_server(args.host, args.port, app_module.app, threaded=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        news.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Deterministic local stand-ins for the app's upstream dependencies.
+
+- yfinance: `yf.download` and `yf.Ticker` are replaced in-process with
+  generators that return seeded random-walk prices per symbol.
+- NewsAPI / MediaStack / Twitter: served by a local HTTP server that mimics
+  each provider's JSON shape; the news service is pointed at it through the
+  NEWSAPI_ENDPOINT / MEDIASTACK_ENDPOINT / TWITTER_API_V2_ENDPOINT variables.
+- FinBERT: the sentiment pipeline is replaced by a keyword scorer so the
+  harness runs without transformers/torch.
+
+Each stand-in sleeps for a configurable latency to emulate the real provider.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+
+_PERIOD_DAYS = {'1d': 1, '5d': 5, '1mo': 21, '3mo': 63, '6mo': 126, '1y': 252, '2y': 504,
+                '5y': 1260, '10y': 2520, '20y': 5040, 'max': 5040}
+_HISTORY_START = pd.Timestamp('2005-01-03')
+_HISTORY_END = pd.Timestamp('2025-12-31')
+
+
+def _seed(*parts: str) -> int:
+    return zlib.crc32('|'.join(parts).encode('utf-8'))
+
+
+def _sleep_ms(ms: float) -> None:
+    if ms > 0:
+        time.sleep(ms / 1000.0)
+
+
+def _ohlcv(symbol: str) -> pd.DataFrame:
+    """Full deterministic daily history for a symbol (cached per process)."""
+    cached = _OHLCV_CACHE.get(symbol)
+    if cached is not None:
+        return cached
+    index = pd.bdate_range(_HISTORY_START, _HISTORY_END)
+    rng = np.random.default_rng(_seed(symbol))
+    rets = rng.normal(0.0003, 0.015, size=len(index))
+    close = 100.0 * np.exp(np.cumsum(rets)) * rng.uniform(0.5, 20.0)
+    spread = np.abs(rng.normal(0.0, 0.008, size=len(index))) * close
+    df = pd.DataFrame({
+        'Open': close * (1.0 + rng.normal(0.0, 0.003, size=len(index))),
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Adj Close': close,
+        'Volume': rng.integers(100_000, 5_000_000, size=len(index)).astype(float),
+    }, index=index)
+    _OHLCV_CACHE[symbol] = df
+    return df
+
+
+_OHLCV_CACHE: Dict[str, pd.DataFrame] = {}
+
+
+class StubTicker:
+    latency_ms = 0.0
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+
+    @property
+    def info(self) -> Dict[str, object]:
+        _sleep_ms(self.latency_ms)
+        hist = _ohlcv(self.symbol)
+        last = hist.iloc[-1]
+        year = hist.iloc[-252:]
+        return {
+            'longName': f'{self.symbol} Stub Ltd',
+            'regularMarketPrice': float(last['Close']),
+            'previousClose': float(hist['Close'].iloc[-2]),
+            'dayHigh': float(last['High']),
+            'dayLow': float(last['Low']),
+            'open': float(last['Open']),
+            'fiftyTwoWeekHigh': float(year['High'].max()),
+            'fiftyTwoWeekLow': float(year['Low'].min()),
+            'marketCap': int(last['Close'] * 1e9),
+            'trailingPE': 20.0,
+            'trailingEps': float(last['Close'] / 20.0),
+            'volume': int(last['Volume']),
+            'averageVolume': int(year['Volume'].mean()),
+            'sector': 'Stub',
+            'industry': 'Stub',
+            'currency': 'INR',
+        }
+
+    def history(self, period: str = '1mo', interval: str = '1d', **kwargs) -> pd.DataFrame:
+        _sleep_ms(self.latency_ms)
+        hist = _ohlcv(self.symbol)
+        if interval not in ('1d', '1wk', '1mo'):
+            # Intraday requests: pretend the market is closed
+            return hist.iloc[0:0]
+        return hist.iloc[-_PERIOD_DAYS.get(period, 252):].drop(columns=['Adj Close'])
+
+
+def stub_download(tickers=None, start=None, end=None, latency_ms: float = 0.0, **kwargs) -> pd.DataFrame:
+    _sleep_ms(latency_ms)
+    if isinstance(tickers, str):
+        tickers = tickers.replace(',', ' ').split()
+    frames = {}
+    for t in tickers:
+        hist = _ohlcv(t)
+        if start:
+            hist = hist[hist.index >= pd.Timestamp(start)]
+        if end:
+            hist = hist[hist.index < pd.Timestamp(end)]
+        frames[t] = hist
+    df = pd.concat(frames, axis=1)  # columns: (ticker, field)
+    df = df.swaplevel(0, 1, axis=1).sort_index(axis=1)
+    df.columns.names = ['Price', 'Ticker']
+    return df
+
+
+def install_yfinance_stub(latency_ms: float = 0.0) -> None:
+    import yfinance as yf
+
+    StubTicker.latency_ms = latency_ms
+    yf.Ticker = StubTicker
+    yf.download = lambda *a, **k: stub_download(*a, latency_ms=latency_ms, **k)
+
+
+def install_sentiment_stub(latency_ms: float = 0.0) -> None:
+    """Replace the FinBERT pipeline with a deterministic keyword scorer."""
+    from services import sentiment
+
+    positive = ('gain', 'rise', 'beat', 'surge', 'record', 'upgrade', 'profit')
+    negative = ('fall', 'drop', 'miss', 'loss', 'downgrade', 'probe', 'slump')
+
+    def pipe(texts: List[str], **kwargs):
+        _sleep_ms(latency_ms)
+        out = []
+        for text in texts:
+            lower = text.lower()
+            pos = sum(w in lower for w in positive)
+            neg = sum(w in lower for w in negative)
+            label = 'positive' if pos > neg else 'negative' if neg > pos else 'neutral'
+            out.append([{'label': label, 'score': 0.9}])
+        return out
+
+    sentiment._pipeline = pipe
+
+
+# ---------------------------------------------------------------------------
+# News providers
+# ---------------------------------------------------------------------------
+
+_HEADLINE_TEMPLATES = (
+    '{name} shares rise after quarterly profit beat',
+    '{name} stock falls as analysts downgrade outlook',
+    '{name} announces expansion plans',
+    '{name} posts record revenue, shares surge',
+    '{name} under regulatory probe, stock slumps',
+    '{name} board meets to discuss dividend',
+)
+
+
+def _headlines(query: str, count: int) -> List[Dict[str, str]]:
+    name = query.replace('"', '').strip() or 'Company'
+    rng = np.random.default_rng(_seed(name))
+    now = datetime.utcnow().replace(microsecond=0)
+    items = []
+    for i in range(count):
+        template = _HEADLINE_TEMPLATES[int(rng.integers(0, len(_HEADLINE_TEMPLATES)))]
+        items.append({
+            'title': template.format(name=name),
+            'description': f'{name} stub article {i}',
+            'published': (now - timedelta(hours=int(rng.integers(1, 150)))).isoformat() + 'Z',
+            'url': f'https://news.stub/{zlib.crc32(name.encode())}/{i}',
+        })
+    return items
+
+
+class _NewsHandler(BaseHTTPRequestHandler):
+    latency_ms = 0.0
+
+    def log_message(self, format, *args):  # keep the load-test output clean
+        pass
+
+    def _send(self, payload: Dict[str, object]) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        _sleep_ms(self.latency_ms)
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == '/v2/everything':
+            items = _headlines(params.get('q', ''), int(params.get('pageSize', 10)))
+            self._send({'status': 'ok', 'articles': [
+                {'title': a['title'], 'description': a['description'], 'publishedAt': a['published'],
+                 'url': a['url'] + '?src=newsapi', 'source': {'name': 'StubWire'}} for a in items]})
+        elif url.path == '/v1/news':
+            items = _headlines(params.get('keywords', ''), int(params.get('limit', 10)))
+            self._send({'data': [
+                {'title': a['title'], 'description': a['description'], 'published_at': a['published'],
+                 'url': a['url'] + '?src=mediastack', 'source': 'StubStack'} for a in items]})
+        elif url.path == '/2/tweets/search/recent':
+            query = params.get('query', '').split(' -is:retweet')[0]
+            items = _headlines(query, min(int(params.get('max_results', 10)), 10))
+            self._send({
+                'data': [{'id': str(i), 'text': a['title'], 'created_at': a['published'], 'author_id': '1'}
+                         for i, a in enumerate(items)],
+                'includes': {'users': [{'id': '1', 'username': 'stubuser', 'name': 'Stub User'}]},
+            })
+        else:
+            self.send_error(404)
+
+
+class NewsStubServer:
+    """Background HTTP server emulating NewsAPI, MediaStack and Twitter search."""
+
+    def __init__(self, latency_ms: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        handler = type('NewsHandler', (_NewsHandler,), {'latency_ms': latency_ms})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def environ(self) -> Dict[str, str]:
+        """Environment variables that point the news service at this server."""
+        return {
+            'NEWSAPI_ENDPOINT': self.base_url + '/v2/everything',
+            'MEDIASTACK_ENDPOINT': self.base_url + '/v1/news',
+            'TWITTER_API_V2_ENDPOINT': self.base_url + '/2/tweets/search/recent',
+            'NEWSAPI_KEY': 'stub-newsapi-key',
+            'MEDIASTACK_KEY': 'stub-mediastack-key',
+            'TWITTER_BEARER_TOKEN': 'stub-twitter-token',
+        }
+
+    def start(self) -> 'NewsStubServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='news-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
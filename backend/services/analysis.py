@@ -0,0 +1,318 @@
+"""
+Section-wise evaluation of the /api/analyze and /api/prices payloads.
+
+Every intermediate (prices, returns, correlation, RMT, indicators, news
+sentiment, ...) is a cached_property of Analysis, so building a section
+computes exactly its dependencies, once, and sections the caller did not ask
+for (via `fields`/`include`) cost nothing. A predictions-only widget never
+serializes the price history, and an RMT widget never fetches news.
+"""
+from __future__ import annotations
+
+import json
+import os
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from services import backtest, encoding, metrics
+from services.analytics import (
+    compute_annualized_volatility,
+    compute_correlation_matrix,
+    compute_log_returns,
+    compute_momentum,
+    compute_rsi,
+    fetch_adjusted_close,
+    rmt_denoise_correlation,
+    sentiment_adjusted_correlation,
+)
+
+
+ANALYZE_SECTIONS = ('prices', 'returns', 'dates', 'correlations', 'rmt', 'sentiment',
+                    'adjusted_correlation', 'predictions', 'model_info')
+PRICE_SECTIONS = ('prices', 'returns', 'dates')
+_MODEL_INFO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'models', 'volatility_metrics.json')
+
+
+def parse_fields(params: Dict[str, Any], allowed: Sequence[str]) -> Tuple[str, ...]:
+    """Sections named by `fields` (or `include`) as a list or comma string; all of them when absent."""
+    raw = params.get('fields', params.get('include'))
+    if raw is None or raw == '' or raw == []:
+        return tuple(allowed)
+    names = raw.split(',') if isinstance(raw, str) else raw
+    if not isinstance(names, list):
+        raise ValueError('fields must be a list or a comma-separated string')
+    names = [str(n).strip() for n in names if str(n).strip()]
+    unknown = [n for n in names if n not in allowed]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)} (valid: {', '.join(allowed)})")
+    return tuple(n for n in allowed if n in names)
+
+
+def returns_proxy_sentiment(returns: pd.DataFrame, ticker: str, lookback_days: int) -> float:
+    """Stand-in sentiment from the mean of the last `lookback_days` returns when there are no headlines."""
+    try:
+        look = max(1, min(lookback_days, returns.shape[0]))
+        mean_ret = float(returns[ticker].dropna().tail(look).mean()) if ticker in returns.columns else 0.0
+        return float(np.tanh(mean_ret * 10.0) * 0.5)
+    except Exception:
+        return 0.0
+
+
+def ticker_sentiment(tickers: List[str], lookback_days: int, returns: Optional[pd.DataFrame] = None,
+                     tier: str = 'auto'
+                     ) -> Tuple[Dict[str, float], Dict[str, List[Dict[str, Any]]], bool, Optional[str]]:
+    """
+    Mean headline score and up to three example articles per ticker, whether
+    the scores are provisional because FinBERT is still loading, and the
+    sentiment tier that produced them ('finbert', 'lexicon', 'mixed', or None
+    when no headline was scored).
+
+    `tier` is passed to analyze_texts: under 'auto' the lexicon scores
+    headlines while FinBERT loads or is overloaded; with 'finbert' a model
+    that is not ready yet means no headline scores. Tickers without scored
+    headlines (or when the news providers fail) get the returns proxy if
+    `returns` is given, else 0.
+    When the article store covers the lookback, stored articles and their
+    ingest-time FinBERT scores are used (no provider calls, no inference).
+    Otherwise articles that do not mention the company are dropped,
+    near-duplicate headlines are scored once and share that score (see
+    text_filter), and what remains is scored in one analyze_texts call.
+    """
+    from services import article_store
+    from services import sentiment as finbert
+    from services import text_filter
+    from services.news import fetch_news_for_tickers
+
+    if tier != 'lexicon' and article_store.covers(tickers, lookback_days):
+        stored = article_store.articles(tickers, lookback_days)
+        sentiment: Dict[str, float] = {}
+        scored_any = False
+        for t in tickers:
+            scores = [a['score'] for a in stored[t] if a['score'] is not None]
+            if scores:
+                sentiment[t] = float(np.mean(scores))
+                scored_any = True
+            else:
+                sentiment[t] = returns_proxy_sentiment(returns, t, lookback_days) if returns is not None else 0.0
+        # Same as the live path: no tier when every ticker fell back to the proxy
+        return sentiment, {t: stored[t][:3] for t in tickers}, False, 'finbert' if scored_any else None
+
+    try:
+        news = fetch_news_for_tickers(tickers, lookback_days=lookback_days)
+    except Exception as e:
+        print(f"[WARNING] News fetch failed, using fallback sentiment: {e}")
+        news = {}
+
+    news = {t: text_filter.relevant_articles(news.get(t, []), t) for t in tickers}
+    headlines = {t: [n['title'] for n in news[t] if n.get('title')] for t in tickers}
+    flat = [h for t in tickers for h in headlines[t]]
+    pending = False
+    used_tier: Optional[str] = None
+    scores: List[float] = []
+    if flat and tier != 'lexicon' and not finbert.is_ready():
+        # Never block a request on the model load: 'auto' scores with the lexicon meanwhile
+        finbert.preload()
+        pending = finbert.status() == 'loading'
+        metrics.inc('sentiment_degraded_total', reason='lexicon' if tier == 'auto' else 'returns_proxy')
+    if flat and (tier != 'finbert' or finbert.is_ready()):
+        try:
+            unique, mapping = text_filter.reduce_texts(flat)
+            results = finbert.analyze_texts(unique, tier=tier)
+            scores = [results[m]['score'] for m in mapping]
+            tiers = {r['tier'] for r in results}
+            used_tier = tiers.pop() if len(tiers) == 1 else 'mixed'
+        except Exception as e:
+            print(f"[WARNING] Sentiment scoring failed, using fallback sentiment: {e}")
+
+    sentiment = {}
+    examples: Dict[str, List[Dict[str, Any]]] = {}
+    offset = 0
+    for t in tickers:
+        count = len(headlines[t])
+        if count and scores:
+            sentiment[t] = float(np.mean(scores[offset:offset + count]))
+        else:
+            sentiment[t] = returns_proxy_sentiment(returns, t, lookback_days) if returns is not None else 0.0
+        examples[t] = news.get(t, [])[:3] if count else []
+        offset += count
+    return sentiment, examples, pending, used_tier
+
+
+class Analysis:
+    """Lazily evaluated analysis of `tickers`; read sections through payload()."""
+
+    def __init__(self, tickers: List[str], start: Optional[str] = None, end: Optional[str] = None,
+                 lookback_days: int = 7, alpha: float = 0.3, use_news: bool = True,
+                 precision: Union[int, str, None] = None, sentiment_tier: str = 'auto'):
+        self.tickers = tickers
+        self.start = start
+        self.end = end
+        self.lookback_days = lookback_days
+        self.alpha = alpha
+        self.use_news = use_news
+        self.precision = precision
+        self.sentiment_tier = sentiment_tier
+        # True once a section used provisional sentiment while FinBERT loads
+        self.sentiment_pending = False
+        # Tier that scored the headlines ('finbert', 'lexicon', 'mixed'), once news_sentiment has run
+        self.sentiment_tier_used: Optional[str] = None
+
+    # ---- intermediates ------------------------------------------------------
+
+    @cached_property
+    def adj(self) -> pd.DataFrame:
+        return fetch_adjusted_close(self.tickers, start=self.start, end=self.end)
+
+    @cached_property
+    def rets(self) -> pd.DataFrame:
+        with metrics.stage('returns'):
+            return compute_log_returns(self.adj)
+
+    @cached_property
+    def corr(self) -> pd.DataFrame:
+        with metrics.stage('correlation'):
+            return compute_correlation_matrix(self.rets)
+
+    @cached_property
+    def corr_raw(self) -> List[List[float]]:
+        return self.corr.round(6).values.tolist()
+
+    @cached_property
+    def rmt(self) -> Dict[str, Any]:
+        with metrics.stage('rmt'):
+            return rmt_denoise_correlation(self.corr, self.rets.shape[0])
+
+    @cached_property
+    def rsi(self) -> pd.Series:
+        with metrics.stage('indicators'):
+            try:
+                return compute_rsi(self.adj, period=14)
+            except Exception:
+                return pd.Series(index=self.adj.columns, dtype=float)
+
+    @cached_property
+    def vol(self) -> pd.Series:
+        with metrics.stage('indicators'):
+            try:
+                return compute_annualized_volatility(self.rets)
+            except Exception:
+                return pd.Series(index=self.rets.columns, dtype=float)
+
+    @cached_property
+    def mom(self) -> pd.Series:
+        with metrics.stage('indicators'):
+            return compute_momentum(self.adj, window_days=7)
+
+    @cached_property
+    def news_sentiment(self) -> Tuple[Dict[str, float], Dict[str, List[Dict[str, Any]]]]:
+        if not self.use_news:
+            return {t: 0.0 for t in self.tickers}, {t: [] for t in self.tickers}
+        sentiment, examples, self.sentiment_pending, self.sentiment_tier_used = ticker_sentiment(
+            self.tickers, self.lookback_days, returns=self.rets, tier=self.sentiment_tier)
+        return sentiment, examples
+
+    # ---- sections -----------------------------------------------------------
+
+    def section_prices(self):
+        with metrics.stage('serialization'):
+            return {t: encoding.series_values(self.adj[t], 6, self.precision) for t in self.adj.columns}
+
+    def section_returns(self):
+        with metrics.stage('serialization'):
+            return {t: encoding.series_values(self.rets[t], 8, self.precision) for t in self.rets.columns}
+
+    def section_dates(self):
+        return [d.strftime('%Y-%m-%d') for d in self.adj.index]
+
+    def section_correlations(self):
+        return {'tickers': list(self.corr.columns), 'raw': self.corr_raw}
+
+    def section_rmt(self):
+        return {
+            'eigenvalues': self.rmt['eigenvalues_sorted'],
+            'lambda_min': self.rmt['lambda_min'],
+            'lambda_max': self.rmt['lambda_max'],
+            'denoised': self.rmt['denoised_correlation'].round(6).values.tolist(),
+        }
+
+    def section_sentiment(self):
+        return self.news_sentiment[0]
+
+    def section_adjusted_correlation(self):
+        sentiment, examples = self.news_sentiment
+        with metrics.stage('adjusted_correlation'):
+            adjusted = sentiment_adjusted_correlation(self.corr, sentiment, self.alpha)
+        return {
+            'tickers': list(self.corr.columns),
+            'raw': self.corr_raw,
+            'adjusted': np.round(adjusted, 6).tolist(),
+            'examples': examples,
+        }
+
+    def section_predictions(self):
+        sentiment = self.news_sentiment[0]
+        mom, rsi, vol = self.mom, self.rsi, self.vol
+        predictions = {}
+        for t in self.tickers:
+            s = sentiment.get(t, 0.0)
+            m = float(mom.get(t, 0.0)) if t in mom.index else 0.0
+            try:
+                r = float(rsi.loc[t]) if t in rsi.index else float('nan')
+            except Exception:
+                r = float('nan')
+            try:
+                v = float(vol.loc[t]) if t in vol.index else float('nan')
+            except Exception:
+                v = float('nan')
+            # Same rule /api/predict uses and /api/backtest evaluates historically
+            label = backtest.LABELS[int(backtest.classify(m, r, s if self.use_news else None, backtest.DEFAULT_PARAMS))]
+            predictions[t] = {
+                'sentiment': s,
+                'momentum_7d': m,
+                'rsi_14': r,
+                'vol_annualized': v,
+                'prediction': label
+            }
+        return predictions
+
+    def section_model_info(self):
+        # Metrics persisted by /api/train-volatility, if a model was trained
+        try:
+            if os.path.exists(_MODEL_INFO_PATH):
+                with open(_MODEL_INFO_PATH, 'r') as mf:
+                    return json.load(mf)
+        except Exception:
+            pass
+        return None
+
+    # ---- assembly -----------------------------------------------------------
+
+    def payload(self, fields: Iterable[str]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {'success': True, 'tickers': self.tickers}
+        for name in fields:
+            builder: Callable[[], Any] = getattr(self, f'section_{name}')
+            value = builder()
+            if value is not None:
+                out[name] = value
+        if self.sentiment_pending:
+            out['sentiment_model'] = 'loading'
+        if self.sentiment_tier_used:
+            out['sentiment_tier'] = self.sentiment_tier_used
+        return out
+
+    def price_table(self, fields: Sequence[str]) -> Optional[pd.DataFrame]:
+        """Date-aligned 'price:<T>' / 'return:<T>' columns for columnar encodings (None if neither was asked for)."""
+        parts = []
+        if 'prices' in fields:
+            parts.append(self.adj.add_prefix('price:'))
+        if 'returns' in fields:
+            parts.append(self.rets.add_prefix('return:').reindex(self.adj.index))
+        if not parts:
+            return None
+        table = pd.concat(parts, axis=1)
+        table.index = table.index.rename('date')
+        return table
@@ -1,13 +1,33 @@
 import math
-from typing import Dict, List, Tuple, Any
+import os
+from typing import Dict, List, Optional, Tuple, Any
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
+
+from services import metrics, price_panel
+from services.correlation import pairwise_correlation
+from services.market_data import get_provider
 
 
 def fetch_adjusted_close(tickers: List[str], start: str | None = None, end: str | None = None) -> pd.DataFrame:
-    data = yf.download(tickers=tickers, start=start, end=end, auto_adjust=False, progress=False)[('Adj Close')]
+    with metrics.stage('fetch_adjusted_close'):
+        # Serve from the shared memory-mapped panel when it covers the request
+        panel = price_panel.current_panel() if price_panel.enabled() else None
+        if panel is not None and panel.covers(tickers, start, end):
+            metrics.inc('price_panel_requests_total', result='hit')
+            data = panel.frame(tickers, start, end)
+        else:
+            metrics.inc('price_panel_requests_total', result='miss')
+            try:
+                data = get_provider().download(tickers, start=start, end=end, fields=['Adj Close'])['Adj Close']
+            except Exception as e:
+                # Upstream failing, throttled or circuit open: a stale panel beats an error
+                if panel is None or not panel.has_symbols(tickers):
+                    raise
+                print(f"[WARNING] {e}; serving adjusted closes from panel {panel.version}")
+                metrics.inc('price_panel_requests_total', result='fallback')
+                data = panel.frame(tickers, start, end)
     if isinstance(data, pd.Series):
         data = data.to_frame()
     data = data.dropna(how='all')
@@ -21,9 +41,13 @@ def compute_log_returns(adj_close: pd.DataFrame) -> pd.DataFrame:
     return returns
 
 
-def compute_correlation_matrix(returns: pd.DataFrame) -> pd.DataFrame:
-    # Use pairwise complete observations
-    return returns.corr()
+def compute_correlation_matrix(returns: pd.DataFrame, min_periods: int = 1, dtype: Optional[str] = None,
+                               block_size: Optional[int] = None) -> pd.DataFrame:
+    # Use pairwise complete observations (same result as returns.corr(), computed with BLAS)
+    dtype = dtype or os.getenv('CORRELATION_DTYPE', 'float64')
+    corr = pairwise_correlation(returns.to_numpy(dtype=np.float64, na_value=np.nan), min_periods=min_periods,
+                                dtype=dtype, block_size=block_size)
+    return pd.DataFrame(corr.astype(np.float64, copy=False), index=returns.columns, columns=returns.columns)
 
 
 def marchenko_pastur_bounds(T: int, N: int) -> Tuple[float, float]:
@@ -76,9 +100,13 @@ def compute_momentum(adj_close: pd.DataFrame, window_days: int = 7) -> pd.Series
     return momentum
 
 
-def compute_rsi(adj_close: pd.DataFrame, period: int = 14) -> pd.Series:
+def compute_rsi(adj_close: pd.DataFrame, period: int = 14, method: str = 'simple') -> pd.Series:
+    """Latest RSI per column; method 'simple' (rolling means), 'wilder' or 'ema' smoothing."""
     if adj_close.shape[0] < period + 1:
         return pd.Series(index=adj_close.columns, dtype=float)
+    if method != 'simple':
+        from services.indicators import rsi
+        return pd.Series(rsi(adj_close.to_numpy(dtype=np.float64), period, method)[-1], index=adj_close.columns)
     delta = adj_close.diff()
     gain = delta.clip(lower=0).rolling(window=period, min_periods=period).mean()
     loss = (-delta.clip(upper=0)).rolling(window=period, min_periods=period).mean()
@@ -87,6 +115,17 @@ def compute_rsi(adj_close: pd.DataFrame, period: int = 14) -> pd.Series:
     return rsi.iloc[-1]
 
 
+def sentiment_adjusted_correlation(corr: pd.DataFrame, sentiment: Dict[str, float], alpha: float) -> np.ndarray:
+    """Scale each correlation by 1 + alpha * mean sentiment of the pair, clipped to [-1, 1]."""
+    corr_mat = corr.values.astype(float)
+    adjusted = corr_mat.copy()
+    for i, ti in enumerate(corr.columns):
+        for j, tj in enumerate(corr.columns):
+            adj_factor = 1.0 + alpha * (sentiment.get(ti, 0.0) + sentiment.get(tj, 0.0)) / 2.0
+            adjusted[i, j] = float(np.clip(corr_mat[i, j] * adj_factor, -1.0, 1.0))
+    return adjusted
+
+
 def compute_annualized_volatility(returns: pd.DataFrame) -> pd.Series:
     # daily returns to annualized volatility (approx sqrt(252))
     vol = returns.std(skipna=True) * np.sqrt(252)
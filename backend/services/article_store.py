@@ -0,0 +1,348 @@
+"""
+Local article store.
+
+News used to be fetched and scored inside the request path and thrown away
+afterwards. The leader's ingester (ingest(), scheduled every
+ARTICLE_INGEST_MINUTES) now fetches headlines for the configured universe,
+drops irrelevant ones, scores them with FinBERT and keeps them in SQLite
+(cache/articles.db, WAL mode, so every worker process can read it):
+
+    articles       one row per (ticker, article), with its FinBERT label/score,
+                   indexed by (ticker, published_ts) for lookback range scans
+    articles_fts   FTS5 index over title + snippet (search())
+    coverage       per ticker: when it was last ingested and how far back it goes
+
+Each ticker fetched costs one request per configured news provider, and free
+tiers allow about a hundred a day, so the passes share
+ARTICLE_INGEST_DAILY_REQUESTS: every pass takes its slice of that budget and
+spends it on the tickers whose coverage is oldest.
+
+Request paths ask covers() first; when every ticker was ingested within
+ARTICLE_STORE_MAX_AGE_MINUTES and far enough back for the lookback, they read
+articles() instead of calling the news providers and the model. A ticker is
+only marked covered once all of its stored headlines have FinBERT scores.
+ARTICLE_STORE_ENABLED=0 turns the store (and the ingester) off.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services import metrics
+
+
+DB_PATH = os.getenv('ARTICLE_STORE_PATH', os.path.join('cache', 'articles.db'))
+INGEST_LOOKBACK_DAYS = int(os.getenv('ARTICLE_INGEST_LOOKBACK_DAYS', '7'))
+RETENTION_DAYS = int(os.getenv('ARTICLE_STORE_RETENTION_DAYS', '30'))
+INGEST_MINUTES = int(os.getenv('ARTICLE_INGEST_MINUTES', '30'))
+DAILY_REQUESTS = int(os.getenv('ARTICLE_INGEST_DAILY_REQUESTS', '90'))
+# Long enough for the ingester to come round to every ticker of a 50-stock universe on the default budget
+MAX_AGE_SECONDS = float(os.getenv('ARTICLE_STORE_MAX_AGE_MINUTES', '1440')) * 60.0
+_DAY = 86400.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    title TEXT,
+    snippet TEXT,
+    url TEXT,
+    source TEXT,
+    published_at TEXT,
+    published_ts REAL NOT NULL,
+    label TEXT,
+    confidence REAL,
+    score REAL,
+    ingested_ts REAL NOT NULL,
+    UNIQUE (ticker, dedup_key)
+);
+CREATE INDEX IF NOT EXISTS articles_ticker_time ON articles (ticker, published_ts);
+CREATE INDEX IF NOT EXISTS articles_unscored ON articles (id) WHERE score IS NULL;
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker TEXT PRIMARY KEY,
+    covered_from_ts REAL NOT NULL,
+    ingested_ts REAL NOT NULL
+);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, snippet, content='articles', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, snippet) VALUES (new.id, new.title, new.snippet);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, snippet) VALUES ('delete', old.id, old.title, old.snippet);
+END;
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_fts_available: Optional[bool] = None
+# Row count after this process's last ingest pass; None in workers that never ingest
+_article_count: Optional[int] = None
+# Fraction of a ticker fetch left over from earlier passes' budget slices
+_budget_carry = 0.0
+
+
+def enabled() -> bool:
+    return os.getenv('ARTICLE_STORE_ENABLED', '1') == '1'
+
+
+def _connect() -> sqlite3.Connection:
+    """Per-thread connection (per process: a forked child opens its own)."""
+    global _fts_available
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+    directory = os.path.dirname(DB_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=10.0)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    with _init_lock:
+        conn.executescript(_SCHEMA)
+        if _fts_available is None:
+            try:
+                conn.executescript(_FTS_SCHEMA)
+                _fts_available = True
+            except sqlite3.OperationalError as e:
+                print(f"[WARNING] SQLite FTS5 unavailable, article search falls back to LIKE: {e}")
+                _fts_available = False
+    _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+def _timestamp(value: Optional[str], default: float) -> float:
+    if not value:
+        return default
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return default
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _dedup_key(article: Dict[str, Any]) -> str:
+    url = (article.get('url') or '').lower().strip()
+    return url or (article.get('title') or '').lower().strip()[:200]
+
+
+def _as_article(row: sqlite3.Row) -> Dict[str, Any]:
+    return {'title': row['title'], 'snippet': row['snippet'], 'published_at': row['published_at'],
+            'url': row['url'], 'source': row['source'], 'score': row['score']}
+
+
+# ---- writes (ingester) ----------------------------------------------------------
+
+def upsert(ticker: str, articles: Iterable[Dict[str, Any]], now: Optional[float] = None) -> int:
+    """Insert articles not stored yet for `ticker`; returns how many were new."""
+    now = now or time.time()
+    rows = [(ticker, _dedup_key(a), a.get('title'), a.get('snippet'), a.get('url'), a.get('source'),
+             a.get('published_at'), _timestamp(a.get('published_at'), now), now)
+            for a in articles if _dedup_key(a)]
+    conn = _connect()
+    with conn:
+        # rowcount, unlike total_changes, leaves out the FTS trigger writes
+        cur = conn.executemany(
+            'INSERT OR IGNORE INTO articles (ticker, dedup_key, title, snippet, url, source, published_at, '
+            'published_ts, ingested_ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        return max(cur.rowcount, 0)
+
+
+def mark_covered(ticker: str, covered_from_ts: float, now: Optional[float] = None) -> None:
+    now = now or time.time()
+    conn = _connect()
+    with conn:
+        conn.execute(
+            'INSERT INTO coverage (ticker, covered_from_ts, ingested_ts) VALUES (?, ?, ?) '
+            'ON CONFLICT(ticker) DO UPDATE SET ingested_ts = excluded.ingested_ts, '
+            'covered_from_ts = MIN(coverage.covered_from_ts, excluded.covered_from_ts)',
+            (ticker, covered_from_ts, now))
+
+
+def score_pending(batch_size: int = 256) -> int:
+    """Score stored articles that have no FinBERT score yet; returns how many were scored."""
+    from services import text_filter
+    from services.sentiment import analyze_texts
+
+    conn = _connect()
+    scored = 0
+    while True:
+        rows = conn.execute('SELECT id, title FROM articles WHERE score IS NULL AND title IS NOT NULL '
+                            'ORDER BY id LIMIT ?', (batch_size,)).fetchall()
+        if not rows:
+            return scored
+        unique, mapping = text_filter.reduce_texts([r['title'] for r in rows])
+        results = analyze_texts(unique, tier='finbert')
+        with conn:
+            conn.executemany('UPDATE articles SET label = ?, confidence = ?, score = ? WHERE id = ?',
+                             [(results[m]['label'], results[m]['confidence'], results[m]['score'], r['id'])
+                              for r, m in zip(rows, mapping)])
+        scored += len(rows)
+
+
+def prune(retention_days: int = RETENTION_DAYS) -> int:
+    conn = _connect()
+    with conn:
+        cur = conn.execute('DELETE FROM articles WHERE published_ts < ?', (time.time() - retention_days * _DAY,))
+        conn.execute('UPDATE coverage SET covered_from_ts = MAX(covered_from_ts, ?)',
+                     (time.time() - retention_days * _DAY,))
+        return cur.rowcount
+
+
+def pass_budget(interval_minutes: float = INGEST_MINUTES, daily_requests: int = DAILY_REQUESTS) -> int:
+    """Tickers one pass may fetch: its share of the daily budget, carrying fractions over to later passes."""
+    global _budget_carry
+    allowance = daily_requests * interval_minutes / 1440.0 + _budget_carry
+    budget = int(allowance)
+    _budget_carry = allowance - budget
+    return budget
+
+
+def ingest(tickers: List[str], page_size: int = 10, budget: Optional[int] = None) -> Dict[str, int]:
+    """
+    One ingester pass: fetch recent headlines for up to `budget` of `tickers`
+    (default pass_budget()), those never ingested or ingested longest ago
+    first, keep the relevant ones, score what is new and prune old rows.
+    Tickers ingested within the last day fetch just that day; others (new,
+    or after a gap) are backfilled INGEST_LOOKBACK_DAYS.
+    """
+    from services import text_filter
+    from services.news import fetch_news_for_tickers
+
+    global _article_count
+    now = time.time()
+    conn = _connect()
+    last = {r['ticker']: r['ingested_ts'] for r in conn.execute('SELECT ticker, ingested_ts FROM coverage')}
+    budget = pass_budget() if budget is None else budget
+    due = sorted(tickers, key=lambda t: last.get(t, float('-inf')))[:max(0, budget)]
+    stats = {'fetched': 0, 'new': 0, 'scored': 0, 'skipped': len(tickers) - len(due)}
+    covered = []
+    for ticker in due:
+        contiguous = ticker in last and now - last[ticker] < _DAY
+        lookback = 1 if contiguous else INGEST_LOOKBACK_DAYS
+        with metrics.stage('article_ingest'):
+            articles = fetch_news_for_tickers([ticker], lookback_days=lookback, page_size=page_size).get(ticker, [])
+        articles = text_filter.relevant_articles(articles, ticker)
+        stats['fetched'] += len(articles)
+        stats['new'] += upsert(ticker, articles, now)
+        covered.append((ticker, contiguous, now - lookback * _DAY))
+    try:
+        stats['scored'] = score_pending()
+    except Exception as e:
+        # Unscored rows are retried next pass; readers treat them as headlines without a score
+        print(f"[WARNING] Article scoring failed, will retry next ingest: {e}")
+    # Coverage is published after scoring, and only for tickers with every headline scored, so readers
+    # never take unscored rows for FinBERT results; the rest are retried next pass
+    unscored = set()
+    if covered:
+        names = [t for t, _, _ in covered]
+        unscored = {r['ticker'] for r in conn.execute(
+            f"SELECT DISTINCT ticker FROM articles WHERE score IS NULL AND ticker IN ({','.join('?' * len(names))})",
+            names)}
+    for ticker, contiguous, covered_from in covered:
+        if ticker in unscored:
+            continue
+        if not contiguous:
+            # After a gap the older coverage has a hole in it; start over from this backfill
+            with conn:
+                conn.execute('DELETE FROM coverage WHERE ticker = ?', (ticker,))
+        mark_covered(ticker, covered_from, now)
+    prune()
+    _article_count = article_count()
+    metrics.inc('articles_ingested_total', stats['new'])
+    return stats
+
+
+# ---- reads (request path) ---------------------------------------------------------
+
+def covers(tickers: List[str], lookback_days: int) -> bool:
+    """Whether every ticker was ingested recently and back far enough for `lookback_days`."""
+    if not enabled() or not tickers:
+        return False
+    now = time.time()
+    try:
+        conn = _connect()
+        placeholders = ','.join('?' * len(tickers))
+        rows = conn.execute(f'SELECT ticker, covered_from_ts, ingested_ts FROM coverage '
+                            f'WHERE ticker IN ({placeholders})', list(tickers)).fetchall()
+    except sqlite3.Error as e:
+        print(f"[WARNING] Article store unavailable: {e}")
+        return False
+    fresh = {r['ticker'] for r in rows
+             if now - r['ingested_ts'] <= MAX_AGE_SECONDS and r['covered_from_ts'] <= now - lookback_days * _DAY + 3600}
+    hit = fresh.issuperset(tickers)
+    metrics.inc('article_store_requests_total', result='hit' if hit else 'miss')
+    return hit
+
+
+def articles(tickers: List[str], lookback_days: int, limit: int = 30) -> Dict[str, List[Dict[str, Any]]]:
+    """Most recent stored articles per ticker within the lookback (newest first)."""
+    since = time.time() - lookback_days * _DAY
+    conn = _connect()
+    with metrics.stage('article_store'):
+        return {t: [_as_article(r) for r in conn.execute(
+            'SELECT title, snippet, published_at, url, source, score FROM articles '
+            'WHERE ticker = ? AND published_ts >= ? ORDER BY published_ts DESC LIMIT ?', (t, since, limit))]
+            for t in tickers}
+
+
+def search(query: str, tickers: Optional[List[str]] = None, lookback_days: int = RETENTION_DAYS,
+           limit: int = 50) -> List[Dict[str, Any]]:
+    """Full-text search over stored titles/snippets, best matches first."""
+    since = time.time() - lookback_days * _DAY
+    conn = _connect()
+    ticker_clause, params = '', []
+    if tickers:
+        ticker_clause = f" AND a.ticker IN ({','.join('?' * len(tickers))})"
+        params = list(tickers)
+    with metrics.stage('article_store'):
+        if _fts_available:
+            # Quote each term so user input cannot inject FTS5 query syntax
+            match = ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+            rows = conn.execute(
+                'SELECT a.ticker, a.title, a.snippet, a.published_at, a.url, a.source, a.score '
+                'FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid '
+                f'WHERE articles_fts MATCH ? AND a.published_ts >= ?{ticker_clause} '
+                'ORDER BY articles_fts.rank LIMIT ?', [match, since] + params + [limit]).fetchall()
+        else:
+            rows = conn.execute(
+                'SELECT a.ticker, a.title, a.snippet, a.published_at, a.url, a.source, a.score FROM articles a '
+                f'WHERE (a.title LIKE ? OR a.snippet LIKE ?) AND a.published_ts >= ?{ticker_clause} '
+                'ORDER BY a.published_ts DESC LIMIT ?',
+                [f'%{query}%', f'%{query}%', since] + params + [limit]).fetchall()
+    return [dict(_as_article(r), ticker=r['ticker']) for r in rows]
+
+
+def daily_scores(tickers: List[str], since_ts: float) -> List[Tuple[str, str, float, int]]:
+    """(ticker, UTC day 'YYYY-MM-DD', score sum, scored articles) per ticker and day since `since_ts`."""
+    if not enabled() or not tickers:
+        return []
+    conn = _connect()
+    with metrics.stage('article_store'):
+        rows = conn.execute(
+            "SELECT ticker, date(published_ts, 'unixepoch') AS day, SUM(score), COUNT(score) FROM articles "
+            f"WHERE ticker IN ({','.join('?' * len(tickers))}) AND published_ts >= ? AND score IS NOT NULL "
+            'GROUP BY ticker, day', list(tickers) + [since_ts]).fetchall()
+    return [(r[0], r[1], float(r[2]), int(r[3])) for r in rows]
+
+
+def article_count() -> int:
+    try:
+        return int(_connect().execute('SELECT COUNT(*) FROM articles').fetchone()[0])
+    except sqlite3.Error:
+        return 0
+
+
+# Counted by the ingester, not per scrape, so only the leader reports it (float(None) skips the gauge)
+metrics.gauge('article_store_articles', lambda: _article_count,
+              'Articles held by the local article store, as of the last ingest pass.')
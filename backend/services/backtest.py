@@ -0,0 +1,381 @@
+"""
+Walk-forward backtest of the /api/predict rule.
+
+The rule labels a ticker on a given day from data up to that day:
+
+    Likely Up      momentum > 0, RSI < rsi_upper (or unknown), sentiment >  sentiment_threshold
+    Likely Down    momentum < 0, RSI > rsi_lower (or unknown), sentiment < -sentiment_threshold
+    Uncertain      otherwise
+
+and the label is scored against the sign of the next `horizon` days' return.
+Indicators are computed for the whole (dates x tickers) price panel at once
+with NumPy, so one parameter set costs a few array passes; per-date outcome
+counts are then reduced over any date range:
+
+    evaluate(prices, params)      confusion matrix, hit rate, forward returns and
+                                  a daily long/short strategy for one parameter set
+    sweep(prices, grid, folds)    every combination of `grid` on a thread pool (NumPy
+                                  releases the GIL), ranked by `objective`; with folds >= 2
+                                  parameters are also chosen on an expanding training
+                                  window and scored on the following test window
+
+Historical sentiment comes from `sentiment`: 'none' (the default: the
+sentiment condition is dropped, as /api/predict does with use_news=false;
+there are no headlines for most of a 20-year history), 'proxy' (the returns
+proxy the live path uses when there are no headlines) or 'store' (daily mean
+FinBERT score of stored articles, proxy on days without any).
+"""
+from __future__ import annotations
+
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services import metrics
+from services.indicators import momentum, rsi
+
+
+LABELS = ('Likely Up', 'Likely Down', 'Uncertain')
+OUTCOMES = ('Up', 'Down')
+SENTIMENT_SOURCES = ('none', 'proxy', 'store')
+OBJECTIVES = ('hit_rate', 'sharpe', 'total_return')
+
+DEFAULT_PARAMS: Dict[str, Any] = {
+    'momentum_window': 7,
+    'rsi_period': 14,
+    'rsi_upper': 70.0,
+    'rsi_lower': 30.0,
+    'sentiment_threshold': 0.2,
+    'sentiment_lookback': 7,
+    'horizon': 5,
+}
+_INT_PARAMS = ('momentum_window', 'rsi_period', 'sentiment_lookback', 'horizon')
+
+TRADING_DAYS = 252
+# A training window needs this many directional calls before its hit rate can pick parameters
+MIN_SIGNALS = 30
+
+
+def max_combinations() -> int:
+    return int(os.getenv('BACKTEST_MAX_COMBINATIONS', '256'))
+
+
+def workers() -> int:
+    return int(os.getenv('BACKTEST_WORKERS', str(min(8, os.cpu_count() or 1))))
+
+
+def parse_params(values: Dict[str, Any]) -> Dict[str, Any]:
+    """DEFAULT_PARAMS overridden by the recognised keys of `values`; ValueError for bad values."""
+    params = dict(DEFAULT_PARAMS)
+    for name in DEFAULT_PARAMS:
+        if values.get(name) is not None:
+            params[name] = int(values[name]) if name in _INT_PARAMS else float(values[name])
+    for name in _INT_PARAMS:
+        if params[name] < 1:
+            raise ValueError(f'{name} must be at least 1')
+    if params['sentiment_threshold'] < 0:
+        raise ValueError('sentiment_threshold must be non-negative')
+    return params
+
+
+def parse_grid(grid: Dict[str, Any], base: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Every combination of the value lists in `grid`, on top of `base` parameters."""
+    unknown = sorted(set(grid) - set(DEFAULT_PARAMS))
+    if unknown:
+        raise ValueError(f"unknown sweep parameters: {', '.join(unknown)} (valid: {', '.join(DEFAULT_PARAMS)})")
+    names = list(grid)
+    choices = [v if isinstance(v, list) else [v] for v in grid.values()]
+    if any(not c for c in choices):
+        raise ValueError('sweep values must be non-empty lists')
+    count = int(np.prod([len(c) for c in choices])) if choices else 1
+    if count > max_combinations():
+        raise ValueError(f'sweep has {count} combinations (max {max_combinations()})')
+    return [parse_params(dict(base, **dict(zip(names, combo)))) for combo in itertools.product(*choices)]
+
+
+# ---- indicators over the whole panel (rows = dates, columns = tickers) ----------
+
+def log_returns(prices: np.ndarray) -> np.ndarray:
+    out = np.full(prices.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[1:] = np.log(prices[1:] / prices[:-1])
+    return out
+
+
+def proxy_sentiment(prices: np.ndarray, lookback: int) -> np.ndarray:
+    """returns_proxy_sentiment for every date: tanh(10 x mean of the last `lookback` log returns) / 2."""
+    rets = log_returns(prices)
+    valid = ~np.isnan(rets)
+    total = np.cumsum(np.where(valid, rets, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+    total[lookback:] = total[lookback:] - total[:-lookback]
+    count[lookback:] = count[lookback:] - count[:-lookback]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+    return np.tanh(mean * 10.0) * 0.5
+
+
+def store_sentiment(prices: pd.DataFrame, lookback: int) -> np.ndarray:
+    """Mean stored FinBERT score over the last `lookback` rows, falling back to the proxy."""
+    from services import article_store
+
+    proxy = proxy_sentiment(prices.to_numpy(dtype=np.float64), lookback)
+    daily = article_store.daily_scores(list(prices.columns), since_ts=prices.index[0].timestamp())
+    if not daily:
+        return proxy
+    tickers, days, totals, counts = zip(*daily)
+    # Articles published on a non-trading day count towards the next trading day
+    rows = np.searchsorted(prices.index.values, np.array(days, dtype='datetime64[ns]'))
+    cols = prices.columns.get_indexer(list(tickers))
+    keep = (rows < len(prices.index)) & (cols >= 0)
+    total = np.zeros(prices.shape)
+    count = np.zeros(prices.shape)
+    np.add.at(total, (rows[keep], cols[keep]), np.asarray(totals)[keep])
+    np.add.at(count, (rows[keep], cols[keep]), np.asarray(counts)[keep])
+    total = np.cumsum(total, axis=0)
+    count = np.cumsum(count, axis=0)
+    total[lookback:] = total[lookback:] - total[:-lookback]
+    count[lookback:] = count[lookback:] - count[:-lookback]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, total / np.maximum(count, 1), proxy)
+
+
+def forward_returns(prices: np.ndarray, horizon: int) -> np.ndarray:
+    out = np.full(prices.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[:-horizon] = prices[horizon:] / prices[:-horizon] - 1.0
+    return out
+
+
+def classify(mom: Any, rsi_values: Any, sentiment: Any, params: Dict[str, Any]) -> np.ndarray:
+    """
+    Index into LABELS for each element (0 up, 1 down, 2 uncertain). Pass
+    sentiment=None to drop the sentiment condition. Works on scalars too.
+    """
+    mom = np.asarray(mom, dtype=np.float64)
+    rsi_values = np.asarray(rsi_values, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        # NaN RSI fails both comparisons, so test the negation to let unknown RSI through
+        up = (mom > 0) & ~(rsi_values >= params['rsi_upper'])
+        down = (mom < 0) & ~(rsi_values <= params['rsi_lower'])
+        if sentiment is not None:
+            sentiment = np.asarray(sentiment, dtype=np.float64)
+            up &= sentiment > params['sentiment_threshold']
+            down &= sentiment < -params['sentiment_threshold']
+    # up and down are exclusive (momentum sign): 0 up, 1 down, 2 neither
+    return (2 - 2 * up.astype(np.int8) - down).astype(np.int8)
+
+
+class _Indicators:
+    """Indicator arrays for a price panel, computed once per distinct window and shared by a sweep."""
+
+    def __init__(self, prices: pd.DataFrame, sentiment: str):
+        self.frame = prices
+        self.prices = prices.to_numpy(dtype=np.float64)
+        self.sentiment_source = sentiment
+        self.next_return = np.full(self.prices.shape, np.nan)
+        self.next_return[:-1] = log_returns(self.prices)[1:]
+        self.no_next_return = np.isnan(self.next_return)
+        self.next_return_filled = np.where(self.no_next_return, 0.0, self.next_return)
+        self._cache: Dict[Tuple[str, int], np.ndarray] = {}
+
+    def prepare(self, combos: Iterable[Dict[str, Any]]) -> None:
+        # Filled up front so the worker threads only read the cache
+        for params in combos:
+            self.get('momentum', params['momentum_window'])
+            self.get('rsi', params['rsi_period'])
+            self.get('forward', params['horizon'])
+            if self.sentiment_source != 'none':
+                self.get('sentiment', params['sentiment_lookback'])
+
+    def get(self, kind: str, window: int) -> np.ndarray:
+        key = (kind, window)
+        if key not in self._cache:
+            if kind == 'momentum':
+                self._cache[key] = momentum(self.prices, window)
+            elif kind == 'rsi':
+                self._cache[key] = rsi(self.prices, window)
+            elif kind == 'forward':
+                self._cache[key] = forward_returns(self.prices, window)
+            elif self.sentiment_source == 'store':
+                self._cache[key] = store_sentiment(self.frame, window)
+            else:
+                self._cache[key] = proxy_sentiment(self.prices, window)
+        return self._cache[key]
+
+
+def _daily_outcomes(ind: _Indicators, params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Per-date counts and returns for one parameter set, ready to be summed over any date range."""
+    mom = ind.get('momentum', params['momentum_window'])
+    fwd = ind.get('forward', params['horizon'])
+    sentiment = None if ind.sentiment_source == 'none' else ind.get('sentiment', params['sentiment_lookback'])
+    predicted = classify(mom, ind.get('rsi', params['rsi_period']), sentiment, params)
+
+    # Cell of the flattened 3x2 confusion matrix per (date, ticker); 6 = no outcome to score
+    cells = predicted * 2 + (fwd <= 0)
+    cells[np.isnan(mom) | np.isnan(fwd)] = 6
+    # One boolean pass per cell over the ticker axis beats a bincount over date*6 + cell
+    counts = np.stack([np.count_nonzero(cells == c, axis=1) for c in range(6)], axis=1)
+    scored_fwd = np.where(cells < 6, fwd, 0.0)
+    forward_sum = np.stack([np.einsum('tn,tn->t', scored_fwd, (predicted == c).astype(np.float64))
+                            for c in range(3)], axis=1)
+
+    # Daily rebalanced book: long Likely Up, short Likely Down, equal weight, held to the next close
+    position = (predicted == 0).astype(np.float64) - (predicted == 1)
+    position[ind.no_next_return] = 0.0
+    exposure = np.abs(position).sum(axis=1)
+    pnl = np.einsum('tn,tn->t', position, ind.next_return_filled)
+    strategy = np.divide(pnl, exposure, out=np.zeros(len(pnl)), where=exposure > 0)
+    return {'counts': counts, 'forward_sum': forward_sum, 'strategy': strategy, 'in_market': exposure > 0}
+
+
+def _finite(value: float) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+
+def _summarize(daily: Dict[str, np.ndarray], rows: slice) -> Dict[str, Any]:
+    counts = daily['counts'][rows].sum(axis=0).reshape(3, 2)
+    forward_sum = daily['forward_sum'][rows].sum(axis=0)
+    strategy = daily['strategy'][rows]
+    predicted = counts.sum(axis=1)
+    calls = predicted[0] + predicted[1]
+    observations = int(counts.sum())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hit_rate = (counts[0, 0] + counts[1, 1]) / calls
+        precision = {LABELS[i]: _finite(counts[i, i] / predicted[i]) for i in (0, 1)}
+        mean_forward = {LABELS[i]: _finite(forward_sum[i] / predicted[i]) for i in range(3)}
+        mean_forward['all'] = _finite(forward_sum.sum() / observations)
+        coverage = calls / observations
+        base_rate_up = counts[:, 0].sum() / observations
+
+    equity = np.cumsum(strategy)
+    drawdown = float(np.max(np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity)) if equity.size else 0.0
+    volatility = float(np.std(strategy)) if strategy.size > 1 else float('nan')
+    mean = float(np.mean(strategy)) if strategy.size else float('nan')
+    return {
+        'observations': observations,
+        'confusion_matrix': {'labels': list(LABELS), 'outcomes': list(OUTCOMES), 'counts': counts.tolist()},
+        'hit_rate': _finite(hit_rate),
+        'calls': int(calls),
+        'precision': precision,
+        'coverage': _finite(coverage),
+        'base_rate_up': _finite(base_rate_up),
+        'mean_forward_return': mean_forward,
+        'strategy': {
+            'total_return': _finite(np.expm1(equity[-1])) if equity.size else None,
+            'annualized_return': _finite(np.expm1(mean * TRADING_DAYS)),
+            'annualized_volatility': _finite(volatility * np.sqrt(TRADING_DAYS)),
+            'sharpe': _finite(mean / volatility * np.sqrt(TRADING_DAYS)) if volatility else None,
+            'max_drawdown': _finite(-np.expm1(-drawdown)),
+            'days_in_market': int(daily['in_market'][rows].sum()),
+        },
+    }
+
+
+def _score(summary: Dict[str, Any], objective: str) -> float:
+    if objective == 'hit_rate':
+        value = summary['hit_rate'] if summary['calls'] >= MIN_SIGNALS else None
+    else:
+        value = summary['strategy'][objective]
+    return float('-inf') if value is None else value
+
+
+def _span(dates: pd.DatetimeIndex, rows: slice) -> Dict[str, Optional[str]]:
+    chosen = dates[rows]
+    if chosen.empty:
+        return {'start': None, 'end': None}
+    return {'start': chosen[0].strftime('%Y-%m-%d'), 'end': chosen[-1].strftime('%Y-%m-%d')}
+
+
+def evaluate(prices: pd.DataFrame, params: Dict[str, Any], sentiment: str = 'none',
+             per_ticker: bool = False) -> Dict[str, Any]:
+    """Backtest one parameter set over the whole `prices` panel (dates x tickers)."""
+    with metrics.stage('backtest'):
+        ind = _Indicators(prices, sentiment)
+        daily = _daily_outcomes(ind, params)
+        result = dict(_summarize(daily, slice(None)), params=params, **_span(prices.index, slice(None)))
+        if per_ticker:
+            result['per_ticker'] = _per_ticker(ind, params)
+    return result
+
+
+def _per_ticker(ind: _Indicators, params: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    mom = ind.get('momentum', params['momentum_window'])
+    fwd = ind.get('forward', params['horizon'])
+    sentiment = None if ind.sentiment_source == 'none' else ind.get('sentiment', params['sentiment_lookback'])
+    predicted = classify(mom, ind.get('rsi', params['rsi_period']), sentiment, params)
+    valid = ~np.isnan(mom) & ~np.isnan(fwd)
+    hits = valid & (((predicted == 0) & (fwd > 0)) | ((predicted == 1) & (fwd <= 0)))
+    calls = valid & (predicted < 2)
+    out = {}
+    for j, ticker in enumerate(ind.frame.columns):
+        n = int(calls[:, j].sum())
+        out[ticker] = {'calls': n, 'hit_rate': float(hits[:, j].sum() / n) if n else None}
+    return out
+
+
+def sweep(prices: pd.DataFrame, combos: Sequence[Dict[str, Any]], sentiment: str = 'none',
+          objective: str = 'hit_rate', folds: int = 0) -> Dict[str, Any]:
+    """
+    Evaluate every parameter set in `combos` (see parse_grid), best first by
+    `objective`. With folds >= 2 the panel is also split into folds + 1
+    blocks and, for each fold, the parameters that score best on all earlier
+    blocks (minus the last `horizon` rows, whose outcomes overlap the test
+    block) are scored on the next block.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {', '.join(OBJECTIVES)}")
+    t = prices.shape[0]
+    bounds = np.linspace(0, t, folds + 2).astype(int) if folds >= 2 else []
+    windows = [(slice(0, bounds[k]), slice(bounds[k], bounds[k + 1])) for k in range(1, len(bounds) - 1)]
+
+    with metrics.stage('backtest'):
+        ind = _Indicators(prices, sentiment)
+        ind.prepare(combos)
+
+        def run(params: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+            daily = _daily_outcomes(ind, params)
+            train = [_summarize(daily, slice(0, max(0, tr.stop - params['horizon']))) for tr, _ in windows]
+            return _summarize(daily, slice(None)), train
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers(), len(combos)))) as pool:
+            evaluated = list(pool.map(run, combos))
+
+        ranked = sorted(range(len(combos)), key=lambda i: _score(evaluated[i][0], objective), reverse=True)
+        result: Dict[str, Any] = {
+            'objective': objective,
+            'combinations': len(combos),
+            'results': [dict(evaluated[i][0], params=combos[i]) for i in ranked],
+            **_span(prices.index, slice(None)),
+        }
+        if windows:
+            result['walk_forward'] = _walk_forward(ind, prices.index, combos, evaluated, windows, objective)
+    return result
+
+
+def _walk_forward(ind: _Indicators, dates: pd.DatetimeIndex, combos: Sequence[Dict[str, Any]],
+                  evaluated: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+                  windows: List[Tuple[slice, slice]], objective: str) -> Dict[str, Any]:
+    folds = []
+    stitched: Dict[str, np.ndarray] = {}
+    for k, (train, test) in enumerate(windows):
+        best = max(range(len(combos)), key=lambda i: _score(evaluated[i][1][k], objective))
+        daily = _daily_outcomes(ind, combos[best])
+        # Out-of-sample record: each test block uses the parameters chosen before it
+        for name, values in daily.items():
+            if name not in stitched:
+                stitched[name] = np.zeros_like(values)
+            stitched[name][test] = values[test]
+        folds.append({
+            'train': _span(dates, train),
+            'test': _span(dates, test),
+            'params': combos[best],
+            'in_sample': evaluated[best][1][k],
+            'out_of_sample': _summarize(daily, test),
+        })
+    oos = slice(windows[0][1].start, windows[-1][1].stop)
+    return {'folds': folds, 'out_of_sample': dict(_summarize(stitched, oos), **_span(dates, oos))}
@@ -0,0 +1,100 @@
+"""
+Pairwise-complete correlation via masked matrix products.
+
+For every pair (i, j) pandas' DataFrame.corr() uses only the rows where both
+columns are observed. The same sums can be obtained for all pairs at once
+with BLAS: with M the observation mask and X the zero-filled data,
+
+    n   = M'M          sx  = X'M         sy  = M'X
+    sxy = X'X          sxx = (X*X)'M     syy = M'(X*X)
+
+from which the pairwise covariance and variances follow. Columns are centred
+first to limit cancellation (correlation is shift-invariant), float32 mode
+halves memory and roughly doubles throughput, and large universes are
+processed in column blocks so intermediates stay block_size x block_size.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+# Above this many columns the matrix is assembled from DEFAULT_BLOCK_SIZE blocks
+_AUTO_BLOCK_THRESHOLD = 1024
+DEFAULT_BLOCK_SIZE = 512
+
+
+def pairwise_correlation(values: np.ndarray, min_periods: int = 1, dtype=np.float64,
+                         block_size: Optional[int] = None) -> np.ndarray:
+    """
+    Correlation matrix of the columns of `values` (T x N, NaN = missing).
+
+    Matches pandas DataFrame.corr(method='pearson', min_periods=min_periods):
+    pairs with fewer than max(min_periods, 2) common observations or zero
+    variance are NaN, and valid diagonal entries are exactly 1.
+    """
+    x = np.asarray(values, dtype=dtype)
+    if x.ndim != 2:
+        raise ValueError("values must be a 2-D (observations x variables) array")
+    n_cols = x.shape[1]
+    if n_cols == 0:
+        return np.empty((0, 0), dtype=dtype)
+    min_periods = max(int(min_periods), 2)
+
+    mask = ~np.isnan(x)
+    counts = mask.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        col_mean = np.where(counts > 0, np.nansum(x, axis=0) / np.maximum(counts, 1), 0.0).astype(dtype)
+    xc = np.where(mask, x - col_mean, 0.0).astype(dtype, copy=False)
+
+    if mask.all():
+        corr = _complete_correlation(xc, x.shape[0], min_periods)
+    else:
+        m = mask.astype(dtype)
+        if block_size is None:
+            block_size = n_cols if n_cols <= _AUTO_BLOCK_THRESHOLD else DEFAULT_BLOCK_SIZE
+        corr = np.empty((n_cols, n_cols), dtype=dtype)
+        xc2 = xc * xc
+        for i0 in range(0, n_cols, block_size):
+            i1 = min(i0 + block_size, n_cols)
+            for j0 in range(i0, n_cols, block_size):
+                j1 = min(j0 + block_size, n_cols)
+                block = _masked_block(xc[:, i0:i1], xc2[:, i0:i1], m[:, i0:i1],
+                                      xc[:, j0:j1], xc2[:, j0:j1], m[:, j0:j1], min_periods)
+                corr[i0:i1, j0:j1] = block
+                if j0 != i0:
+                    corr[j0:j1, i0:i1] = block.T
+
+    diag = np.diagonal(corr).copy()
+    np.fill_diagonal(corr, np.where(np.isnan(diag), np.nan, 1.0))
+    return corr
+
+
+def _complete_correlation(xc: np.ndarray, n_obs: int, min_periods: int) -> np.ndarray:
+    """Fast path when nothing is missing: one Gram matrix instead of six."""
+    if n_obs < min_periods:
+        return np.full((xc.shape[1], xc.shape[1]), np.nan, dtype=xc.dtype)
+    cov = xc.T @ xc
+    std = np.sqrt(np.diagonal(cov))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = cov / np.outer(std, std)
+    corr[:, std <= 0] = np.nan
+    corr[std <= 0, :] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _masked_block(xi, xi2, mi, xj, xj2, mj, min_periods: int) -> np.ndarray:
+    n = mi.T @ mj
+    sx = xi.T @ mj
+    sy = mi.T @ xj
+    sxy = xi.T @ xj
+    sxx = xi2.T @ mj
+    syy = mi.T @ xj2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        vx = sxx - sx * sx / n
+        vy = syy - sy * sy / n
+        corr = cov / np.sqrt(vx * vy)
+    invalid = (n < min_periods) | ~(vx > 0) | ~(vy > 0)
+    corr[invalid] = np.nan
+    return np.clip(corr, -1.0, 1.0)
@@ -0,0 +1,229 @@
+"""
+Persistent rolling eigen-spectrum cache.
+
+The eigenvalues for the window ending at a given date depend only on the
+`window` returns before it, so once computed they never change (dividend
+adjustments rescale whole price histories and leave log returns intact).
+Results are kept per (sorted universe, window) in EIGEN_CACHE_DIR as .npz
+files; a request computes only the window end-dates that are not cached yet
+(normally just the newest bar) and returns the slice it asked for.
+
+The full spectrum per window is stored as well for universes up to
+EIGEN_CACHE_SPECTRUM_MAX_N names (default 256); larger universes keep only
+lambda1/lambda2 to bound file size.
+
+Requests can name any ticker list, so the directory is bounded too: after
+each write the least recently used files beyond EIGEN_CACHE_MAX_MB (default
+256) are deleted, reads marking a file used through its access time. Keys
+left without a file also lose their in-memory entry and per-key lock.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from services.analytics import compute_correlation_matrix
+
+
+CACHE_DIR = os.getenv('EIGEN_CACHE_DIR', os.path.join('cache', 'eigen'))
+# Entries kept decoded in memory per process
+_MEMORY_ENTRIES = 32
+
+
+def _spectrum_max_n() -> int:
+    return int(os.getenv('EIGEN_CACHE_SPECTRUM_MAX_N', '256'))
+
+
+def _max_bytes() -> float:
+    return float(os.getenv('EIGEN_CACHE_MAX_MB', '256')) * 1e6
+
+
+def cache_key(tickers: Sequence[str], window: int) -> str:
+    universe = ','.join(sorted(set(tickers)))
+    return hashlib.sha1(f'{universe}|{window}'.encode('utf-8')).hexdigest()[:20]
+
+
+class _Entry:
+    def __init__(self, dates: np.ndarray, lambda1: np.ndarray, lambda2: np.ndarray,
+                 spectrum: Optional[np.ndarray], mtime: Optional[int] = None):
+        self.dates = dates  # int64 ns, sorted
+        self.lambda1 = lambda1
+        self.lambda2 = lambda2
+        self.spectrum = spectrum  # (windows, N) descending, or None
+        self.mtime = mtime
+
+
+_entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+_entries_lock = threading.Lock()
+_key_locks: Dict[str, threading.Lock] = {}
+
+
+def _path(key: str, directory: str) -> str:
+    return os.path.join(directory, f'eigen-{key}.npz')
+
+
+def _touch(path: str, mtime: int) -> None:
+    """Mark a file used for LRU pruning (access time only; mtime identifies its contents)."""
+    try:
+        os.utime(path, ns=(time.time_ns(), mtime))
+    except OSError:
+        pass
+
+
+def _load(key: str, directory: str) -> Optional[_Entry]:
+    path = _path(key, directory)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    _touch(path, mtime)
+    with _entries_lock:
+        entry = _entries.get(key)
+        if entry is not None and entry.mtime == mtime:
+            _entries.move_to_end(key)
+            return entry
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            spectrum = data['spectrum'] if 'spectrum' in data.files else None
+            entry = _Entry(data['dates'], data['lambda1'], data['lambda2'], spectrum, mtime)
+    except (OSError, ValueError, KeyError):
+        return None
+    _remember(key, entry)
+    return entry
+
+
+def _remember(key: str, entry: _Entry) -> None:
+    with _entries_lock:
+        _entries[key] = entry
+        _entries.move_to_end(key)
+        while len(_entries) > _MEMORY_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def clear_memory() -> None:
+    """Drop the decoded entries kept in memory (files are untouched)."""
+    with _entries_lock:
+        _entries.clear()
+
+
+def _save(key: str, entry: _Entry, directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    path = _path(key, directory)
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    arrays = {'dates': entry.dates, 'lambda1': entry.lambda1, 'lambda2': entry.lambda2}
+    if entry.spectrum is not None:
+        arrays['spectrum'] = entry.spectrum
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+    entry.mtime = os.stat(path).st_mtime_ns
+    _remember(key, entry)
+    _prune(directory, keep=key)
+
+
+def _prune(directory: str, keep: str) -> None:
+    """Delete least recently used files beyond EIGEN_CACHE_MAX_MB (never `keep`) and forget keys without a file."""
+    files = []
+    for name in os.listdir(directory):
+        if not (name.startswith('eigen-') and name.endswith('.npz')):
+            continue
+        try:
+            st = os.stat(os.path.join(directory, name))
+        except OSError:
+            continue
+        files.append((st.st_atime_ns, st.st_size, name[len('eigen-'):-len('.npz')]))
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    present = {key for _, _, key in files}
+    limit = _max_bytes()
+    for _, size, key in files:
+        if total <= limit:
+            break
+        if key == keep:
+            continue
+        try:
+            os.remove(_path(key, directory))
+        except OSError:
+            continue
+        total -= size
+        present.discard(key)
+    with _entries_lock:
+        for key in [k for k in _entries if k not in present]:
+            del _entries[key]
+        # A held lock belongs to a request computing its first windows; it is dropped on a later pass
+        for key in [k for k, lock in _key_locks.items() if k not in present and not lock.locked()]:
+            del _key_locks[key]
+
+
+def _merge(old: Optional[_Entry], new: _Entry) -> _Entry:
+    if old is None or old.dates.size == 0:
+        return new
+    dates = np.concatenate([old.dates, new.dates])
+    order = np.argsort(dates, kind='stable')
+    keep = order[np.unique(dates[order], return_index=True)[1]]
+    spectrum = None
+    if old.spectrum is not None and new.spectrum is not None and old.spectrum.shape[1] == new.spectrum.shape[1]:
+        spectrum = np.concatenate([old.spectrum, new.spectrum])[keep]
+    return _Entry(dates[keep], np.concatenate([old.lambda1, new.lambda1])[keep],
+                  np.concatenate([old.lambda2, new.lambda2])[keep], spectrum)
+
+
+def rolling_spectrum(returns: pd.DataFrame, window: int, directory: str = CACHE_DIR) -> Dict[str, object]:
+    """
+    Eigenvalues (descending) of the correlation of every trailing window of
+    `window` returns, for each date from position `window` on.
+
+    Returns {'dates', 'lambda1', 'lambda2', 'spectrum' (or None), 'computed'} where `computed`
+    is the number of windows that were not cached.
+    """
+    if window < 2:
+        raise ValueError("window must be at least 2")
+    key = cache_key([str(c) for c in returns.columns], window)
+    # Eigenvalues are permutation invariant; fixing the column order keeps stored spectra comparable
+    returns = returns[sorted(returns.columns)]
+    wanted = returns.index[window:]
+    wanted_ns = wanted.values.astype('datetime64[ns]').astype(np.int64)
+    n_names = returns.shape[1]
+    if len(wanted) == 0:
+        return {'dates': [], 'lambda1': [], 'lambda2': [], 'spectrum': None, 'computed': 0}
+
+    with _entries_lock:
+        lock = _key_locks.setdefault(key, threading.Lock())
+    with lock:
+        entry = _load(key, directory)
+        if entry is not None and entry.dates.size:
+            pos = np.clip(np.searchsorted(entry.dates, wanted_ns), 0, entry.dates.size - 1)
+            have = entry.dates[pos] == wanted_ns
+        else:
+            pos = np.zeros(len(wanted_ns), dtype=np.int64)
+            have = np.zeros(len(wanted_ns), dtype=bool)
+
+        missing = np.flatnonzero(~have)
+        if missing.size:
+            keep_spectrum = n_names <= _spectrum_max_n()
+            spectra = np.empty((missing.size, n_names))
+            for k, idx in enumerate(missing):
+                i = window + int(idx)
+                corr = compute_correlation_matrix(returns.iloc[i - window: i])
+                spectra[k] = np.sort(np.linalg.eigvalsh(corr.values))[::-1]
+            fresh = _Entry(wanted_ns[missing], spectra[:, 0].copy(),
+                           spectra[:, 1].copy() if n_names > 1 else np.zeros(missing.size),
+                           spectra if keep_spectrum else None)
+            entry = _merge(entry, fresh)
+            _save(key, entry, directory)
+            pos = np.searchsorted(entry.dates, wanted_ns)
+
+    return {
+        'dates': list(wanted),
+        'lambda1': entry.lambda1[pos].tolist(),
+        'lambda2': entry.lambda2[pos].tolist(),
+        'spectrum': entry.spectrum[pos] if entry.spectrum is not None else None,
+        'computed': int(missing.size),
+    }
@@ -0,0 +1,226 @@
+"""
+Content negotiation for large analytics payloads.
+
+Endpoints build their payload with NumPy arrays for the bulky series and hand
+it to respond(), which picks the wire format from the request:
+
+    Accept: application/json               (default) orjson with native NumPy support,
+                                           stdlib json fallback; NaN is encoded as null
+    Accept: application/msgpack            MessagePack; arrays become typed-array maps
+                                           {'__ndarray__': True, 'dtype': '<f8', 'shape': [n], 'data': <bytes>}
+    Accept: application/vnd.apache.arrow.stream
+                                           Arrow IPC stream of the endpoint's date-aligned table;
+                                           the remaining payload is JSON in the schema metadata ('payload')
+
+`?format=json|msgpack|arrow` (query string or JSON body) overrides Accept.
+Responses above COMPRESS_MIN_BYTES are compressed with brotli or gzip per
+Accept-Encoding. `precision` (decimal places, or 'float32') trims the float
+series. orjson, msgpack, pyarrow and brotli are optional; a format whose
+package is missing answers 406 and brotli falls back to gzip.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from flask import Response, request
+
+from services import metrics
+
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+ARROW = 'application/vnd.apache.arrow.stream'
+_FORMATS = {'json': JSON, 'msgpack': MSGPACK, 'arrow': ARROW}
+_MEDIA_ALIASES = {'application/x-msgpack': MSGPACK, 'application/vnd.apache.arrow.file': ARROW}
+
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+# Low levels: float text compresses ~2x at any level, higher levels mostly add latency
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '1'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '1'))
+
+
+class NotAcceptable(ValueError):
+    pass
+
+
+def _request_param(name: str) -> Optional[str]:
+    value = request.args.get(name)
+    if value is None and request.method == 'POST':
+        body = request.get_json(force=True, silent=True)
+        if isinstance(body, dict) and body.get(name) is not None:
+            value = str(body[name])
+    return value
+
+
+def requested_precision() -> Union[int, str, None]:
+    """Client precision: an int number of decimals, 'float32', or None for the endpoint defaults."""
+    value = _request_param('precision')
+    if value is None or value == '':
+        return None
+    if value.lower() in ('float32', 'f4'):
+        return 'float32'
+    decimals = int(value)
+    if not 0 <= decimals <= 12:
+        raise ValueError('precision must be between 0 and 12 decimals, or float32')
+    return decimals
+
+
+def series_values(series: pd.Series, decimals: int, precision: Union[int, str, None] = None) -> np.ndarray:
+    """Non-missing values of `series` rounded to `decimals` (or the client's precision) as an ndarray."""
+    values = series.dropna().to_numpy(dtype=np.float64)
+    if isinstance(precision, int):
+        decimals = precision
+    values = np.round(values, decimals)
+    if precision == 'float32':
+        values = values.astype(np.float32)
+    return values
+
+
+def aligned_values(series: pd.Series, decimals: int) -> list:
+    """Every value of `series` rounded to `decimals`, missing ones as None, so positions stay date-aligned."""
+    return [None if v != v else v for v in np.round(series.to_numpy(dtype=np.float64), decimals).tolist()]
+
+
+def negotiate() -> str:
+    """Media type for the current request (raises NotAcceptable for unknown formats)."""
+    fmt = _request_param('format')
+    if fmt:
+        if fmt.lower() not in _FORMATS:
+            raise NotAcceptable(f"format must be one of {', '.join(_FORMATS)}")
+        return _FORMATS[fmt.lower()]
+    best, best_q = JSON, 0.0
+    for part in request.headers.get('Accept', '').split(','):
+        media, _, params = part.strip().partition(';')
+        media = _MEDIA_ALIASES.get(media.strip().lower(), media.strip().lower())
+        q = 1.0
+        for param in params.split(';'):
+            key, _, val = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        if media in (MSGPACK, ARROW, JSON) and q > best_q:
+            best, best_q = media, q
+    return best
+
+
+# ---- encoders -------------------------------------------------------------
+
+def _plain(obj: Any) -> Any:
+    """Fallback conversion for objects the JSON/msgpack encoders do not know."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(obj).strftime('%Y-%m-%d')
+    raise TypeError(f'Object of type {type(obj).__name__} is not serializable')
+
+
+def _json_nan_to_null(obj: Any) -> Any:
+    if isinstance(obj, float):
+        return None if obj != obj or obj in (float('inf'), float('-inf')) else obj
+    if isinstance(obj, dict):
+        return {k: _json_nan_to_null(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_json_nan_to_null(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return _json_nan_to_null(obj.tolist())
+    if isinstance(obj, np.generic):
+        return _json_nan_to_null(obj.item())
+    return obj
+
+
+def encode_json(payload: Dict[str, Any]) -> bytes:
+    try:
+        import orjson
+    except ImportError:
+        return json.dumps(_json_nan_to_null(payload), default=_plain, allow_nan=False).encode('utf-8')
+    return orjson.dumps(payload, default=_plain,
+                        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        arr = np.ascontiguousarray(obj)
+        if arr.dtype.kind not in 'biuf':
+            return arr.tolist()
+        return {'__ndarray__': True, 'dtype': arr.dtype.newbyteorder('<').str, 'shape': list(arr.shape),
+                'data': arr.astype(arr.dtype.newbyteorder('<'), copy=False).tobytes()}
+    return _plain(obj)
+
+
+def encode_msgpack(payload: Dict[str, Any]) -> bytes:
+    try:
+        import msgpack
+    except ImportError:
+        raise NotAcceptable('msgpack is not installed on the server')
+    return msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+
+
+def encode_arrow(payload: Dict[str, Any], table: Optional[pd.DataFrame], table_keys: Sequence[str]) -> bytes:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise NotAcceptable('pyarrow is not installed on the server')
+    if table is None:
+        raise NotAcceptable('this endpoint has no tabular representation; use json or msgpack')
+    columns = {str(table.index.name or 'index'): pa.array(table.index)}
+    columns.update((str(c), pa.array(table[c].to_numpy(), from_pandas=True)) for c in table.columns)
+    rest = {k: v for k, v in payload.items() if k not in table_keys}
+    arrow_table = pa.table(columns, metadata={'payload': encode_json(rest)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue().to_pybytes()
+
+
+def compress(body: bytes) -> Tuple[bytes, Optional[str]]:
+    """Compress per Accept-Encoding; returns (body, content-encoding or None)."""
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    accepted = {part.split(';')[0].strip().lower() for part in request.headers.get('Accept-Encoding', '').split(',')}
+    if 'br' in accepted:
+        try:
+            import brotli
+            return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+        except ImportError:
+            pass
+    if 'gzip' in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), 'gzip'
+    return body, None
+
+
+def respond(payload: Dict[str, Any], table: Optional[Callable[[], pd.DataFrame]] = None,
+            table_keys: Sequence[str] = (), status: int = 200) -> Response:
+    """
+    Encode `payload` in the negotiated format and compress it.
+
+    table       callable building the date-aligned frame for Arrow (only called for Arrow)
+    table_keys  payload keys represented by that table (left out of the Arrow metadata)
+    """
+    try:
+        media = negotiate()
+        with metrics.stage('serialization'):
+            if media == MSGPACK:
+                body = encode_msgpack(payload)
+            elif media == ARROW:
+                body = encode_arrow(payload, table() if table is not None else None, table_keys)
+            else:
+                body = encode_json(payload)
+    except NotAcceptable as e:
+        return Response(encode_json({'success': False, 'message': str(e)}), status=406, mimetype=JSON)
+
+    with metrics.stage('compression'):
+        body, content_encoding = compress(body)
+    response = Response(body, status=status, mimetype=media)
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    return response
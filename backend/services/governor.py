@@ -0,0 +1,292 @@
+"""
+Upstream request governor.
+
+Every market-data call to an upstream (Yahoo Finance) goes through the
+provider's Governor, which applies, in order:
+
+    circuit breaker  after UPSTREAM_BREAKER_THRESHOLD consecutive failures, calls fail
+                     immediately with CircuitOpenError for UPSTREAM_BREAKER_RESET_SECONDS,
+                     then a single trial call decides whether to close again
+    token bucket     at most UPSTREAM_RATE_PER_SEC calls on average, bursts of UPSTREAM_BURST;
+                     the bucket lives in a locked file under UPSTREAM_STATE_DIR, so every
+                     worker process sharing that directory draws on the same budget
+    concurrency cap  at most UPSTREAM_MAX_CONCURRENCY calls in flight per process
+    retries          transient failures (connection errors, timeouts, HTTP 429/5xx, empty
+                     responses) are retried up to UPSTREAM_MAX_RETRIES times with jittered
+                     exponential backoff (UPSTREAM_BACKOFF_BASE_MS doubling, capped at
+                     UPSTREAM_BACKOFF_MAX_MS); any other error is raised at once
+
+Waiting for a token or a slot is bounded by UPSTREAM_ACQUIRE_TIMEOUT_SECONDS;
+callers see UpstreamUnavailable instead of queueing forever and fall back to
+cached data (price panel, previous snapshot).
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, TypeVar
+
+from services import metrics
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+T = TypeVar('T')
+
+
+class UpstreamUnavailable(RuntimeError):
+    """The governor refused or gave up on an upstream call; serve cached data instead."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class RateLimitedError(UpstreamUnavailable):
+    pass
+
+
+class EmptyResponseError(UpstreamUnavailable):
+    """The upstream answered a non-empty request with no data (how yf.download reports failures)."""
+
+
+_TRANSIENT_ERRORS = {'ConnectionError', 'Timeout', 'TimeoutError', 'URLError', 'ChunkedEncodingError',
+                     'IncompleteRead', 'RemoteDisconnected', 'YFRateLimitError'}
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether retrying `exc` may succeed: network failures, timeouts, HTTP 429/5xx and empty responses."""
+    if isinstance(exc, EmptyResponseError):
+        return True
+    # requests/curl_cffi errors carry .response, urllib's HTTPError .code
+    status = getattr(getattr(exc, 'response', None), 'status_code', None) or getattr(exc, 'code', None)
+    if isinstance(status, int) and 100 <= status < 600:
+        return status == 429 or status >= 500
+    # Matched by name so the HTTP client libraries stay optional
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(exc).__mro__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, timeout: float) -> float:
+        """Take one token if available (returns 0), else the seconds until one accrues."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate if self.rate > 0 else timeout + 1.0
+
+    def acquire(self, timeout: float) -> bool:
+        """Take one token, waiting up to `timeout` seconds for one to accrue."""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take(timeout)
+            if wait <= 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket whose state ({"tokens", "updated"} in wall-clock seconds) is
+    kept in `path` under an exclusive file lock, so all processes using the
+    same file share one rate. Falls back to a per-process bucket if the file
+    cannot be used.
+    """
+
+    def __init__(self, path: str, rate: float, burst: float):
+        super().__init__(rate, burst)
+        self.path = path
+        self._shared = True
+
+    def _take(self, timeout: float) -> float:
+        if not self._shared:
+            return super()._take(timeout)
+        try:
+            return self._take_shared(timeout)
+        except OSError as e:
+            print(f"[WARNING] Shared upstream budget {self.path} unavailable ({e}); limiting per process")
+            self._shared = False
+            return super()._take(timeout)
+
+    def _take_shared(self, timeout: float) -> float:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.name == 'nt':
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                raw = os.read(fd, 256)
+                try:
+                    state = json.loads(raw.decode('ascii'))
+                    tokens, updated = float(state['tokens']), float(state['updated'])
+                except (ValueError, KeyError, TypeError):
+                    tokens, updated = self.capacity, time.time()
+                now = time.time()
+                # Clamp so a wall-clock step back cannot mint or destroy tokens
+                tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+                wait = 0.0
+                if tokens >= 1.0:
+                    tokens -= 1.0
+                else:
+                    wait = (1.0 - tokens) / self.rate if self.rate > 0 else timeout + 1.0
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, json.dumps({'tokens': tokens, 'updated': now}).encode('ascii'))
+                return wait
+            finally:
+                if os.name == 'nt':
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def cancel_trial(self) -> None:
+        """The call allowed by allow() never reached the upstream (e.g. rate limited)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"[WARNING] Upstream circuit opened after {self._failures} consecutive failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.reset_seconds
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+class Governor:
+    def __init__(self, name: str):
+        self.name = name
+        self.max_concurrency = int(_env_float('UPSTREAM_MAX_CONCURRENCY', 4))
+        self.max_retries = int(_env_float('UPSTREAM_MAX_RETRIES', 2))
+        self.backoff_base = _env_float('UPSTREAM_BACKOFF_BASE_MS', 500) / 1000.0
+        self.backoff_max = _env_float('UPSTREAM_BACKOFF_MAX_MS', 8000) / 1000.0
+        self.acquire_timeout = _env_float('UPSTREAM_ACQUIRE_TIMEOUT_SECONDS', 10)
+        rate, burst = _env_float('UPSTREAM_RATE_PER_SEC', 5), _env_float('UPSTREAM_BURST', 10)
+        state_dir = os.getenv('UPSTREAM_STATE_DIR', 'cache')
+        if state_dir:
+            self.bucket: TokenBucket = SharedTokenBucket(os.path.join(state_dir, f'upstream-{name}.bucket'),
+                                                         rate, burst)
+        else:
+            self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(int(_env_float('UPSTREAM_BREAKER_THRESHOLD', 5)),
+                                      _env_float('UPSTREAM_BREAKER_RESET_SECONDS', 30))
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def call(self, fn: Callable[[], T], call: str = '') -> T:
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                metrics.inc('upstream_rejected_total', provider=self.name, call=call, reason='circuit_open')
+                raise CircuitOpenError(f'{self.name} circuit is open; failing fast')
+            if not self.bucket.acquire(self.acquire_timeout):
+                self.breaker.cancel_trial()
+                metrics.inc('upstream_rejected_total', provider=self.name, call=call, reason='rate_limited')
+                raise RateLimitedError(f'{self.name} rate limit: no token within {self.acquire_timeout:.0f}s')
+            if not self._slots.acquire(timeout=self.acquire_timeout):
+                self.breaker.cancel_trial()
+                metrics.inc('upstream_rejected_total', provider=self.name, call=call, reason='concurrency')
+                raise RateLimitedError(f'{self.name} concurrency cap: no slot within {self.acquire_timeout:.0f}s')
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_transient(e):
+                    # The upstream answered (bad symbol, parse error); nothing to back off from
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                self._slots.release()
+            metrics.inc('upstream_retries_total', provider=self.name, call=call)
+            time.sleep(self.backoff(attempt))
+        raise AssertionError('unreachable')
+
+
+_governors: Dict[str, Governor] = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(name: str) -> Governor:
+    """Process-wide governor for upstream `name`, configured from UPSTREAM_* env vars."""
+    governor = _governors.get(name)
+    if governor is None:
+        with _governors_lock:
+            governor = _governors.setdefault(name, Governor(name))
+    return governor
+
+
+def circuit_open(name: str) -> bool:
+    governor = _governors.get(name)
+    return governor is not None and governor.breaker.is_open
@@ -0,0 +1,513 @@
+"""
+Full-series technical indicators for the whole universe, updated bar by bar.
+
+compute_rsi()/compute_momentum() recompute from the full history and keep
+only the last row. IndicatorEngine instead computes every indicator's full
+series for all symbols in one pass over the (dates x symbols) close panel:
+
+    sma_20, sma_50, ema_12, ema_26    moving averages (EMAs seeded with the SMA of their first bars)
+    rsi_14, rsi_wilder_14             simple-average RSI (as compute_rsi) and Wilder-smoothed RSI
+    macd, macd_signal, macd_hist      12/26 EMA spread, its 9-bar EMA and the difference
+    bb_mid, bb_upper, bb_lower        20-bar Bollinger bands at 2 (population) standard deviations
+    atr_14                            Wilder average true range; the panel holds adjusted closes
+                                      only, so the true range is the close-to-close move
+    momentum_7                        close / close 7 bars back - 1 (as compute_momentum)
+
+Window sums are computed with sliding windows and the recursive smoothers
+step through the dates vectorized across symbols. The engine keeps the
+state needed to continue (ring buffer of recent closes, running window
+sums, smoother values), so update() appends a bar in O(1) per symbol.
+
+The leader refreshes the published indicators after each price panel build
+(refresh()): when the new panel only appends bars to the history the last
+publication was built from, the saved state is loaded and only the new bars
+are applied; otherwise (new symbols, revised adjusted history) everything
+is recomputed. Series are published like the price panel (.npy + JSON index
++ CURRENT under cache/indicators) and workers map them read-only
+(current()).
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services import metrics
+
+
+INDICATOR_DIR = os.getenv('INDICATOR_DIR', os.path.join('cache', 'indicators'))
+CURRENT_FILE = 'CURRENT'
+_RECHECK_SECONDS = 5.0
+
+SMA_WINDOWS = (20, 50)
+EMA_SPANS = (12, 26)
+RSI_PERIOD = 14
+MACD = (12, 26, 9)
+BOLLINGER = (20, 2.0)
+ATR_PERIOD = 14
+MOMENTUM_WINDOW = 7
+
+NAMES: Tuple[str, ...] = tuple(
+    [f'sma_{w}' for w in SMA_WINDOWS] + [f'ema_{s}' for s in EMA_SPANS]
+    + [f'rsi_{RSI_PERIOD}', f'rsi_wilder_{RSI_PERIOD}', 'macd', 'macd_signal', 'macd_hist',
+       'bb_mid', 'bb_upper', 'bb_lower', f'atr_{ATR_PERIOD}', f'momentum_{MOMENTUM_WINDOW}'])
+
+# Window sums over closes (SMA and Bollinger), and the close ring buffer length that covers every lookback
+_CLOSE_WINDOWS = tuple(sorted(set(SMA_WINDOWS) | {BOLLINGER[0]}))
+_BUFFER = max(max(_CLOSE_WINDOWS), MOMENTUM_WINDOW, RSI_PERIOD) + 1
+# Recursive smoothers stepped together: (alpha, seed period) per row of the state
+_SMOOTHERS = (
+    [(2.0 / (s + 1), s) for s in EMA_SPANS]            # ema fast, ema slow
+    + [(1.0 / RSI_PERIOD, RSI_PERIOD)] * 2              # Wilder average gain, average loss
+    + [(1.0 / ATR_PERIOD, ATR_PERIOD)]                  # Wilder average true range
+)
+
+
+def enabled() -> bool:
+    return os.getenv('INDICATORS_ENABLED', '1') == '1'
+
+
+# ---- full-series building blocks (rows = dates, columns = symbols) -------------
+
+def window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing `window`-row sums; NaN until the window is full or when it contains a NaN."""
+    out = np.full(values.shape, np.nan)
+    if values.shape[0] >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(values, window, axis=0).sum(axis=-1)
+    return out
+
+
+def momentum(prices: np.ndarray, window: int) -> np.ndarray:
+    """prices[t] / prices[t - window] - 1 (compute_momentum for every date)."""
+    out = np.full(prices.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[window:] = prices[window:] / prices[:-window] - 1.0
+    return out
+
+
+def _deltas(prices: np.ndarray) -> np.ndarray:
+    delta = np.full(prices.shape, np.nan)
+    delta[1:] = prices[1:] - prices[:-1]
+    return delta
+
+
+def _rsi_from_averages(gain: np.ndarray, loss: np.ndarray, flat_is_nan: bool) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi_values = 100.0 - 100.0 / (1.0 + gain / loss)
+    if flat_is_nan:
+        return np.where(loss == 0, np.nan, rsi_values)
+    # Wilder: no losses in the average -> 100 (50 when the price did not move at all)
+    return np.where(loss == 0, np.where(gain > 0, 100.0, np.where(gain == 0, 50.0, np.nan)), rsi_values)
+
+
+def smooth(values: np.ndarray, alpha: float, period: int) -> np.ndarray:
+    """Exponential smoothing down the rows, seeded per column with the mean of its first `period` values."""
+    state = _SmootherState(np.array([[alpha]]), np.array([[period]]), values.shape[1])
+    out = np.empty(values.shape)
+    for t in range(values.shape[0]):
+        out[t] = state.step(values[t][None, :])[0]
+    return out
+
+
+def rsi(prices: np.ndarray, period: int = RSI_PERIOD, method: str = 'simple') -> np.ndarray:
+    """
+    RSI for every date. 'simple' averages gains/losses over the window (as
+    compute_rsi; NaN when the window has no losses), 'wilder' uses Wilder's
+    1/period smoothing and 'ema' a 2/(period+1) exponential average.
+    """
+    delta = _deltas(prices)
+    gains = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+    losses = np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0))
+    if method == 'simple':
+        return _rsi_from_averages(window_sum(gains, period), window_sum(losses, period), flat_is_nan=True)
+    if method not in ('wilder', 'ema'):
+        raise ValueError("method must be one of simple, wilder, ema")
+    alpha = 1.0 / period if method == 'wilder' else 2.0 / (period + 1)
+    return _rsi_from_averages(smooth(gains, alpha, period), smooth(losses, alpha, period), flat_is_nan=False)
+
+
+class _SmootherState:
+    """Values of K exponential smoothers for N symbols; NaN inputs leave a smoother unchanged."""
+
+    def __init__(self, alpha: np.ndarray, period: np.ndarray, n: int):
+        self.alpha = alpha                      # (K, 1)
+        self.period = period                    # (K, 1)
+        self.value = np.full((alpha.shape[0], n), np.nan)
+        self.seed_sum = np.zeros((alpha.shape[0], n))
+        self.seed_count = np.zeros((alpha.shape[0], n))
+
+    def step(self, x: np.ndarray) -> np.ndarray:
+        valid = ~np.isnan(x)
+        seeded = ~np.isnan(self.value)
+        if np.array_equal(valid, seeded):
+            # Steady state (every smoother with an input is seeded, none is seeding): plain update
+            self.value = self.value + self.alpha * (x - self.value)
+            return self.value
+        self.value = np.where(valid & seeded, self.value + self.alpha * (x - self.value), self.value)
+        seeding = valid & ~seeded
+        self.seed_sum += np.where(seeding, x, 0.0)
+        self.seed_count += seeding
+        ready = seeding & (self.seed_count == self.period)
+        self.value = np.where(ready, self.seed_sum / self.period, self.value)
+        return np.where(valid, self.value, np.nan)
+
+
+# ---- engine ------------------------------------------------------------------
+
+class IndicatorEngine:
+    """Indicator state for a fixed list of symbols; run() over history, then update() per bar."""
+
+    def __init__(self, symbols: Sequence[str]):
+        self.symbols = list(symbols)
+        n = len(self.symbols)
+        self.rows = 0
+        self.last_date: Optional[pd.Timestamp] = None
+        self.closes = np.full((_BUFFER, n), np.nan)     # ring buffer, row `rows % _BUFFER` is next
+        self.sums = {w: np.zeros(n) for w in _CLOSE_WINDOWS}
+        self.squares = np.zeros(n)                     # Bollinger window sum of squares
+        self.missing = {w: np.full(n, float(w)) for w in _CLOSE_WINDOWS}
+        self.gain_sum = np.zeros(n)
+        self.loss_sum = np.zeros(n)
+        self.down_moves = np.zeros(n)                  # negative deltas in the RSI window
+        self.missing_deltas = np.full(n, float(RSI_PERIOD))
+        alpha = np.array([[a] for a, _ in _SMOOTHERS])
+        period = np.array([[p] for _, p in _SMOOTHERS])
+        self.smoothers = _SmootherState(alpha, period, n)
+        self.signal = _SmootherState(np.array([[2.0 / (MACD[2] + 1)]]), np.array([[MACD[2]]]), n)
+
+    def _back(self, k: int) -> np.ndarray:
+        """Close `k` bars before the next one (k=1 is the latest bar)."""
+        return self.closes[(self.rows - k) % _BUFFER]
+
+    def recent(self, k: int) -> np.ndarray:
+        """The last `k` (<= buffer length) closes, oldest first."""
+        return np.stack([self._back(i) for i in range(k, 0, -1)]) if k else np.empty((0, len(self.symbols)))
+
+    # -- full history --
+
+    def run(self, prices: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Full series of every indicator over `prices` (dates x self.symbols); leaves the state at its last bar."""
+        values = prices[self.symbols].to_numpy(dtype=np.float64)
+        t = values.shape[0]
+        out: Dict[str, np.ndarray] = {}
+        with metrics.stage('indicators'):
+            for w in SMA_WINDOWS:
+                out[f'sma_{w}'] = window_sum(values, w) / w
+            period, width = BOLLINGER
+            mid = window_sum(values, period) / period
+            var = np.maximum(window_sum(values * values, period) / period - mid * mid, 0.0)
+            out['bb_mid'], out['bb_upper'], out['bb_lower'] = mid, mid + width * np.sqrt(var), mid - width * np.sqrt(var)
+            out[f'momentum_{MOMENTUM_WINDOW}'] = momentum(values, MOMENTUM_WINDOW)
+            out[f'rsi_{RSI_PERIOD}'] = rsi(values, RSI_PERIOD, 'simple')
+
+            # Recursive smoothers: one vectorized step per date for all symbols
+            delta = _deltas(values)
+            inputs = np.stack([values, values, np.maximum(delta, 0.0), np.maximum(-delta, 0.0), np.abs(delta)], axis=1)
+            smoothed = np.empty(inputs.shape)
+            signal = np.empty(values.shape)
+            for i in range(t):
+                smoothed[i] = self.smoothers.step(inputs[i])
+                signal[i] = self.signal.step((smoothed[i, 0] - smoothed[i, 1])[None, :])[0]
+            self._finish_recursive(out, smoothed[:, 0], smoothed[:, 1], smoothed[:, 2], smoothed[:, 3],
+                                   smoothed[:, 4], signal)
+
+            self._load_window_state(values, prices.index[-1] if t else None)
+        return {name: out[name] for name in NAMES}
+
+    def _load_window_state(self, values: np.ndarray, last_date: Optional[pd.Timestamp]) -> None:
+        """Ring buffer and window sums from the last bars of `values` (exact, no drift)."""
+        t = values.shape[0]
+        self.rows = t
+        self.last_date = last_date
+        tail = np.full((_BUFFER, values.shape[1]), np.nan)
+        if t:
+            tail[-min(t, _BUFFER):] = values[-_BUFFER:]
+        for k in range(1, _BUFFER + 1):
+            self.closes[(t - k) % _BUFFER] = tail[-k]
+        for w in _CLOSE_WINDOWS:
+            window = tail[-w:]
+            self.sums[w] = np.nansum(window, axis=0)
+            self.missing[w] = np.isnan(window).sum(axis=0).astype(np.float64)
+        window = tail[-BOLLINGER[0]:]
+        self.squares = np.nansum(window * window, axis=0)
+        delta = tail[-RSI_PERIOD:] - tail[-RSI_PERIOD - 1:-1]
+        self.gain_sum = np.nansum(np.maximum(delta, 0.0), axis=0)
+        self.loss_sum = np.nansum(np.maximum(-delta, 0.0), axis=0)
+        self.down_moves = (delta < 0).sum(axis=0).astype(np.float64)
+        self.missing_deltas = np.isnan(delta).sum(axis=0).astype(np.float64)
+
+    def _finish_recursive(self, out: Dict[str, np.ndarray], fast: np.ndarray, slow: np.ndarray, gain: np.ndarray,
+                          loss: np.ndarray, atr: np.ndarray, signal: np.ndarray) -> None:
+        out[f'ema_{EMA_SPANS[0]}'], out[f'ema_{EMA_SPANS[1]}'] = fast, slow
+        out[f'rsi_wilder_{RSI_PERIOD}'] = _rsi_from_averages(gain, loss, flat_is_nan=False)
+        out[f'atr_{ATR_PERIOD}'] = atr
+        out['macd'] = fast - slow
+        out['macd_signal'] = signal
+        out['macd_hist'] = out['macd'] - signal
+
+    # -- one new bar --
+
+    def update(self, date: pd.Timestamp, closes: np.ndarray) -> Dict[str, np.ndarray]:
+        """Apply one bar (closes aligned with self.symbols, NaN = no bar) and return each indicator's new value."""
+        x = np.asarray(closes, dtype=np.float64)
+        out: Dict[str, np.ndarray] = {}
+        prev = self._back(1)
+        delta = x - prev
+
+        for w in _CLOSE_WINDOWS:
+            leaving = self._back(w)
+            self.sums[w] += np.nan_to_num(x) - np.nan_to_num(leaving)
+            self.missing[w] += np.isnan(x).astype(np.float64) - np.isnan(leaving)
+        leaving = self._back(BOLLINGER[0])
+        self.squares += np.nan_to_num(x * x) - np.nan_to_num(leaving * leaving)
+        leaving_delta = self._back(RSI_PERIOD) - self._back(RSI_PERIOD + 1)
+        self.gain_sum += np.nan_to_num(np.maximum(delta, 0.0)) - np.nan_to_num(np.maximum(leaving_delta, 0.0))
+        self.loss_sum += np.nan_to_num(np.maximum(-delta, 0.0)) - np.nan_to_num(np.maximum(-leaving_delta, 0.0))
+        self.down_moves += (delta < 0).astype(np.float64) - (leaving_delta < 0)
+        self.missing_deltas += np.isnan(delta).astype(np.float64) - np.isnan(leaving_delta)
+        momentum_base = self._back(MOMENTUM_WINDOW)
+
+        self.closes[self.rows % _BUFFER] = x
+        self.rows += 1
+        self.last_date = pd.Timestamp(date)
+
+        for w in SMA_WINDOWS:
+            out[f'sma_{w}'] = np.where(self.missing[w] == 0, self.sums[w] / w, np.nan)
+        period, width = BOLLINGER
+        full = self.missing[period] == 0
+        mid = np.where(full, self.sums[period] / period, np.nan)
+        std = np.sqrt(np.maximum(self.squares / period - mid * mid, 0.0))
+        out['bb_mid'], out['bb_upper'], out['bb_lower'] = mid, mid + width * std, mid - width * std
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[f'momentum_{MOMENTUM_WINDOW}'] = x / momentum_base - 1.0
+        full = self.missing_deltas == 0
+        # No down moves in the window means a zero loss sum exactly, whatever the running sum drifted to
+        loss = np.where(self.down_moves == 0, 0.0, self.loss_sum)
+        out[f'rsi_{RSI_PERIOD}'] = np.where(full, _rsi_from_averages(self.gain_sum, loss, flat_is_nan=True), np.nan)
+
+        inputs = np.stack([x, x, np.maximum(delta, 0.0), np.maximum(-delta, 0.0), np.abs(delta)])
+        smoothed = self.smoothers.step(inputs)
+        signal = self.signal.step((smoothed[0] - smoothed[1])[None, :])[0]
+        self._finish_recursive(out, smoothed[0], smoothed[1], smoothed[2], smoothed[3], smoothed[4], signal)
+        return {name: out[name] for name in NAMES}
+
+    # -- persistence --
+
+    _ARRAYS = ('closes', 'squares', 'gain_sum', 'loss_sum', 'down_moves', 'missing_deltas')
+
+    def save(self, path: str) -> None:
+        arrays = {name: getattr(self, name) for name in self._ARRAYS}
+        arrays.update({f'sum_{w}': self.sums[w] for w in _CLOSE_WINDOWS})
+        arrays.update({f'missing_{w}': self.missing[w] for w in _CLOSE_WINDOWS})
+        for prefix, state in (('smoothers', self.smoothers), ('signal', self.signal)):
+            arrays.update({f'{prefix}_value': state.value, f'{prefix}_seed_sum': state.seed_sum,
+                           f'{prefix}_seed_count': state.seed_count})
+        tmp = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp, rows=np.array(self.rows), **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, symbols: Sequence[str], last_date: pd.Timestamp) -> 'IndicatorEngine':
+        engine = cls(symbols)
+        with np.load(path) as data:
+            engine.rows = int(data['rows'])
+            for name in cls._ARRAYS:
+                setattr(engine, name, data[name].copy())
+            engine.sums = {w: data[f'sum_{w}'].copy() for w in _CLOSE_WINDOWS}
+            engine.missing = {w: data[f'missing_{w}'].copy() for w in _CLOSE_WINDOWS}
+            for prefix, state in (('smoothers', engine.smoothers), ('signal', engine.signal)):
+                state.value = data[f'{prefix}_value'].copy()
+                state.seed_sum = data[f'{prefix}_seed_sum'].copy()
+                state.seed_count = data[f'{prefix}_seed_count'].copy()
+        engine.last_date = pd.Timestamp(last_date)
+        return engine
+
+
+# ---- published series ------------------------------------------------------------
+
+class IndicatorSeries:
+    """Read-only view over one published version: values[k] is the (dates x symbols) series of NAMES[k]."""
+
+    def __init__(self, version: str, values: np.ndarray, symbols: List[str], dates: pd.DatetimeIndex,
+                 panel_version: Optional[str], directory: str):
+        self.version = version
+        self.values = values
+        self.symbols = symbols
+        self.dates = dates
+        self.panel_version = panel_version
+        self.directory = directory
+        self._columns = {s: i for i, s in enumerate(symbols)}
+        self._names = {n: i for i, n in enumerate(NAMES)}
+
+    @classmethod
+    def attach(cls, directory: str = INDICATOR_DIR) -> Optional['IndicatorSeries']:
+        try:
+            with open(os.path.join(directory, CURRENT_FILE), 'r') as f:
+                version = f.read().strip()
+            with open(os.path.join(directory, f'indicators-{version}.json'), 'r') as f:
+                meta = json.load(f)
+            if tuple(meta['names']) != NAMES:
+                return None
+            values = np.load(os.path.join(directory, f'indicators-{version}.npy'), mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(version, values, meta['symbols'], pd.DatetimeIndex(meta['dates']), meta.get('panel_version'),
+                   directory)
+
+    def state_path(self) -> str:
+        return os.path.join(self.directory, f'state-{self.version}.npz')
+
+    def covers(self, symbols: Sequence[str], start: str | None = None, end: str | None = None) -> bool:
+        if not all(s in self._columns for s in symbols) or self.dates.empty:
+            return False
+        if start is not None and pd.Timestamp(start) < self.dates[0]:
+            return False
+        return end is None or pd.Timestamp(end) <= self.dates[-1] + pd.Timedelta(days=1)
+
+    def frames(self, names: Sequence[str], symbols: Sequence[str], start: str | None = None,
+               end: str | None = None) -> Dict[str, pd.DataFrame]:
+        lo = 0 if start is None else int(self.dates.searchsorted(pd.Timestamp(start), side='left'))
+        hi = len(self.dates) if end is None else int(self.dates.searchsorted(pd.Timestamp(end), side='left'))
+        cols = [self._columns[s] for s in symbols]
+        return {name: pd.DataFrame(np.asarray(self.values[self._names[name], lo:hi][:, cols], dtype=np.float64),
+                                   index=self.dates[lo:hi], columns=list(symbols))
+                for name in names}
+
+    def values_at(self, rows: np.ndarray, symbols: Sequence[str]) -> np.ndarray:
+        """(indicators, symbols) values, symbol i read at date row rows[i]."""
+        cols = np.array([self._columns[s] for s in symbols], dtype=np.intp)
+        return np.asarray(self.values[:, rows, cols], dtype=np.float64)
+
+
+def compute(prices: pd.DataFrame, names: Sequence[str] = NAMES) -> Dict[str, pd.DataFrame]:
+    """Full series of `names` for every column of `prices` (for symbols or ranges nothing was published for)."""
+    series = IndicatorEngine(list(prices.columns)).run(prices)
+    return {name: pd.DataFrame(series[name], index=prices.index, columns=prices.columns) for name in names}
+
+
+def publish(series: Dict[str, np.ndarray], engine: IndicatorEngine, dates: pd.DatetimeIndex,
+            panel_version: Optional[str] = None, directory: str = INDICATOR_DIR, keep: int = 2) -> str:
+    """Write the series and the engine state as a new version and make it current."""
+    os.makedirs(directory, exist_ok=True)
+    version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    values = np.stack([series[name] for name in NAMES])
+    npy_tmp = os.path.join(directory, f'indicators-{version}.npy.tmp')
+    with open(npy_tmp, 'wb') as f:
+        np.save(f, values)
+    os.replace(npy_tmp, os.path.join(directory, f'indicators-{version}.npy'))
+    engine.save(os.path.join(directory, f'state-{version}.npz'))
+    meta = {
+        'version': version,
+        'names': list(NAMES),
+        'symbols': engine.symbols,
+        'dates': [d.strftime('%Y-%m-%d') for d in dates],
+        'panel_version': panel_version,
+        'published_at': time.time(),
+    }
+    with open(os.path.join(directory, f'indicators-{version}.json'), 'w') as f:
+        json.dump(meta, f)
+    current_tmp = os.path.join(directory, f'{CURRENT_FILE}.{os.getpid()}.tmp')
+    with open(current_tmp, 'w') as f:
+        f.write(version)
+    os.replace(current_tmp, os.path.join(directory, CURRENT_FILE))
+    _prune(directory, keep)
+    return version
+
+
+def _prune(directory: str, keep: int) -> None:
+    versions = sorted(f[len('indicators-'):-len('.json')] for f in os.listdir(directory)
+                      if f.startswith('indicators-') and f.endswith('.json'))
+    for version in versions[:-keep]:
+        for name in (f'indicators-{version}.npy', f'indicators-{version}.json', f'state-{version}.npz'):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                # Still mapped by a reader on Windows; retried on the next publish
+                pass
+
+
+def refresh(prices: pd.DataFrame, panel_version: Optional[str] = None,
+            directory: str = INDICATOR_DIR) -> Optional[str]:
+    """
+    Publish indicators for the `prices` panel, applying only the new bars to
+    the last published state when `prices` extends the history it was built
+    from unchanged.
+    """
+    prices = prices.sort_index()
+    previous = IndicatorSeries.attach(directory)
+    with metrics.stage('indicator_refresh'):
+        engine = _resume(previous, prices, directory) if previous is not None else None
+        if engine is not None:
+            mode, old = 'incremental', len(previous.dates)
+            new = prices.iloc[old:]
+            rows = [engine.update(date, row) for date, row in zip(new.index, new[engine.symbols].to_numpy())]
+            series = {name: np.concatenate([np.asarray(previous.values[k], dtype=np.float64),
+                                            np.array([r[name] for r in rows]).reshape(len(rows), len(engine.symbols))])
+                      for k, name in enumerate(NAMES)}
+        else:
+            mode, old = 'rebuild', 0
+            engine = IndicatorEngine(list(prices.columns))
+            series = engine.run(prices)
+        version = publish(series, engine, prices.index, panel_version, directory)
+    metrics.inc('indicator_refreshes_total', mode=mode)
+    print(f"[OK] Indicators {version} published ({mode}: {len(prices.index) - old} bars x {len(engine.symbols)} symbols)")
+    return version
+
+
+def _resume(previous: IndicatorSeries, prices: pd.DataFrame, directory: str) -> Optional[IndicatorEngine]:
+    """
+    The engine state `previous` was published with, if `prices` is that
+    history (same symbols, dates and recent closes) plus new bars; None
+    means recompute. Adjusted closes are rescaled after dividends and
+    splits, which shows up as a mismatch with the saved recent closes.
+    """
+    n = len(previous.dates)
+    if n == 0 or list(prices.columns) != previous.symbols or len(prices.index) < n:
+        return None
+    if not np.array_equal(prices.index[:n].values.astype('datetime64[D]'),
+                          previous.dates.values.astype('datetime64[D]')):
+        return None
+    try:
+        engine = IndicatorEngine.load(previous.state_path(), previous.symbols, previous.dates[-1])
+    except (OSError, KeyError, ValueError) as e:
+        print(f"[WARNING] Indicator state unusable ({e}); recomputing")
+        return None
+    k = min(n, _BUFFER)
+    recent = prices.iloc[n - k:n].to_numpy(dtype=np.float64)
+    if engine.rows != n or not np.allclose(recent, engine.recent(k), rtol=1e-12, atol=0, equal_nan=True):
+        return None
+    return engine
+
+
+_current: Optional[IndicatorSeries] = None
+_current_checked = 0.0
+_current_mtime = None
+_current_lock = threading.Lock()
+
+
+def current(directory: str = INDICATOR_DIR) -> Optional[IndicatorSeries]:
+    """The latest published indicators, re-attached when CURRENT changes (checked every few seconds)."""
+    global _current, _current_checked, _current_mtime
+    now = time.monotonic()
+    if now - _current_checked < _RECHECK_SECONDS:
+        return _current
+    with _current_lock:
+        if now - _current_checked < _RECHECK_SECONDS:
+            return _current
+        _current_checked = now
+        try:
+            mtime = os.stat(os.path.join(directory, CURRENT_FILE)).st_mtime_ns
+        except OSError:
+            _current, _current_mtime = None, None
+            return None
+        if mtime != _current_mtime or _current is None:
+            series = IndicatorSeries.attach(directory)
+            if series is not None:
+                _current, _current_mtime = series, mtime
+    return _current
@@ -0,0 +1,78 @@
+"""
+On-demand imports of heavy optional libraries.
+
+arch and statsmodels (and the scipy stack they pull in) cost well over a
+second to import but are only needed by the GARCH/ARIMA endpoints, so app.py
+no longer imports them at startup:
+
+    available('arch')                 probe with importlib.util.find_spec (nothing is executed)
+    load('arch', 'arch_model')        import on first use, cached; ImportError if it fails
+
+Set PRELOAD_HEAVY_IMPORTS=1 to import them on a background thread right after
+startup, which keeps cold start fast and spares the first request the cost.
+"""
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from services import metrics
+
+
+_lock = threading.Lock()
+_modules: Dict[str, Any] = {}
+_failures: Dict[str, str] = {}
+_probes: Dict[str, bool] = {}
+
+
+def available(module: str) -> bool:
+    """Whether `module` is installed, without importing it (only the top-level package is probed)."""
+    top = module.split('.')[0]
+    if top not in _probes:
+        try:
+            _probes[top] = importlib.util.find_spec(top) is not None
+        except (ImportError, ValueError):
+            _probes[top] = False
+    return _probes[top]
+
+
+def load(module: str, attr: Optional[str] = None) -> Any:
+    """Import `module` once (thread-safe) and return it, or its attribute `attr`."""
+    mod = _modules.get(module)
+    if mod is None:
+        with _lock:
+            mod = _modules.get(module)
+            if mod is None:
+                if module in _failures:
+                    raise ImportError(_failures[module])
+                start = time.perf_counter()
+                try:
+                    with metrics.stage('lazy_import'):
+                        mod = importlib.import_module(module)
+                except Exception as e:
+                    _failures[module] = f'{module} is not importable: {e}'
+                    print(f"[WARNING] {_failures[module]}")
+                    raise ImportError(_failures[module]) from e
+                _modules[module] = mod
+                elapsed = time.perf_counter() - start
+                metrics.observe('lazy_import_seconds', elapsed, module=module)
+                print(f"[OK] Imported {module} ({elapsed * 1000:.0f} ms)")
+    return getattr(mod, attr) if attr else mod
+
+
+def preload(modules: Iterable[str]) -> threading.Thread:
+    """Import `modules` on a daemon thread; failures are logged and re-raised on first use."""
+    def run():
+        for module in modules:
+            if available(module):
+                try:
+                    load(module)
+                except ImportError:
+                    pass
+
+    thread = threading.Thread(target=run, name='preload-imports', daemon=True)
+    thread.start()
+    return thread
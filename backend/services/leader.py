@@ -0,0 +1,127 @@
+"""
+Single-leader coordination for multi-worker deployments.
+
+Exactly one process (the leader) runs the upstream refresh jobs and
+publishes versioned snapshots; every other worker only reloads the latest
+snapshot from disk. Leadership is an exclusive, non-blocking lock on a file,
+which the OS releases when the holder exits, so a follower takes over on its
+next poll if the leader dies.
+
+UPDATER_MODE selects the role:
+    auto      (default) elect a leader among the processes sharing the cache dir
+    leader    always run the refresh jobs (single process or dedicated updater.py)
+    follower  never fetch; only read snapshots (workers behind a dedicated updater)
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+class LeaderLock:
+    """Exclusive, non-blocking lock on `path`, held until release() or process exit."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.name == 'nt':
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # Record the holder for operators; the lock itself is what matters
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode('ascii'))
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            if os.name == 'nt':
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+def updater_mode() -> str:
+    mode = os.getenv('UPDATER_MODE', 'auto').strip().lower()
+    return mode if mode in ('auto', 'leader', 'follower') else 'auto'
+
+
+# The snapshot this process last wrote or loaded: its version and the latest trading session of its quotes
+_snapshot_version: Optional[int] = None
+_snapshot_session: Optional[str] = None
+
+
+def _note_snapshot(data: Dict[str, Any]) -> None:
+    global _snapshot_version, _snapshot_session
+    _snapshot_version = data.get('version')
+    _snapshot_session = data.get('session')
+
+
+def snapshot_version() -> Optional[int]:
+    """Version of the snapshot this process serves (None before one was written or loaded)."""
+    return _snapshot_version
+
+
+def snapshot_session() -> Optional[str]:
+    """Latest trading session (YYYY-MM-DD) in the quotes of the snapshot this process serves."""
+    return _snapshot_session
+
+
+def write_snapshot(path: str, data: Dict[str, Any]) -> int:
+    """Atomically publish `data` with a new monotonically increasing 'version'; returns the version."""
+    version = max(int(time.time() * 1000), int(data.get('version') or 0) + 1)
+    payload = dict(data, version=version)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+    data['version'] = version
+    _note_snapshot(payload)
+    return version
+
+
+def read_snapshot_if_changed(path: str, known_mtime: Optional[int]) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+    """Return (snapshot, mtime) when the file changed since `known_mtime`, else (None, known_mtime)."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None, known_mtime
+    if mtime == known_mtime:
+        return None, known_mtime
+    try:
+        with open(path, 'r') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        # Partially visible write on some filesystems; pick it up on the next poll
+        return None, known_mtime
+    _note_snapshot(snapshot)
+    return snapshot, mtime
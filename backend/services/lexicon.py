@@ -0,0 +1,148 @@
+"""
+Lexicon sentiment tier.
+
+A dictionary scorer in the spirit of Loughran-McDonald: count finance-specific
+positive and negative words (negated when "not"/"no"/"never"/... occurs in the
+three preceding tokens) and turn the balance into the same
+{'label', 'confidence', 'score'} records FinBERT produces. A whole batch is
+scored with one token-to-polarity lookup and bincount reductions, so it costs
+microseconds per headline instead of a transformer forward pass.
+
+The built-in word lists are a compact subset of the Loughran-McDonald
+categories. Set LEXICON_PATH to the Loughran-McDonald Master Dictionary CSV
+(columns Word, Positive, Negative; non-zero marks membership) to use the full
+lists instead.
+"""
+from __future__ import annotations
+
+import csv
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+POSITIVE = """
+able abundance acclaimed accomplish accomplished achieve achieved achievement advantage advantageous
+alliance attractive beat beats benefit beneficial best better bolster bolstered boom booming boost boosted
+breakthrough bullish collaborate confident constructive creative delight delighted dependable
+efficiency efficient empower enable enhance enhanced enjoy enthusiasm excellent exceed exceeded exceeds
+exceptional excited exciting expand expansion favorable gain gained gains good great greater growth
+happy high higher highest honor ideal impressive improve improved improvement improves improving
+incredible innovative insightful jump jumped leadership leading lucrative opportunities opportunity
+optimistic outperform outperformed outperforms outstanding perfect pleased popular positive premium
+profit profitable profitability progress prosper rally rallied rebound rebounded record recover recovered
+recovery resolve resolved reward rewarding rise rises rising robust soar soared soaring solid stability
+stable strength strengthen strengthened strong stronger strongest succeed succeeded success successful
+superior surge surged surges surpass surpassed tops upbeat upgrade upgraded upgrades upside upturn
+valuable win winner winning wins
+"""
+
+NEGATIVE = """
+abandon abandoned adverse allegation allegations alleged bad bankrupt bankruptcy bearish breach
+burden caution cautious challenge challenges closure collapse collapsed complaint concern concerns
+crash crashed crisis critical criticism cut cuts damage damaged decline declined declines declining decrease
+decreased default defaulted deficit delay delayed delays deteriorate deteriorated deterioration difficult
+difficulty dip disappoint disappointed disappointing disappointment dispute down downgrade downgraded
+downgrades downturn drop dropped drops erode eroded fail failed failing failure fall fallen falling falls
+fined fraud halt halted hurt impair impaired impairment investigation lawsuit layoff layoffs litigation
+lose loses losing loss losses low lower lowest miss missed misses negative penalty plunge plunged plunges
+poor pressure probe problem problems recall recession resign resigned risk risks selloff shortfall
+shrink shrinking shut slow slowdown slower slump slumped slumps sluggish slip slipped struggle struggles
+suspend suspended tumble tumbled uncertain uncertainty underperform underperformed unfavorable unprofitable
+volatile volatility warn warned warning weak weaken weakened weaker weakness worse worst writedown
+"""
+
+NEGATORS = frozenset('not no never none neither nor without cannot nobody nothing'.split())
+_TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+_NEGATION_WINDOW = 3
+
+_lock = threading.Lock()
+_vocab: Optional[Dict[str, int]] = None
+
+
+def _load_master_dictionary(path: str) -> Dict[str, int]:
+    vocab: Dict[str, int] = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            word = (row.get('Word') or '').strip().lower()
+            if not word:
+                continue
+            if (row.get('Negative') or '0').strip() not in ('0', ''):
+                vocab[word] = -1
+            elif (row.get('Positive') or '0').strip() not in ('0', ''):
+                vocab[word] = 1
+    return vocab
+
+
+def vocabulary() -> Dict[str, int]:
+    """word -> +1 / -1 (negators map to 2 so one lookup classifies every token)."""
+    global _vocab
+    if _vocab is None:
+        with _lock:
+            if _vocab is None:
+                path = os.getenv('LEXICON_PATH')
+                vocab: Dict[str, int] = {}
+                if path:
+                    try:
+                        vocab = _load_master_dictionary(path)
+                        print(f"[OK] Loaded {len(vocab)} lexicon words from {path}")
+                    except Exception as e:
+                        print(f"[WARNING] Could not load LEXICON_PATH ({e}); using built-in word lists")
+                if not vocab:
+                    vocab = {w: 1 for w in POSITIVE.split()}
+                    vocab.update({w: -1 for w in NEGATIVE.split()})
+                vocab.update({w: 2 for w in NEGATORS})
+                _vocab = vocab
+    return _vocab
+
+
+def _polarity_counts(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-text counts of positive and negative hits, after negation."""
+    vocab = vocabulary()
+    tokens: List[str] = []
+    owner: List[int] = []
+    for i, text in enumerate(texts):
+        found = _TOKEN.findall((text or '').lower())
+        tokens.extend(found)
+        owner.extend([i] * len(found))
+    n = len(texts)
+    if not tokens:
+        return np.zeros(n), np.zeros(n)
+
+    owner_arr = np.asarray(owner, dtype=np.int64)
+    classes = np.fromiter((vocab.get(t, 0) for t in tokens), dtype=np.int8, count=len(tokens))
+    negator = classes == 2
+    polarity = np.where(negator, 0, classes).astype(np.int8)
+    # A word is negated when a negator of the same text sits in the preceding window
+    negated = np.zeros(len(tokens), dtype=bool)
+    for lag in range(1, _NEGATION_WINDOW + 1):
+        negated[lag:] |= negator[:-lag] & (owner_arr[lag:] == owner_arr[:-lag])
+    polarity = np.where(negated, -polarity, polarity)
+
+    positive = np.bincount(owner_arr, weights=(polarity > 0), minlength=n)
+    negative = np.bincount(owner_arr, weights=(polarity < 0), minlength=n)
+    return positive, negative
+
+
+def analyze_texts(texts: List[str]) -> List[Dict[str, Any]]:
+    """FinBERT-compatible records (label/confidence/score) for `texts`."""
+    if not texts:
+        return []
+    positive, negative = _polarity_counts(texts)
+    hits = positive + negative
+    net = np.divide(positive - negative, hits, out=np.zeros_like(hits), where=hits > 0)
+    # More matched words -> more confident, capped below FinBERT's typical certainty
+    strength = np.minimum(0.9, 0.45 + 0.15 * hits)
+    results = []
+    for n, s, h in zip(net, strength, hits):
+        if h == 0 or abs(n) < 0.2:
+            results.append({'label': 'neutral', 'confidence': float(0.5 if h == 0 else s), 'score': 0.0})
+        else:
+            confidence = float(s * abs(n))
+            label = 'positive' if n > 0 else 'negative'
+            results.append({'label': label, 'confidence': confidence,
+                            'score': confidence if n > 0 else -confidence})
+    return results
@@ -0,0 +1,268 @@
+"""
+Market-data providers.
+
+Every price/quote lookup in the app goes through a MarketDataProvider so the
+source can be swapped by configuration without touching endpoint code:
+
+    MARKET_DATA_PROVIDER=yfinance        (default) live Yahoo Finance
+    MARKET_DATA_PROVIDER=file            offline CSV/Parquet archives in MARKET_DATA_DIR
+    MARKET_DATA_PROVIDER=pkg.mod:Class   any importable provider class
+
+Providers are bulk-first: download() returns many symbols and fields in one
+call as a DataFrame with (field, symbol) MultiIndex columns, the same layout
+yf.download produces.
+"""
+from __future__ import annotations
+
+import abc
+import glob
+import importlib
+import os
+import threading
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+import pandas as pd
+
+from services import metrics
+from services.governor import EmptyResponseError, get_governor
+
+
+DEFAULT_FIELDS = ('Adj Close',)
+OHLCV_FIELDS = ('Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume')
+
+# yfinance period strings -> calendar offset used when slicing archives
+_PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1), '5d': pd.DateOffset(days=7), '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3), '6mo': pd.DateOffset(months=6), '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2), '5y': pd.DateOffset(years=5), '10y': pd.DateOffset(years=10),
+    '20y': pd.DateOffset(years=20), 'ytd': None, 'max': None,
+}
+
+
+class MarketDataProvider(abc.ABC):
+    """Interface for price sources; a subclass missing download/history/info cannot be instantiated."""
+
+    name = 'base'
+
+    @abc.abstractmethod
+    def download(self, symbols: Sequence[str], start: str | None = None, end: str | None = None,
+                 fields: Iterable[str] = DEFAULT_FIELDS) -> pd.DataFrame:
+        """Daily bars for many symbols: date index, (field, symbol) MultiIndex columns. `end` is exclusive."""
+
+    @abc.abstractmethod
+    def history(self, symbol: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+        """OHLCV history for one symbol with Open/High/Low/Close/Volume columns."""
+
+    @abc.abstractmethod
+    def info(self, symbol: str) -> Dict[str, object]:
+        """Quote/fundamental fields using yfinance `Ticker.info` key names."""
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Yahoo Finance via yfinance; every call is rate-limited and retried by the upstream governor."""
+
+    name = 'yfinance'
+
+    def _call(self, call: str, fn):
+        def attempt():
+            metrics.inc('upstream_requests_total', provider=self.name, call=call)
+            try:
+                return fn()
+            except Exception:
+                metrics.inc('upstream_errors_total', provider=self.name, call=call)
+                raise
+        return get_governor(self.name).call(attempt, call=call)
+
+    def download(self, symbols, start=None, end=None, fields=DEFAULT_FIELDS):
+        import yfinance as yf
+
+        symbols = list(symbols)
+        fields = list(fields)
+
+        def fetch():
+            data = yf.download(tickers=symbols, start=start, end=end, auto_adjust=False, progress=False)
+            # yf.download reports failed symbols as missing/NaN columns instead of raising
+            if symbols and (data is None or data.dropna(how='all').empty):
+                raise EmptyResponseError(f'{self.name} returned no data for {len(symbols)} symbols')
+            return data
+
+        data = self._call('download', fetch)
+        if not isinstance(data.columns, pd.MultiIndex):
+            # Older yfinance versions return flat field columns for a single ticker
+            data.columns = pd.MultiIndex.from_product([data.columns, symbols[:1]])
+        return data[fields]
+
+    def history(self, symbol, period='1y', interval='1d'):
+        import yfinance as yf
+
+        return self._call('history', lambda: yf.Ticker(symbol).history(period=period, interval=interval))
+
+    def info(self, symbol):
+        import yfinance as yf
+
+        return self._call('info', lambda: yf.Ticker(symbol).info)
+
+
+def archive_key(symbol: str) -> str:
+    """File-name stem used by YahooFinanceService.download_all_data_to_csv for a symbol."""
+    return symbol.replace('.', '_').replace('^', '')
+
+
+class FileProvider(MarketDataProvider):
+    """
+    Offline provider over per-symbol CSV/Parquet archives.
+
+    Files are matched by archive_key(symbol), e.g. RELIANCE_NS_20years.csv or
+    RELIANCE_NS.parquet, with the column layout written by
+    download_all_data_to_csv (date, open, high, low, close, volume; an
+    optional adj_close column is used for 'Adj Close' when present).
+    """
+
+    name = 'file'
+
+    def __init__(self, root: str | None = None):
+        self.root = root or os.getenv('MARKET_DATA_DIR', 'data')
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def _path_for(self, symbol: str) -> Optional[str]:
+        key = archive_key(symbol)
+        candidates = []
+        for ext in ('parquet', 'csv'):
+            candidates += glob.glob(os.path.join(self.root, f'{glob.escape(key)}.{ext}'))
+            candidates += glob.glob(os.path.join(self.root, f'{glob.escape(key)}_*.{ext}'))
+        # Prefer the longest archive when several exist (e.g. _5years vs _20years)
+        return max(candidates, key=os.path.getsize) if candidates else None
+
+    def _frame(self, symbol: str) -> pd.DataFrame:
+        cached = self._frames.get(symbol)
+        if cached is not None:
+            return cached
+        path = self._path_for(symbol)
+        if path is None:
+            raise FileNotFoundError(f'No archive for {symbol} in {self.root}')
+        if path.endswith('.parquet'):
+            raw = pd.read_parquet(path)
+        else:
+            raw = pd.read_csv(path)
+        raw.columns = [str(c).strip().lower().replace(' ', '_') for c in raw.columns]
+        if 'date' in raw.columns:
+            index = pd.to_datetime(raw['date'])
+        else:
+            index = pd.to_datetime(raw['timestamp'], unit='s')
+        frame = pd.DataFrame({
+            'Open': raw.get('open'),
+            'High': raw.get('high'),
+            'Low': raw.get('low'),
+            'Close': raw['close'],
+            # Archives are written from auto-adjusted history, so Close is already adjusted
+            'Adj Close': raw['adj_close'] if 'adj_close' in raw.columns else raw['close'],
+            'Volume': raw.get('volume'),
+        })
+        frame.index = pd.DatetimeIndex(index.values, name='Date')
+        frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+        with self._lock:
+            self._frames[symbol] = frame
+        return frame
+
+    def download(self, symbols, start=None, end=None, fields=DEFAULT_FIELDS):
+        fields = list(fields)
+        pieces = {}
+        for symbol in symbols:
+            try:
+                frame = self._frame(symbol)
+            except FileNotFoundError:
+                continue
+            if start:
+                frame = frame[frame.index >= pd.Timestamp(start)]
+            if end:
+                frame = frame[frame.index < pd.Timestamp(end)]
+            pieces[symbol] = frame[fields]
+        if not pieces:
+            columns = pd.MultiIndex.from_product([fields, list(symbols)])
+            return pd.DataFrame(columns=columns, dtype=float)
+        data = pd.concat(pieces, axis=1)  # (symbol, field)
+        return data.swaplevel(0, 1, axis=1).reindex(columns=fields, level=0)
+
+    def history(self, symbol, period='1y', interval='1d'):
+        try:
+            frame = self._frame(symbol)
+        except FileNotFoundError:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        frame = frame[['Open', 'High', 'Low', 'Close', 'Volume']]
+        if frame.empty:
+            return frame
+        if interval not in ('1d', '1wk', '1mo'):
+            # Archives are daily; there is no intraday data to replay
+            return frame.iloc[0:0]
+        last = frame.index[-1]
+        if period == 'ytd':
+            frame = frame[frame.index >= pd.Timestamp(year=last.year, month=1, day=1)]
+        elif _PERIOD_OFFSETS.get(period) is not None:
+            frame = frame[frame.index > last - _PERIOD_OFFSETS[period]]
+        if interval != '1d':
+            rule = 'W-FRI' if interval == '1wk' else 'MS'
+            frame = frame.resample(rule).agg({'Open': 'first', 'High': 'max', 'Low': 'min',
+                                              'Close': 'last', 'Volume': 'sum'}).dropna(subset=['Close'])
+        return frame
+
+    def info(self, symbol):
+        frame = self._frame(symbol)
+        if frame.empty:
+            return {}
+        last = frame.iloc[-1]
+        year = frame[frame.index > frame.index[-1] - pd.DateOffset(years=1)]
+        return {
+            'longName': symbol,
+            'regularMarketPrice': float(last['Close']),
+            'previousClose': float(frame['Close'].iloc[-2]) if len(frame) > 1 else float(last['Close']),
+            'dayHigh': float(last['High']),
+            'dayLow': float(last['Low']),
+            'open': float(last['Open']),
+            'fiftyTwoWeekHigh': float(year['High'].max()),
+            'fiftyTwoWeekLow': float(year['Low'].min()),
+            'volume': int(last['Volume']) if pd.notna(last['Volume']) else 0,
+            'averageVolume': int(year['Volume'].mean()) if year['Volume'].notna().any() else 0,
+            'currency': 'INR',
+        }
+
+
+PROVIDERS: Dict[str, Callable[[], MarketDataProvider]] = {
+    'yfinance': YFinanceProvider,
+    'file': FileProvider,
+}
+
+_provider: Optional[MarketDataProvider] = None
+_provider_lock = threading.Lock()
+
+
+def register_provider(name: str, factory: Callable[[], MarketDataProvider]) -> None:
+    PROVIDERS[name] = factory
+
+
+def _build_provider(spec: str) -> MarketDataProvider:
+    if spec in PROVIDERS:
+        return PROVIDERS[spec]()
+    if ':' in spec:
+        module_name, _, attr = spec.partition(':')
+        return getattr(importlib.import_module(module_name), attr)()
+    raise ValueError(f"Unknown MARKET_DATA_PROVIDER '{spec}' (known: {', '.join(sorted(PROVIDERS))})")
+
+
+def get_provider() -> MarketDataProvider:
+    """Process-wide provider selected by MARKET_DATA_PROVIDER (built on first use)."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = _build_provider(os.getenv('MARKET_DATA_PROVIDER', 'yfinance').strip())
+                print(f"[OK] Market data provider: {_provider.name}")
+    return _provider
+
+
+def set_provider(provider: Optional[MarketDataProvider]) -> None:
+    """Swap the active provider (None re-reads configuration on next use)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
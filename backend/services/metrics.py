@@ -0,0 +1,222 @@
+"""
+In-process metrics registry exposed in Prometheus text format.
+
+Recording a sample is a dict update under a lock; all formatting work happens
+in render(), i.e. only when /api/metrics is scraped. Pipeline stages recorded
+with stage() are additionally collected per request (see begin_request_timings)
+so endpoints can report a breakdown via the Server-Timing header. The
+collection follows the request's own thread; work done for it on another
+thread (a FinBERT batch, the single-flight leader's view) is handed back and
+added with add_request_timings().
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# Latency buckets in seconds (upper bounds, +Inf is implicit)
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_meta: Dict[str, Tuple[str, str]] = {}  # name -> (type, help)
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+_histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+_gauges: Dict[str, Callable[[], float]] = {}
+# (stage, seconds) pairs for the request being served on this thread, if any
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar('request_timings', default=None)
+
+
+def _label_key(labels: Dict[str, object]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def describe(name: str, kind: str, help_text: str) -> None:
+    """Register TYPE/HELP metadata for a metric (optional, used in exposition)."""
+    _meta[name] = (kind, help_text)
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def observe(name: str, value: float, **labels) -> None:
+    key = (name, _label_key(labels))
+    idx = bisect.bisect_left(DEFAULT_BUCKETS, value)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            # per-bucket counts (+Inf last), then sum, then count
+            h = [0.0] * (len(DEFAULT_BUCKETS) + 3)
+            _histograms[key] = h
+        h[idx] += 1
+        h[-2] += value
+        h[-1] += 1
+
+
+def gauge(name: str, fn: Callable[[], float], help_text: str = '') -> None:
+    """Register a gauge whose value is computed lazily at scrape time."""
+    _gauges[name] = fn
+    describe(name, 'gauge', help_text)
+
+
+@contextmanager
+def timed(name: str, **labels) -> Iterator[None]:
+    """Observe the wall-clock duration of the enclosed block into histogram `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage into stage_duration_seconds and the current request's breakdown."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe('stage_duration_seconds', elapsed, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def begin_request_timings() -> None:
+    _request_timings.set([])
+
+
+def request_timings() -> List[Tuple[str, float]]:
+    """(stage, seconds) entries recorded so far for the current request, in order (empty if not collecting)."""
+    return list(_request_timings.get() or [])
+
+
+def add_request_timings(timings: List[Tuple[str, float]]) -> None:
+    """Add stages measured on another thread on behalf of the current request to its breakdown."""
+    current = _request_timings.get()
+    if current is not None:
+        current.extend(timings)
+
+
+def end_request_timings() -> List[Tuple[str, float]]:
+    """Stop collecting for the current request and return per-stage totals in first-seen order."""
+    timings = _request_timings.get() or []
+    _request_timings.set(None)
+    totals: Dict[str, float] = {}
+    for name, elapsed in timings:
+        totals[name] = totals.get(name, 0.0) + elapsed
+    return list(totals.items())
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    return ', '.join(f'{name};dur={elapsed * 1000.0:.1f}' for name, elapsed in timings)
+
+
+def counter_value(name: str, **labels) -> float:
+    with _lock:
+        return _counters.get((name, _label_key(labels)), 0.0)
+
+
+def _fmt_labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ''
+    parts = []
+    for k, v in items:
+        v = v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{k}="{v}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return '+Inf' if v > 0 else '-Inf'
+    if math.isnan(v):
+        return 'NaN'
+    return repr(float(v))
+
+
+def render() -> str:
+    """Render every registered metric in Prometheus text exposition format (v0.0.4)."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+
+    lines: List[str] = []
+    emitted = set()
+
+    def header(name: str, default_kind: str) -> None:
+        if name in emitted:
+            return
+        emitted.add(name)
+        kind, help_text = _meta.get(name, (default_kind, ''))
+        if help_text:
+            lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, 'counter')
+        lines.append(f'{name}{_fmt_labels(labels)} {_fmt_value(value)}')
+
+    bounds = [_fmt_value(b) for b in DEFAULT_BUCKETS] + ['+Inf']
+    for (name, labels), h in sorted(histograms.items()):
+        header(name, 'histogram')
+        cumulative = 0.0
+        for bound, count in zip(bounds, h[:-2]):
+            cumulative += count
+            lines.append(f'{name}_bucket{_fmt_labels(labels, (("le", bound),))} {_fmt_value(cumulative)}')
+        lines.append(f'{name}_sum{_fmt_labels(labels)} {_fmt_value(h[-2])}')
+        lines.append(f'{name}_count{_fmt_labels(labels)} {_fmt_value(h[-1])}')
+
+    for name, fn in sorted(_gauges.items()):
+        try:
+            value = float(fn())
+        except Exception:
+            continue
+        header(name, 'gauge')
+        lines.append(f'{name} {_fmt_value(value)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _sentiment_cache_hit_ratio() -> float:
+    hits = counter_value('sentiment_cache_requests_total', result='hit')
+    misses = counter_value('sentiment_cache_requests_total', result='miss')
+    total = hits + misses
+    return hits / total if total else 0.0
+
+
+describe('http_request_duration_seconds', 'histogram', 'Flask request latency by route, method and status.')
+describe('stage_duration_seconds', 'histogram', 'Duration of internal pipeline stages.')
+describe('upstream_requests_total', 'counter', 'Calls made to upstream data providers.')
+describe('upstream_errors_total', 'counter', 'Failed calls to upstream data providers.')
+describe('upstream_retries_total', 'counter', 'Upstream calls retried after a failure (with backoff).')
+describe('upstream_rejected_total', 'counter', 'Upstream calls refused by the governor (circuit_open, rate_limited, concurrency).')
+describe('sentiment_cache_requests_total', 'counter', 'Sentiment result cache lookups by result (hit/miss).')
+describe('price_panel_requests_total', 'counter', 'Adjusted-close lookups served from the shared price panel (hit) or the provider (miss).')
+describe('scheduler_job_duration_seconds', 'histogram', 'Duration of background scheduler job runs.')
+describe('singleflight_requests_total', 'counter', 'Coalesced requests by role (leader ran the view, follower shared its result).')
+describe('result_cache_requests_total', 'counter', 'Analytics result cache lookups by route and result (hit/miss).')
+describe('scheduler_job_runs_total', 'counter', 'Background scheduler job runs by outcome.')
+describe('sentiment_degraded_total', 'counter', 'Sentiment lookups answered without FinBERT by reason (lexicon while loading, returns proxy).')
+describe('sentiment_batches_total', 'counter', 'FinBERT forward passes run by the sentiment micro-batcher.')
+describe('sentiment_batch_texts_total', 'counter', 'Texts scored by those forward passes (divide by batches for the mean batch size).')
+describe('sentiment_texts_filtered_total', 'counter', 'Headlines kept away from FinBERT by reason (irrelevant, duplicate).')
+describe('article_store_requests_total', 'counter', 'News lookups answered from the local article store (hit) or the providers (miss).')
+describe('articles_ingested_total', 'counter', 'New articles written to the local article store by the ingester.')
+describe('sentiment_tier_texts_total', 'counter', 'Texts scored by sentiment tier (finbert, including cache hits, or lexicon).')
+describe('sentiment_tier_fallbacks_total', 'counter', 'tier=auto calls routed to the lexicon by reason (model_not_ready, queue_depth, latency_budget).')
+describe('indicator_refreshes_total', 'counter', 'Indicator publications by mode (incremental: only new bars applied, rebuild: full history).')
+describe('screener_builds_total', 'counter', 'Screener tables built (once per new panel, indicator publication or quote snapshot).')
+describe('risk_paths_total', 'counter', 'Monte Carlo paths simulated for /api/portfolio_var.')
+describe('lazy_import_seconds', 'histogram', 'Time spent importing heavy optional libraries on first use.')
+gauge('sentiment_cache_hit_ratio', _sentiment_cache_hit_ratio, 'Share of sentiment lookups served from cache.')
@@ -5,10 +5,13 @@ from typing import List, Dict, Any
 import requests
 import time
 
+from services import metrics
 
-NEWSAPI_ENDPOINT = "https://newsapi.org/v2/everything"
-MEDIASTACK_ENDPOINT = "https://api.mediastack.com/v1/news"
-TWITTER_API_V2_ENDPOINT = "https://api.twitter.com/2/tweets/search/recent"
+
+# Endpoints can be overridden (e.g. to point the load-test harness at local stand-ins)
+NEWSAPI_ENDPOINT = os.getenv('NEWSAPI_ENDPOINT', "https://newsapi.org/v2/everything")
+MEDIASTACK_ENDPOINT = os.getenv('MEDIASTACK_ENDPOINT', "https://api.mediastack.com/v1/news")
+TWITTER_API_V2_ENDPOINT = os.getenv('TWITTER_API_V2_ENDPOINT', "https://api.twitter.com/2/tweets/search/recent")
 
 # Mapping from ticker to NewsAPI query keywords (use company names for better matches)
 TICKER_QUERY_MAP = {
@@ -80,6 +83,7 @@ def _fetch_newsapi(ticker: str, query: str, from_date: datetime, to_date: dateti
     }
     for attempt in range(3):
         try:
+            metrics.inc('upstream_requests_total', provider='newsapi', call='everything')
             resp = requests.get(NEWSAPI_ENDPOINT, params=params, timeout=15)
             if resp.status_code == 200:
                 payload = resp.json()
@@ -95,10 +99,12 @@ def _fetch_newsapi(ticker: str, query: str, from_date: datetime, to_date: dateti
                 break
             elif resp.status_code == 401:
                 # Invalid API key - don't retry
+                metrics.inc('upstream_errors_total', provider='newsapi', call='everything')
                 break
             else:
                 resp.raise_for_status()
         except requests.RequestException:
+            metrics.inc('upstream_errors_total', provider='newsapi', call='everything')
             if attempt < 2:
                 time.sleep(1.5 * (attempt + 1))
                 continue
@@ -120,6 +126,7 @@ def _fetch_mediastack(ticker: str, query: str, from_date: datetime, to_date: dat
     }
     for attempt in range(3):
         try:
+            metrics.inc('upstream_requests_total', provider='mediastack', call='news')
             resp = requests.get(MEDIASTACK_ENDPOINT, params=params, timeout=15)
             resp.raise_for_status()
             payload = resp.json()
@@ -134,6 +141,7 @@ def _fetch_mediastack(ticker: str, query: str, from_date: datetime, to_date: dat
                 })
             break
         except requests.RequestException:
+            metrics.inc('upstream_errors_total', provider='mediastack', call='news')
             if attempt < 2:
                 time.sleep(1.5 * (attempt + 1))
                 continue
@@ -166,6 +174,7 @@ def _fetch_twitter(ticker: str, query: str, lookback_days: int, max_results: int
     
     for attempt in range(3):
         try:
+            metrics.inc('upstream_requests_total', provider='twitter', call='search_recent')
             resp = requests.get(TWITTER_API_V2_ENDPOINT, params=params, headers=headers, timeout=15)
             resp.raise_for_status()
             payload = resp.json()
@@ -188,6 +197,7 @@ def _fetch_twitter(ticker: str, query: str, lookback_days: int, max_results: int
                 })
             break
         except requests.RequestException as e:
+            metrics.inc('upstream_errors_total', provider='twitter', call='search_recent')
             if attempt < 2:
                 time.sleep(2 * (attempt + 1))
                 continue
@@ -214,7 +224,19 @@ def _deduplicate_articles(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]
     return unique
 
 
+def configured() -> bool:
+    """Whether any news provider has credentials (fetch_news_for_tickers raises otherwise)."""
+    newsapi_key = os.getenv('NEWSAPI_KEY')
+    return bool((newsapi_key and len(newsapi_key.strip()) >= 10) or os.getenv('MEDIASTACK_KEY')
+                or os.getenv('APILAYER_KEY') or os.getenv('TWITTER_BEARER_TOKEN'))
+
+
 def fetch_news_for_tickers(tickers: List[str], lookback_days: int = 7, page_size: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+    with metrics.stage('fetch_news_for_tickers'):
+        return _fetch_news_for_tickers(tickers, lookback_days, page_size)
+
+
+def _fetch_news_for_tickers(tickers: List[str], lookback_days: int, page_size: int) -> Dict[str, List[Dict[str, Any]]]:
     newsapi_key = os.getenv('NEWSAPI_KEY')
     mediastack_key = os.getenv('MEDIASTACK_KEY') or os.getenv('APILAYER_KEY')
     twitter_bearer = os.getenv('TWITTER_BEARER_TOKEN')
@@ -0,0 +1,188 @@
+"""
+Memory-mapped adjusted-close panel shared by all worker processes.
+
+A publisher (the scheduler's panel refresh) writes the whole date x symbol
+panel as a single .npy array plus a JSON index, then atomically repoints the
+CURRENT file at the new version. Workers attach with np.load(mmap_mode='r'),
+so every process maps the same page-cache pages instead of holding its own
+pandas copy; only the slice a request asks for is materialised.
+
+Configuration:
+    PRICE_PANEL_ENABLED        '1' (default) to serve fetch_adjusted_close from the panel
+    PRICE_PANEL_DIR            panel directory (default cache/panel)
+    PRICE_PANEL_DTYPE          float64 (default) or float32 to halve resident memory
+    PRICE_PANEL_MAX_AGE_HOURS  before a quote snapshot is loaded, open-ended requests (no `end`)
+                               use the panel only if it is younger than this (default 24)
+
+Open-ended requests are served from the panel only while it holds the latest
+trading session of the current quote snapshot (leader.snapshot_session());
+once the leader's quotes reach a new session, they go to the provider until
+the panel is rebuilt.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from services import leader, metrics
+from services.market_data import get_provider
+
+
+PANEL_DIR = os.getenv('PRICE_PANEL_DIR', os.path.join('cache', 'panel'))
+CURRENT_FILE = 'CURRENT'
+# How often readers stat CURRENT to notice a newly published version
+_RECHECK_SECONDS = 5.0
+
+
+def enabled() -> bool:
+    return os.getenv('PRICE_PANEL_ENABLED', '1') == '1'
+
+
+class PricePanel:
+    """Read-only view over one published panel version."""
+
+    def __init__(self, version: str, values: np.ndarray, symbols: List[str], dates: pd.DatetimeIndex,
+                 published_at: float):
+        self.version = version
+        self.values = values  # (T, N) memory-mapped array
+        self.symbols = symbols
+        self.dates = dates
+        self.published_at = published_at
+        self._columns: Dict[str, int] = {s: i for i, s in enumerate(symbols)}
+
+    @classmethod
+    def attach(cls, directory: str = PANEL_DIR) -> Optional['PricePanel']:
+        try:
+            with open(os.path.join(directory, CURRENT_FILE), 'r') as f:
+                version = f.read().strip()
+            with open(os.path.join(directory, f'panel-{version}.json'), 'r') as f:
+                meta = json.load(f)
+            values = np.load(os.path.join(directory, f'panel-{version}.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        return cls(version, values, meta['symbols'], pd.DatetimeIndex(pd.to_datetime(meta['dates'])),
+                   float(meta['published_at']))
+
+    def is_fresh(self) -> bool:
+        max_age = float(os.getenv('PRICE_PANEL_MAX_AGE_HOURS', '24')) * 3600.0
+        return (time.time() - self.published_at) <= max_age
+
+    def is_current(self) -> bool:
+        """Whether the panel reaches the latest session of the quote snapshot (its age, until one is loaded)."""
+        session = leader.snapshot_session()
+        if session is None:
+            return self.is_fresh()
+        return len(self.dates) > 0 and self.dates[-1] >= pd.Timestamp(session)
+
+    def has_symbols(self, symbols: Sequence[str]) -> bool:
+        return len(self.dates) > 0 and all(s in self._columns for s in symbols)
+
+    def covers(self, symbols: Sequence[str], start: str | None = None, end: str | None = None) -> bool:
+        if not self.has_symbols(symbols):
+            return False
+        if start is not None and pd.Timestamp(start) < self.dates[0]:
+            return False
+        if end is None:
+            return self.is_current()
+        # `end` is exclusive; the panel must reach the last session before it
+        return pd.Timestamp(end) <= self.dates[-1] + pd.Timedelta(days=1) or self.is_current()
+
+    def frame(self, symbols: Sequence[str], start: str | None = None, end: str | None = None) -> pd.DataFrame:
+        lo = 0 if start is None else int(self.dates.searchsorted(pd.Timestamp(start), side='left'))
+        hi = len(self.dates) if end is None else int(self.dates.searchsorted(pd.Timestamp(end), side='left'))
+        cols = [self._columns[s] for s in symbols]
+        block = np.asarray(self.values[lo:hi, cols], dtype=np.float64)
+        return pd.DataFrame(block, index=self.dates[lo:hi], columns=list(symbols))
+
+
+def publish(adj_close: pd.DataFrame, directory: str = PANEL_DIR, dtype: str | None = None, keep: int = 2) -> str:
+    """Write `adj_close` (date index, symbol columns) as a new panel version and make it current."""
+    dtype = dtype or os.getenv('PRICE_PANEL_DTYPE', 'float64')
+    os.makedirs(directory, exist_ok=True)
+    version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    adj_close = adj_close.sort_index()
+
+    values = np.ascontiguousarray(adj_close.to_numpy(dtype=dtype))
+    npy_tmp = os.path.join(directory, f'panel-{version}.npy.tmp')
+    with open(npy_tmp, 'wb') as f:
+        np.save(f, values)
+    os.replace(npy_tmp, os.path.join(directory, f'panel-{version}.npy'))
+
+    meta = {
+        'version': version,
+        'symbols': [str(c) for c in adj_close.columns],
+        'dates': [d.strftime('%Y-%m-%d') for d in adj_close.index],
+        'dtype': dtype,
+        'published_at': time.time(),
+    }
+    with open(os.path.join(directory, f'panel-{version}.json'), 'w') as f:
+        json.dump(meta, f)
+
+    current_tmp = os.path.join(directory, f'{CURRENT_FILE}.{os.getpid()}.tmp')
+    with open(current_tmp, 'w') as f:
+        f.write(version)
+    os.replace(current_tmp, os.path.join(directory, CURRENT_FILE))
+
+    _prune(directory, keep)
+    return version
+
+
+def _prune(directory: str, keep: int) -> None:
+    versions = sorted(f[len('panel-'):-len('.json')] for f in os.listdir(directory)
+                      if f.startswith('panel-') and f.endswith('.json'))
+    for version in versions[:-keep]:
+        for ext in ('npy', 'json'):
+            try:
+                os.remove(os.path.join(directory, f'panel-{version}.{ext}'))
+            except OSError:
+                # Still mapped by a reader on Windows; retried on the next publish
+                pass
+
+
+def build(symbols: Sequence[str], years: int = 20, directory: str = PANEL_DIR) -> Optional[str]:
+    """Download `years` of adjusted closes for `symbols` in one bulk call and publish them."""
+    start = (pd.Timestamp.today() - pd.DateOffset(years=years)).strftime('%Y-%m-%d')
+    with metrics.stage('price_panel_build'):
+        data = get_provider().download(list(symbols), start=start, fields=['Adj Close'])['Adj Close']
+        data = data.dropna(how='all')
+        if data.empty:
+            print("[ERR] Price panel build returned no data")
+            return None
+        version = publish(data, directory)
+    print(f"[OK] Price panel {version} published ({data.shape[1]} symbols x {data.shape[0]} days)")
+    return version
+
+
+_current: Optional[PricePanel] = None
+_current_checked = 0.0
+_current_mtime = None
+_current_lock = threading.Lock()
+
+
+def current_panel(directory: str = PANEL_DIR) -> Optional[PricePanel]:
+    """The latest published panel, re-attached when CURRENT changes (checked every few seconds)."""
+    global _current, _current_checked, _current_mtime
+    now = time.monotonic()
+    if now - _current_checked < _RECHECK_SECONDS:
+        return _current
+    with _current_lock:
+        if now - _current_checked < _RECHECK_SECONDS:
+            return _current
+        _current_checked = now
+        try:
+            mtime = os.stat(os.path.join(directory, CURRENT_FILE)).st_mtime_ns
+        except OSError:
+            _current, _current_mtime = None, None
+            return None
+        if mtime != _current_mtime or _current is None:
+            panel = PricePanel.attach(directory)
+            if panel is not None:
+                _current, _current_mtime = panel, mtime
+        return _current
@@ -0,0 +1,48 @@
+"""
+On-demand cProfile capture for a single request.
+
+Profiling is admin-only: it is enabled by setting ADMIN_TOKEN on the server
+and sending the same value in the X-Admin-Token header together with
+?profile=1 (store only) or ?profile=inline (store and return the report).
+"""
+from __future__ import annotations
+
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+from datetime import datetime
+from typing import Optional
+
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join('cache', 'profiles'))
+PROFILE_TOP_N = 40
+
+
+def profiling_requested(mode: Optional[str], admin_token: Optional[str]) -> bool:
+    expected = os.getenv('ADMIN_TOKEN')
+    if not mode or mode == '0' or not expected or not admin_token:
+        return False
+    return hmac.compare_digest(expected, admin_token)
+
+
+def start() -> cProfile.Profile:
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def finish(profiler: cProfile.Profile, label: str) -> tuple[str, str]:
+    """Stop profiling, persist the raw .prof file and return (path, top-N cumulative report)."""
+    profiler.disable()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe_label = re.sub(r'[^A-Za-z0-9_-]+', '_', label).strip('_') or 'root'
+    path = os.path.join(PROFILE_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{safe_label}.prof")
+    profiler.dump_stats(path)
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP_N)
+    return path, out.getvalue()
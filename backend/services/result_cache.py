@@ -0,0 +1,208 @@
+"""
+Response cache for analytics endpoints.
+
+Analytics results are a pure function of the request parameters and the
+market data they were computed from, so a finished response is stored under
+a hash of
+
+    route + normalized parameters + market-data version + Accept/Accept-Encoding
+
+Parameters are normalized before hashing: omitted values take the endpoint's
+defaults, numbers are coerced to the default's type, start/end dates are
+resolved to YYYY-MM-DD and, where the response does not depend on it, ticker
+order is ignored. The data version is the published price panel version (see
+price_panel) or, when the panel is disabled, the version of the quote
+snapshot this process serves (see leader), so entries stop matching as soon
+as new bars land. Entries are evicted LRU once the cache
+exceeds RESULT_CACHE_MAX_MB and expire after RESULT_CACHE_TTL_SECONDS, which
+bounds the staleness of news/sentiment inputs.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from flask import current_app, request
+
+from services import leader, metrics, price_panel
+
+
+class _Entry:
+    __slots__ = ('body', 'status', 'headers', 'size', 'expires')
+
+    def __init__(self, body: bytes, status: int, headers: List[Tuple[str, str]], expires: float):
+        self.body = body
+        self.status = status
+        self.headers = headers
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers) + 200
+        self.expires = expires
+
+
+class ResultCache:
+    """Byte-bounded LRU with per-entry expiry."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def bytes_used(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, body: bytes, status: int, headers: List[Tuple[str, str]]) -> None:
+        entry = _Entry(body, status, headers, time.monotonic() + self.ttl_seconds)
+        # One oversized result must not flush everything else
+        if entry.size > self.max_bytes // 4:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+_cache = ResultCache(max_bytes=int(float(os.getenv('RESULT_CACHE_MAX_MB', '128')) * 1024 * 1024),
+                     ttl_seconds=float(os.getenv('RESULT_CACHE_TTL_SECONDS', '900')))
+
+
+def enabled() -> bool:
+    return os.getenv('RESULT_CACHE_ENABLED', '1') == '1'
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+def market_data_version() -> str:
+    """Stamp that changes whenever new market data becomes visible to this process."""
+    if price_panel.enabled():
+        panel = price_panel.current_panel()
+        if panel is not None:
+            return f'panel:{panel.version}'
+    snapshot = leader.snapshot_version()
+    if snapshot is not None:
+        return f'snapshot:{snapshot}'
+    return f'day:{date.today().isoformat()}'
+
+
+def normalize_params(params: Dict[str, Any], defaults: Dict[str, Any],
+                     unordered: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Canonical form of request parameters. Raises ValueError for values the
+    endpoint would reject anyway, in which case the request bypasses the cache.
+    """
+    out: Dict[str, Any] = dict(defaults)
+    for name, value in params.items():
+        if name in ('debug', 'profile'):
+            continue
+        default = defaults.get(name)
+        if isinstance(default, bool):
+            value = bool(value)
+        elif isinstance(default, int) and value is not None:
+            value = int(value)
+        elif isinstance(default, float) and value is not None:
+            value = float(value)
+        out[name] = value
+    for name in ('start', 'end'):
+        if out.get(name):
+            out[name] = pd.Timestamp(out[name]).strftime('%Y-%m-%d')
+    for name in unordered:
+        if isinstance(out.get(name), list):
+            out[name] = sorted(out[name], key=str)
+    return out
+
+
+def cache_key(route: str, params: Dict[str, Any], data_version: Optional[str]) -> str:
+    # Representation headers and POST query flags (e.g. ?format=) select different response bytes
+    representation = [request.headers.get('Accept', ''), request.headers.get('Accept-Encoding', ''),
+                      sorted(request.args.items()) if request.method != 'GET' else []]
+    canonical = json.dumps([route, params, data_version, representation],
+                           sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def cached_result(defaults: Optional[Dict[str, Any]] = None, unordered: Sequence[str] = (),
+                  market_data: bool = True) -> Callable:
+    """
+    Flask view decorator serving repeated requests from the result cache.
+
+    defaults    parameter defaults of the view (used to normalize omitted/typed values)
+    unordered   list parameters whose order does not affect the response
+    market_data False for views that only transform their input (no data version in the key)
+    """
+    defaults = defaults or {}
+
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not enabled() or 'profiling.profiler' in request.environ:
+                return view(*args, **kwargs)
+            route = request.url_rule.rule if request.url_rule is not None else request.path
+            if request.method == 'GET':
+                params = request.args.to_dict()
+            else:
+                params = request.get_json(force=True, silent=True) or {}
+            try:
+                normalized = normalize_params(dict(params, **kwargs), defaults, unordered)
+            except (TypeError, ValueError):
+                return view(*args, **kwargs)
+            key = cache_key(route, normalized, market_data_version() if market_data else None)
+
+            with metrics.stage('result_cache'):
+                entry = _cache.get(key)
+            if entry is not None:
+                metrics.inc('result_cache_requests_total', route=route, result='hit')
+                response = current_app.response_class(entry.body, status=entry.status, headers=entry.headers)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            metrics.inc('result_cache_requests_total', route=route, result='miss')
+            response = current_app.make_response(view(*args, **kwargs))
+            # Only successful results are reusable; errors may be transient upstream failures,
+            # and no-store marks results built on placeholders (e.g. FinBERT still loading)
+            if (response.status_code == 200 and not response.is_streamed
+                    and 'no-store' not in response.headers.get('Cache-Control', '')):
+                headers = [(k, v) for k, v in response.headers.items() if k.lower() != 'content-length']
+                _cache.put(key, response.get_data(), response.status_code, headers)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+metrics.gauge('result_cache_bytes', lambda: _cache.bytes_used, 'Bytes held by the analytics result cache.')
@@ -0,0 +1,336 @@
+"""
+Monte Carlo portfolio Value-at-Risk and Expected Shortfall.
+
+Daily log returns are modelled as zero-mean with covariance D C D, where C
+is the RMT-denoised correlation of the assets' recent returns (the same
+rmt_denoise_correlation /api/rmt displays) and D their daily volatilities
+(historical, EWMA or a GARCH(1,1) one-day forecast). C is factorized once
+(Cholesky; nearest positive-definite repair if denoising left it singular),
+and each path draws correlated shocks as Z L' for a block of paths at a
+time, optionally fat-tailed (multivariate Student-t). Positions are fully
+revalued, so the portfolio P&L of a path is
+
+    value * sum_i w_i * (exp(sqrt(h) * sigma_i * x_i) - 1)
+
+Memory is bounded twice: paths are sampled in chunks of about
+RISK_CHUNK_MB, and each chunk only hands back its worst losses (as many as
+the widest tail asked for needs), since the union of the per-chunk tails
+contains the overall tail. Paths come in antithetic pairs (x, -x), halving
+the draws and the matrix product, and are sampled in float32 by default
+(RISK_DTYPE); the sampling error of even a million paths is orders of
+magnitude above float32 rounding. Each chunk has its own seed spawned from
+the request's seed, so a result does not depend on how many processes ran
+it: above RISK_POOL_MIN_PATHS paths the chunks are spread over a spawned
+process pool of RISK_PROCESSES workers. Without an explicit path count,
+DEFAULT_PATHS run, so a request's result depends only on its parameters.
+
+Configuration:
+    RISK_MAX_PATHS       largest simulation accepted (default 2,000,000)
+    RISK_CHUNK_MB        working memory per chunk of paths (default 64)
+    RISK_PROCESSES       process pool size for large simulations (default 0: in process)
+    RISK_POOL_MIN_PATHS  paths from which the pool is used (default 1,000,000)
+    RISK_DTYPE           float32 (default) or float64 sampling
+"""
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services import lazy_imports, metrics
+from services.analytics import compute_correlation_matrix, compute_log_returns, rmt_denoise_correlation
+
+
+VOLATILITY_MODELS = ('historical', 'ewma', 'garch')
+DISTRIBUTIONS = ('normal', 'student_t')
+CORRELATIONS = ('denoised', 'sample')
+DEFAULT_LEVELS = (0.95, 0.99)
+DEFAULT_PATHS = 100_000
+DEFAULT_WINDOW = 252
+EWMA_LAMBDA = 0.94
+
+
+def max_paths() -> int:
+    return int(os.getenv('RISK_MAX_PATHS', '2000000'))
+
+
+def processes() -> int:
+    return int(os.getenv('RISK_PROCESSES', '0'))
+
+
+def dtype() -> np.dtype:
+    return np.dtype(os.getenv('RISK_DTYPE', 'float32'))
+
+
+def _chunk_paths(n_assets: int, itemsize: int) -> int:
+    budget = float(os.getenv('RISK_CHUNK_MB', '64')) * 1e6
+    # Per antithetic pair of paths: its shocks, their correlated draws and the mirrored copy
+    pairs = budget // (3 * itemsize * max(1, n_assets))
+    return int(2 * max(500, min(125_000, pairs)))
+
+
+# ---- inputs --------------------------------------------------------------------
+
+def volatilities(returns: pd.DataFrame, model: str = 'historical') -> pd.Series:
+    """Daily volatility per column of `returns` (log returns, NaN = missing)."""
+    if model == 'historical':
+        return returns.std(skipna=True)
+    if model == 'ewma':
+        # RiskMetrics sigma2_t = lambda * sigma2_{t-1} + (1 - lambda) * r_t^2 over each column's observed
+        # returns, seeded with the window's sample variance; unrolled into one weighted sum
+        r = returns.to_numpy(dtype=np.float64)
+        valid = ~np.isnan(r)
+        later = np.cumsum(valid[::-1], axis=0)[::-1] - valid  # observations after each row
+        weights = np.where(valid, (1.0 - EWMA_LAMBDA) * EWMA_LAMBDA ** later, 0.0)
+        seed = returns.var(skipna=True).to_numpy()
+        var = EWMA_LAMBDA ** valid.sum(axis=0) * seed + (weights * np.where(valid, r * r, 0.0)).sum(axis=0)
+        return pd.Series(np.sqrt(var), index=returns.columns)
+    if model == 'garch':
+        arch_model = lazy_imports.load('arch', 'arch_model')
+        out = {}
+        with metrics.stage('garch_fit'):
+            for t in returns.columns:
+                r = returns[t].dropna()
+                if len(r) < 10:
+                    out[t] = float('nan')
+                    continue
+                # Percent returns for numeric stability, as /api/garch_volatility
+                res = arch_model(r * 100.0, vol='GARCH', p=1, q=1).fit(disp='off')
+                out[t] = math.sqrt(float(res.forecast(horizon=1).variance.values[-1, 0])) / 100.0
+        return pd.Series(out)
+    raise ValueError(f"volatility must be one of {', '.join(VOLATILITY_MODELS)}")
+
+
+def correlation(returns: pd.DataFrame, kind: str = 'denoised') -> pd.DataFrame:
+    """Sample or RMT-denoised correlation of `returns`; pairs without overlap are treated as uncorrelated."""
+    corr = compute_correlation_matrix(returns).fillna(0.0)
+    values = corr.to_numpy(copy=True)
+    np.fill_diagonal(values, 1.0)
+    corr = pd.DataFrame(values, index=corr.index, columns=corr.columns)
+    if kind == 'sample':
+        return corr
+    if kind == 'denoised':
+        return rmt_denoise_correlation(corr, T=len(returns.index))['denoised_correlation']
+    raise ValueError(f"correlation must be one of {', '.join(CORRELATIONS)}")
+
+
+def cholesky(corr: np.ndarray, floor: float = 1e-10) -> Tuple[np.ndarray, bool]:
+    """
+    Lower Cholesky factor of `corr` and whether it had to be repaired: a
+    matrix that is not positive definite has its eigenvalues floored and is
+    rescaled to a unit diagonal first.
+    """
+    try:
+        return np.linalg.cholesky(corr), False
+    except np.linalg.LinAlgError:
+        vals, vecs = np.linalg.eigh((corr + corr.T) / 2.0)
+        fixed = (vecs * np.maximum(vals, floor)) @ vecs.T
+        d = np.sqrt(np.diag(fixed))
+        fixed = fixed / np.outer(d, d)
+        return np.linalg.cholesky(fixed + floor * np.eye(len(d))), True
+
+
+# ---- simulation ------------------------------------------------------------------
+
+def _simulate_chunk(factor: np.ndarray, scale: np.ndarray, weights: np.ndarray, n_paths: int,
+                    seed: np.random.SeedSequence, df: Optional[float], keep: int
+                    ) -> Tuple[np.ndarray, float, float]:
+    """
+    Worst `keep` losses of `n_paths` simulated P&Ls (per unit of value),
+    plus their sum and sum of squares. Paths come in antithetic pairs
+    (x, -x), which halves the draws and the matrix product.
+    """
+    rng = np.random.default_rng(seed)
+    half = (n_paths + 1) // 2
+    z = rng.standard_normal((half, factor.shape[0]), dtype=factor.dtype)
+    x = z @ factor.T
+    del z
+    if df is not None:
+        # Multivariate t: one chi-square mixing draw per pair, rescaled to unit variance
+        mix = np.sqrt((df - 2.0) / rng.chisquare(df, half)).astype(factor.dtype)
+        x *= mix[:, None]
+    x *= scale
+    mirrored = np.negative(x)
+    np.expm1(x, out=x)
+    np.expm1(mirrored, out=mirrored)
+    pnl = np.concatenate([x @ weights, mirrored @ weights])[:n_paths].astype(np.float64)
+    losses = -pnl
+    if keep < n_paths:
+        losses = np.partition(losses, n_paths - keep)[n_paths - keep:]
+    return losses, float(pnl.sum()), float(np.dot(pnl, pnl))
+
+
+class _WorkerProcess(multiprocessing.context.SpawnProcess):
+    """
+    Spawned pool worker that starts from this module alone. A spawned child
+    normally re-runs the parent's __main__ (app.py under `python app.py`)
+    before its first task; launching it while __main__ is a bare module
+    leaves that step out.
+    """
+
+    @staticmethod
+    def _Popen(process_obj):
+        with _pool_lock:
+            main = sys.modules['__main__']
+            sys.modules['__main__'] = types.ModuleType('__main__')
+            try:
+                return multiprocessing.context.SpawnProcess._Popen(process_obj)
+            finally:
+                sys.modules['__main__'] = main
+
+
+class _WorkerContext(multiprocessing.context.SpawnContext):
+    Process = _WorkerProcess
+
+
+def _init_worker() -> None:
+    """Pool initializer: unpickling it imports services.risk (and its imports) and nothing else."""
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.RLock()
+
+
+def _executor(n: int) -> ProcessPoolExecutor:
+    """Long-lived process pool; spawned (not forked) so worker threads of the server are not copied."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=n, mp_context=_WorkerContext(), initializer=_init_worker)
+        return _pool
+
+
+def simulate(corr: np.ndarray, sigma: np.ndarray, weights: np.ndarray, paths: int = DEFAULT_PATHS,
+             horizon: int = 1, levels: Sequence[float] = DEFAULT_LEVELS, df: Optional[float] = None,
+             seed: int = 0, value: float = 1.0) -> Dict[str, Any]:
+    """
+    VaR and ES (positive numbers = losses, in units of `value`) of the
+    portfolio `weights` at each confidence level in `levels`.
+    """
+    n = len(sigma)
+    dt = dtype()
+    factor, repaired = cholesky(np.asarray(corr, dtype=np.float64))
+    factor = factor.astype(dt)
+    scale = (np.sqrt(horizon) * np.asarray(sigma, dtype=np.float64)).astype(dt)
+    weights = np.asarray(weights, dtype=np.float64).astype(dt)
+    # Enough of each chunk's worst losses to hold the whole tail of the widest level
+    keep = min(paths, int(math.ceil(paths * (1.0 - min(levels)))) + 1)
+    chunk = _chunk_paths(n, dt.itemsize)
+    sizes = [min(chunk, paths - start) for start in range(0, paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(factor, scale, weights, m, s, df, min(keep, m)) for m, s in zip(sizes, seeds)]
+
+    with metrics.stage('monte_carlo'):
+        pool_size = processes()
+        pooled = pool_size > 1 and paths >= int(os.getenv('RISK_POOL_MIN_PATHS', '1000000')) and len(jobs) > 1
+        if pooled:
+            results = list(_executor(pool_size).map(_simulate_chunk, *zip(*jobs)))
+        else:
+            results = [_simulate_chunk(*job) for job in jobs]
+    metrics.inc('risk_paths_total', paths)
+
+    tail = np.sort(np.concatenate([r[0] for r in results]))[::-1]
+    total = sum(r[1] for r in results)
+    total_sq = sum(r[2] for r in results)
+    mean = total / paths
+    std = math.sqrt(max(0.0, total_sq / paths - mean * mean))
+    var, es = {}, {}
+    for level in levels:
+        k = max(1, int(math.ceil(paths * (1.0 - level))))
+        var[_key(level)] = float(tail[k - 1]) * value
+        es[_key(level)] = float(tail[:k].mean()) * value
+    return {'var': var, 'es': es, 'mean_pnl': mean * value, 'std_pnl': std * value, 'paths': paths, 'seed': seed,
+            'chunks': len(jobs), 'processes': pool_size if pooled else 1, 'correlation_repaired': repaired}
+
+
+def parametric_var(corr: np.ndarray, sigma: np.ndarray, weights: np.ndarray, horizon: int,
+                   levels: Sequence[float], value: float = 1.0) -> Dict[str, float]:
+    """Delta-normal VaR (z * portfolio sigma) for reference against the simulation."""
+    cov = np.outer(sigma, sigma) * corr
+    port = math.sqrt(max(0.0, float(weights @ cov @ weights)) * horizon)
+    return {_key(level): NormalDist().inv_cdf(level) * port * value for level in levels}
+
+
+def _key(level: float) -> str:
+    return f'{level:g}'
+
+
+def parse_levels(levels: Any) -> List[float]:
+    if levels is None:
+        return list(DEFAULT_LEVELS)
+    if not isinstance(levels, list) or not levels:
+        raise ValueError('levels must be a non-empty list of confidence levels')
+    out = sorted({float(v) for v in levels})
+    if not all(0.5 <= v < 1.0 for v in out):
+        raise ValueError('confidence levels must be in [0.5, 1)')
+    return out
+
+
+def parse_weights(weights: Any, tickers: Sequence[str]) -> np.ndarray:
+    """Weights aligned to `tickers`: a {ticker: weight} map or a list (default equal weights)."""
+    if weights is None:
+        return np.full(len(tickers), 1.0 / len(tickers))
+    if isinstance(weights, dict):
+        unknown = [t for t in weights if t not in tickers]
+        if unknown:
+            raise ValueError(f"weights given for tickers not in the portfolio: {', '.join(unknown)}")
+        return np.array([float(weights.get(t, 0.0)) for t in tickers])
+    if isinstance(weights, list) and len(weights) == len(tickers):
+        return np.array([float(w) for w in weights])
+    raise ValueError('weights must map tickers to weights or be a list as long as tickers')
+
+
+def portfolio_var(prices: pd.DataFrame, weights: Dict[str, float] | List[float] | None = None,
+                  levels: Sequence[float] = DEFAULT_LEVELS, paths: Optional[int] = None, horizon: int = 1,
+                  window: int = DEFAULT_WINDOW, volatility: str = 'historical', corr_kind: str = 'denoised',
+                  distribution: str = 'normal', df: float = 5.0, seed: int = 0, value: float = 1.0
+                  ) -> Dict[str, Any]:
+    """
+    Monte Carlo VaR/ES of a portfolio of the columns of `prices` (adjusted
+    closes), with volatilities and correlation from the last `window` days.
+    Without `paths`, DEFAULT_PATHS are simulated.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"distribution must be one of {', '.join(DISTRIBUTIONS)}")
+    if distribution == 'student_t' and df <= 2:
+        raise ValueError('df must be greater than 2')
+    if paths is None:
+        paths = DEFAULT_PATHS
+    if not 1 <= paths <= max_paths():
+        raise ValueError(f'paths must be between 1 and {max_paths()}')
+    if horizon < 1 or window < 20:
+        raise ValueError('horizon must be >= 1 and window >= 20')
+    tickers = list(prices.columns)
+    w = parse_weights(weights, tickers)
+    returns = compute_log_returns(prices).iloc[-window:]
+    with metrics.stage('risk_inputs'):
+        sigma = volatilities(returns, volatility)
+        missing = [t for t in tickers if not np.isfinite(sigma.get(t, np.nan))]
+        if missing:
+            raise ValueError(f"not enough return history for: {', '.join(missing)}")
+        corr = correlation(returns, corr_kind)
+    sigma_arr = sigma.reindex(tickers).to_numpy(dtype=np.float64)
+    corr_arr = corr.reindex(index=tickers, columns=tickers).to_numpy(dtype=np.float64)
+    result = simulate(corr_arr, sigma_arr, w, paths=paths, horizon=horizon, levels=levels,
+                      df=df if distribution == 'student_t' else None, seed=seed, value=value)
+    result.update({
+        'parametric_var': parametric_var(corr_arr, sigma_arr, w, horizon, levels, value),
+        'tickers': tickers,
+        'weights': {t: float(x) for t, x in zip(tickers, w)},
+        'daily_volatility': {t: float(s) for t, s in zip(tickers, sigma_arr)},
+        'observations': int(len(returns.index)),
+        'horizon_days': horizon, 'volatility': volatility, 'correlation': corr_kind,
+        'distribution': distribution, 'value': value,
+    })
+    if distribution == 'student_t':
+        result['df'] = df
+    return result
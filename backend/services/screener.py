@@ -0,0 +1,259 @@
+"""
+Universe screener over a per-refresh indicator table.
+
+One ScreenerTable is built per data refresh (new price panel, indicator
+publication or quote snapshot): a float64 column per field for every
+symbol, plus for each column the symbol indices sorted by value (missing
+values left out). A range predicate is two binary searches into that
+sorted column; the symbols between them become a boolean mask over the
+universe, and the predicates of a screen are intersected mask by mask.
+Sorting the matches reuses the same order, so a screen never sorts or
+scans the rows.
+
+Fields:
+    indicators.NAMES     latest value per symbol (rsi_14, momentum_7, macd_hist, ...)
+    volatility           annualized standard deviation of the last VOLATILITY_WINDOW (252) daily log returns
+    return_1y            close / close 252 bars earlier - 1
+    QUOTE_FIELDS         from the quote snapshot (price, changePercent, pe, marketCap, ...);
+                         price falls back to the last close
+
+Screens are written as "rsi_14 < 30 and momentum_7 > 0 and volatility < 25%"
+(a % suffix divides by 100) or as a list of {"field", "op", "value"}.
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services import indicators, metrics
+
+
+VOLATILITY_WINDOW = 252
+QUOTE_FIELDS = ('price', 'change', 'changePercent', 'volume', 'averageVolume', 'marketCap', 'pe', 'eps',
+                'dividendYield', 'priceToBook', 'fiftyTwoWeekHigh', 'fiftyTwoWeekLow')
+# The quote service reports 0 when Yahoo has no value
+_ZERO_IS_MISSING = frozenset({'marketCap', 'pe', 'eps', 'priceToBook', 'averageVolume',
+                              'fiftyTwoWeekHigh', 'fiftyTwoWeekLow'})
+FIELDS: Tuple[str, ...] = tuple(indicators.NAMES) + ('volatility', 'return_1y') + QUOTE_FIELDS
+OPS = ('<', '<=', '>', '>=', '==', '!=', 'between')
+
+_CLAUSE = re.compile(r'^\s*([A-Za-z_]\w*)\s*(<=|>=|==|!=|<|>|=)\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(%?)\s*$')
+
+
+class Predicate:
+    __slots__ = ('field', 'op', 'value')
+
+    def __init__(self, field: str, op: str, value: Any):
+        if field not in FIELDS:
+            raise ValueError(f"unknown screener field '{field}'")
+        op = '==' if op == '=' else op
+        if op not in OPS:
+            raise ValueError(f"op must be one of {', '.join(OPS)}")
+        if op == 'between':
+            if not isinstance(value, (list, tuple)) or len(value) != 2:
+                raise ValueError(f"'between' on {field} needs [low, high]")
+            value = (float(value[0]), float(value[1]))
+        else:
+            value = float(value)
+        self.field, self.op, self.value = field, op, value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'field': self.field, 'op': self.op,
+                'value': list(self.value) if isinstance(self.value, tuple) else self.value}
+
+
+def parse(where: Any) -> List[Predicate]:
+    """Predicates from a "field op value and ..." string or a list of {field, op, value} (ValueError if malformed)."""
+    if where is None or where == '' or where == []:
+        return []
+    if isinstance(where, str):
+        predicates = []
+        for clause in re.split(r'\s+and\s+', where.strip(), flags=re.IGNORECASE):
+            match = _CLAUSE.match(clause)
+            if not match:
+                raise ValueError(f"cannot parse screen clause '{clause.strip()}' (expected e.g. 'rsi_14 < 30')")
+            field, op, number, percent = match.groups()
+            predicates.append(Predicate(field, op, float(number) / 100.0 if percent else float(number)))
+        return predicates
+    if isinstance(where, list):
+        predicates = []
+        for item in where:
+            if not isinstance(item, dict) or 'field' not in item or 'value' not in item:
+                raise ValueError('each filter needs field, op and value')
+            try:
+                predicates.append(Predicate(str(item['field']), str(item.get('op', '==')), item['value']))
+            except (TypeError, ValueError) as e:
+                raise ValueError(str(e)) from None
+        return predicates
+    raise ValueError('where must be a string or a list of filters')
+
+
+class ScreenerTable:
+    """Columnar snapshot of every screener field, with a sorted index per column."""
+
+    def __init__(self, symbols: Sequence[str], columns: Dict[str, np.ndarray], names: Dict[str, str],
+                 as_of: Optional[str]):
+        self.symbols = np.asarray(list(symbols), dtype=object)
+        self.columns = columns
+        self.names = names
+        self.as_of = as_of
+        self._order: Dict[str, np.ndarray] = {}
+        self._sorted: Dict[str, np.ndarray] = {}
+        for field, values in columns.items():
+            order = np.argsort(values, kind='stable')
+            order = order[~np.isnan(values[order])]  # NaNs sort last; missing values never match
+            self._order[field] = order
+            self._sorted[field] = values[order]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def _matching(self, p: Predicate) -> np.ndarray:
+        """Symbol indices satisfying `p`, via binary searches in the sorted column."""
+        order, values = self._order[p.field], self._sorted[p.field]
+        if p.op == 'between':
+            lo, hi = sorted(p.value)
+            return order[np.searchsorted(values, lo, 'left'):np.searchsorted(values, hi, 'right')]
+        v = p.value
+        if p.op == '<':
+            return order[:np.searchsorted(values, v, 'left')]
+        if p.op == '<=':
+            return order[:np.searchsorted(values, v, 'right')]
+        if p.op == '>':
+            return order[np.searchsorted(values, v, 'right'):]
+        if p.op == '>=':
+            return order[np.searchsorted(values, v, 'left'):]
+        lo, hi = np.searchsorted(values, v, 'left'), np.searchsorted(values, v, 'right')
+        if p.op == '==':
+            return order[lo:hi]
+        return np.concatenate([order[:lo], order[hi:]])
+
+    def mask(self, predicates: Sequence[Predicate]) -> np.ndarray:
+        """Boolean mask over the universe of symbols passing every predicate."""
+        mask = np.ones(len(self.symbols), dtype=bool)
+        for p in predicates:
+            hits = np.zeros(len(self.symbols), dtype=bool)
+            hits[self._matching(p)] = True
+            mask &= hits
+            if not mask.any():
+                break
+        return mask
+
+    def screen(self, predicates: Sequence[Predicate], sort: Optional[str] = None, descending: bool = False,
+               limit: Optional[int] = None, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        mask = self.mask(predicates)
+        if sort is not None:
+            order = self._order[sort]
+            ranked = order[mask[order]]
+            if descending:
+                ranked = ranked[::-1]
+            # Symbols without a value for the sort field go last
+            missing = np.flatnonzero(mask & np.isnan(self.columns[sort]))
+            idx = np.concatenate([ranked, missing])
+        else:
+            idx = np.flatnonzero(mask)
+        matched = len(idx)
+        if limit is not None:
+            idx = idx[:max(0, limit)]
+        fields = list(dict.fromkeys(fields or [p.field for p in predicates] or FIELDS))
+        if sort is not None and sort not in fields:
+            fields.append(sort)
+        rows = []
+        for i in idx:
+            row = {'symbol': self.symbols[i], 'name': self.names.get(self.symbols[i])}
+            for f in fields:
+                v = float(self.columns[f][i])
+                row[f] = None if math.isnan(v) else round(v, 6)
+            rows.append(row)
+        return {'universe': len(self.symbols), 'matched': matched, 'results': rows}
+
+
+def _last_valid_rows(closes: np.ndarray) -> np.ndarray:
+    """Row of each column's last non-missing close (-1 for columns without any)."""
+    valid = ~np.isnan(closes)
+    last = closes.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+    return np.where(valid.any(axis=0), last, -1)
+
+
+def build(prices: pd.DataFrame, quotes: Sequence[Dict[str, Any]],
+          published: Optional[indicators.IndicatorSeries] = None) -> ScreenerTable:
+    """
+    Table for the symbols of `prices` (adjusted closes, dates x symbols).
+    Indicator values are read from `published` when it was built from the
+    same history and computed from `prices` otherwise. Each symbol's values
+    are those of its own last trading day.
+    """
+    with metrics.stage('screener_build'):
+        prices = prices.sort_index()
+        symbols = list(prices.columns)
+        closes = prices.to_numpy(dtype=np.float64)
+        n = len(symbols)
+        last = _last_valid_rows(closes)
+        has = last >= 0
+        cols = np.arange(n)
+        rows = np.where(has, last, 0)
+
+        columns: Dict[str, np.ndarray] = {}
+        if (published is not None and published.covers(symbols) and len(published.dates) == len(prices.index)
+                and published.dates[-1] == prices.index[-1]):
+            values = published.values_at(rows, symbols)
+            for k, name in enumerate(indicators.NAMES):
+                columns[name] = np.where(has, values[k], np.nan)
+        else:
+            series = indicators.IndicatorEngine(symbols).run(prices)
+            for name in indicators.NAMES:
+                columns[name] = np.where(has, series[name][rows, cols], np.nan)
+
+        # Volatility over the panel's last VOLATILITY_WINDOW sessions; 1y return from each symbol's last close
+        log_returns = np.diff(np.log(closes), axis=0)
+        window = log_returns[-VOLATILITY_WINDOW:]
+        counts = np.count_nonzero(~np.isnan(window), axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vol = np.nanstd(np.where(counts >= 2, window, 0.0), axis=0, ddof=1) * np.sqrt(252)
+        columns['volatility'] = np.where(counts >= 2, vol, np.nan)
+        back = rows - 252
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns['return_1y'] = np.where(has & (back >= 0),
+                                            closes[rows, cols] / closes[np.maximum(back, 0), cols] - 1.0, np.nan)
+
+        by_symbol = {q.get('symbol'): q for q in quotes or [] if q}
+        names = {}
+        for field in QUOTE_FIELDS:
+            values = np.full(n, np.nan)
+            for i, s in enumerate(symbols):
+                v = by_symbol.get(s, {}).get(field)
+                if isinstance(v, (int, float)) and not (v == 0 and field in _ZERO_IS_MISSING):
+                    values[i] = float(v)
+            columns[field] = values
+        # Symbols without a quote yet are priced at their last close
+        columns['price'] = np.where(np.isnan(columns['price']) & has, closes[rows, cols], columns['price'])
+        for s in symbols:
+            if s in by_symbol and by_symbol[s].get('name') not in (None, 'N/A'):
+                names[s] = by_symbol[s]['name']
+
+        as_of = prices.index[-1].strftime('%Y-%m-%d') if len(prices.index) else None
+        table = ScreenerTable(symbols, columns, names, as_of)
+    metrics.inc('screener_builds_total')
+    return table
+
+
+_table: Optional[ScreenerTable] = None
+_table_key: Optional[Hashable] = None
+_table_lock = threading.Lock()
+
+
+def current(key: Hashable, loader: Callable[[], ScreenerTable]) -> ScreenerTable:
+    """The table for `key` (panel/indicator versions, quote snapshot time), built once per new key."""
+    global _table, _table_key
+    if _table is not None and _table_key == key:
+        return _table
+    with _table_lock:
+        if _table is None or _table_key != key:
+            _table = loader()
+            _table_key = key
+        return _table
@@ -1,31 +1,130 @@
+"""
+FinBERT headline sentiment.
+
+The pipeline is loaded once per process. preload() starts loading it on a
+background thread at startup (SENTIMENT_PRELOAD=background, the default), so
+the first request does not pay the multi-second load; with
+SENTIMENT_PRELOAD=fork the gunicorn master loads it before forking and the
+workers share the weights copy-on-write (see gunicorn.conf.py). Until the
+model is ready, request paths check is_ready() and degrade to the lexicon
+tier instead of blocking on the load.
+
+Texts that miss the result cache go through a MicroBatcher: concurrent
+callers' texts are queued and a single worker thread runs one batched
+forward pass per SENTIMENT_MAX_BATCH texts, or whatever has queued once the
+oldest text has waited SENTIMENT_MAX_WAIT_MS, then hands each caller its
+results.
+
+analyze_texts() has two tiers behind one interface:
+
+    tier='finbert'   always FinBERT (waits for the model and the queue)
+    tier='lexicon'   Loughran-McDonald style word counts (services/lexicon.py)
+    tier='auto'      FinBERT, unless the model is not loaded yet, more than
+                     SENTIMENT_MAX_QUEUE texts are already queued, or the
+                     expected queue wait exceeds SENTIMENT_LATENCY_BUDGET_MS;
+                     then the cache misses are scored by the lexicon
+
+FinBERT cache hits are served on every tier. Each result carries a 'tier'
+key naming the scorer that produced it.
+"""
 from __future__ import annotations
 
-from typing import List, Dict, Any
+from collections import deque
+from typing import Callable, Deque, List, Dict, Any, Optional, Tuple
+import os
 import threading
+import time
+
+from services import lexicon, metrics
 
 
 _model_lock = threading.Lock()
 _pipeline = None
+# Separate from _model_lock, which is held for the whole load: callers must never wait on it
+_loader_lock = threading.Lock()
+_loader: Optional[threading.Thread] = None
+_load_error: Optional[str] = None
+_load_failed_at = 0.0
+_load_seconds: Optional[float] = None
 _cache_lock = threading.Lock()
 # simple in-memory cache for text -> result (keep small to avoid memory issues)
 _results_cache = {}
 _RESULTS_CACHE_MAX = 1000
+# A failed load (e.g. model download error) is retried by preload() after this long
+_RETRY_SECONDS = float(os.getenv('SENTIMENT_RETRY_SECONDS', '300'))
+
+TIERS = ('auto', 'finbert', 'lexicon')
+
+
+def preload_mode() -> str:
+    """'background' (default), 'fork' (loaded by the gunicorn master) or 'off' (load on first use)."""
+    return os.getenv('SENTIMENT_PRELOAD', 'background').lower()
 
 
 def _load_pipeline():
-    global _pipeline
+    global _pipeline, _load_error, _load_failed_at, _load_seconds
     if _pipeline is not None:
         return _pipeline
     with _model_lock:
         if _pipeline is None:
-            from transformers import AutoTokenizer, AutoModelForSequenceClassification, TextClassificationPipeline
-            model_name = "ProsusAI/finbert"
-            tokenizer = AutoTokenizer.from_pretrained(model_name)
-            model = AutoModelForSequenceClassification.from_pretrained(model_name)
-            _pipeline = TextClassificationPipeline(model=model, tokenizer=tokenizer, return_all_scores=True)
+            start = time.perf_counter()
+            try:
+                from transformers import AutoTokenizer, AutoModelForSequenceClassification, TextClassificationPipeline
+                model_name = "ProsusAI/finbert"
+                with metrics.stage('finbert_load'):
+                    tokenizer = AutoTokenizer.from_pretrained(model_name)
+                    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+                    _pipeline = TextClassificationPipeline(model=model, tokenizer=tokenizer, return_all_scores=True)
+            except Exception as e:
+                _load_error = str(e)
+                _load_failed_at = time.monotonic()
+                raise
+            _load_error = None
+            _load_seconds = time.perf_counter() - start
     return _pipeline
 
 
+def load():
+    """Load the pipeline now (blocking) and return it."""
+    return _load_pipeline()
+
+
+def preload() -> bool:
+    """Start loading the pipeline on a background thread; False if it is ready, loading, or recently failed."""
+    global _loader
+    with _loader_lock:
+        if _pipeline is not None or (_loader is not None and _loader.is_alive()):
+            return False
+        if _load_error is not None and time.monotonic() - _load_failed_at < _RETRY_SECONDS:
+            return False
+
+        def run():
+            try:
+                _load_pipeline()
+                print(f"[OK] FinBERT loaded in background ({_load_seconds:.1f}s)")
+            except Exception as e:
+                print(f"[WARNING] FinBERT preload failed, sentiment degrades to the lexicon tier: {e}")
+
+        _loader = threading.Thread(target=run, name='finbert-preload', daemon=True)
+        _loader.start()
+        return True
+
+
+def is_ready() -> bool:
+    return _pipeline is not None
+
+
+def status() -> str:
+    """'ready', 'loading', 'failed' or 'idle' (not requested yet)."""
+    if _pipeline is not None:
+        return 'ready'
+    if _loader is not None and _loader.is_alive():
+        return 'loading'
+    if _load_error is not None:
+        return 'failed'
+    return 'idle'
+
+
 def score_to_numeric(label: str, confidence: float) -> float:
     # Map labels to [-1, 1]
     if label.upper() == 'POSITIVE':
@@ -36,17 +135,164 @@ def score_to_numeric(label: str, confidence: float) -> float:
     return 0.0
 
 
-def analyze_texts(texts: List[str]) -> List[Dict[str, Any]]:
-    if not texts:
-        return []
-    # Use cached results when available to avoid re-scoring identical texts
+def _score_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    """One forward pass over `texts` (padded into a single batch)."""
     pipe = _load_pipeline()
+    scored = pipe(texts, truncation=True, batch_size=len(texts))
     outputs = []
+    for scores in scored:
+        best = max(scores, key=lambda s: s['score']) if scores else {'label': 'NEUTRAL', 'score': 0.0}
+        outputs.append({
+            'label': best['label'],
+            'confidence': float(best['score']),
+            'score': float(score_to_numeric(best['label'], float(best['score']))),
+            'tier': 'finbert',
+        })
+    return outputs
+
+
+class _Pending:
+    """One caller's texts waiting in the batch queue."""
+    __slots__ = ('texts', 'results', 'remaining', 'enqueued', 'done', 'error', 'batch_seconds')
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        self.remaining = len(texts)
+        self.enqueued = time.monotonic()
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+        # Forward passes this caller's texts were part of; they run on the batcher thread
+        self.batch_seconds = 0.0
+
+
+class MicroBatcher:
+    """Coalesce texts from concurrent callers into shared forward passes."""
+
+    def __init__(self, score: Callable[[List[str]], List[Dict[str, Any]]], max_batch: int, max_wait: float):
+        self.score = score
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self._cond = threading.Condition()
+        self._queue: Deque[Tuple[_Pending, int]] = deque()
+        self._worker: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        # EWMA of one forward pass, for expected_wait(); None until the first batch
+        self._batch_seconds: Optional[float] = None
+
+    def queued(self) -> int:
+        """Texts waiting for a batch (excluding the one being scored)."""
+        return len(self._queue)
+
+    def expected_wait(self, n: int) -> float:
+        """Rough seconds until `n` more texts would be scored: batches ahead of them x batch time."""
+        if self._batch_seconds is None:
+            return 0.0
+        batches = -(-(len(self._queue) + n) // self.max_batch)
+        return batches * self._batch_seconds
+
+    def submit(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Score `texts` as part of whichever batches they land in; blocks until all are done."""
+        pending = _Pending(texts)
+        with self._cond:
+            self._ensure_worker()
+            self._queue.extend((pending, i) for i in range(len(texts)))
+            self._cond.notify()
+        pending.done.wait()
+        metrics.add_request_timings([('finbert_batch', pending.batch_seconds)])
+        if pending.error is not None:
+            raise pending.error
+        return pending.results
+
+    def _ensure_worker(self) -> None:
+        # Threads do not survive fork(); a worker started before forking belongs to the parent
+        if self._worker is None or not self._worker.is_alive() or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._worker = threading.Thread(target=self._loop, name='finbert-batcher', daemon=True)
+            self._worker.start()
+
+    def _next_batch(self) -> List[Tuple[_Pending, int]]:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            # Fill up until the oldest queued text has waited max_wait (texts that queued
+            # during the previous forward pass have usually waited long enough already)
+            deadline = self._queue[0][0].enqueued + self.max_wait
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            # Identical texts from different callers are scored once
+            unique = list(dict.fromkeys(p.texts[i] for p, i in batch))
+            callers = {p for p, _ in batch}
+            start = time.perf_counter()
+            try:
+                with metrics.stage('finbert_batch'):
+                    outputs = dict(zip(unique, self.score(unique)))
+            except BaseException as e:
+                elapsed = time.perf_counter() - start
+                for p in callers:
+                    p.batch_seconds += elapsed
+                    if p.error is None:
+                        p.error = e
+                        p.done.set()
+                continue
+            elapsed = time.perf_counter() - start
+            for p in callers:
+                p.batch_seconds += elapsed
+            self._batch_seconds = elapsed if self._batch_seconds is None else 0.8 * self._batch_seconds + 0.2 * elapsed
+            metrics.inc('sentiment_batches_total')
+            metrics.inc('sentiment_batch_texts_total', len(unique))
+            for p, i in batch:
+                p.results[i] = outputs[p.texts[i]]
+                p.remaining -= 1
+                if p.remaining == 0:
+                    p.done.set()
+
+
+_batcher = MicroBatcher(_score_batch, max_batch=int(os.getenv('SENTIMENT_MAX_BATCH', '32')),
+                        max_wait=float(os.getenv('SENTIMENT_MAX_WAIT_MS', '5')) / 1000.0)
+
+
+_LATENCY_BUDGET = float(os.getenv('SENTIMENT_LATENCY_BUDGET_MS', '500')) / 1000.0
+_MAX_QUEUE = int(os.getenv('SENTIMENT_MAX_QUEUE', '256'))
+
+
+def analyze_texts(texts: List[str], tier: str = 'auto') -> List[Dict[str, Any]]:
+    """Score `texts` on `tier` ('auto', 'finbert' or 'lexicon'); every result names its 'tier'."""
+    if tier not in TIERS:
+        raise ValueError(f"tier must be one of {', '.join(TIERS)}")
+    if not texts:
+        return []
+    with metrics.stage('analyze_texts'):
+        return _analyze_texts(texts, tier)
+
+
+def _fallback_reason(n: int) -> Optional[str]:
+    """Why `n` uncached texts should go to the lexicon under tier='auto' (None: use FinBERT)."""
+    if not is_ready():
+        return 'model_not_ready'
+    if _batcher.queued() >= _MAX_QUEUE:
+        return 'queue_depth'
+    if _batcher.expected_wait(n) > _LATENCY_BUDGET:
+        return 'latency_budget'
+    return None
+
+
+def _analyze_texts(texts: List[str], tier: str) -> List[Dict[str, Any]]:
+    if tier == 'finbert':
+        _load_pipeline()
     results: List[Dict[str, Any]] = []
 
     to_score = []
     to_score_idx = []
-    # first check cache for each text
+    # Use cached FinBERT results when available to avoid re-scoring identical texts
     with _cache_lock:
         for i, t in enumerate(texts):
             key = t.strip()[:200]  # truncated key to avoid huge keys
@@ -58,26 +304,47 @@ def analyze_texts(texts: List[str]) -> List[Dict[str, Any]]:
                 to_score.append(t)
                 to_score_idx.append(i)
 
-    if to_score:
-        scored = pipe(to_score, truncation=True)
-        for idx, scores in enumerate(scored):
-            best = max(scores, key=lambda s: s['score']) if scores else {'label': 'NEUTRAL', 'score': 0.0}
-            out = {
-                'label': best['label'],
-                'confidence': float(best['score']),
-                'score': float(score_to_numeric(best['label'], float(best['score'])))
-            }
-            # write back to results list in correct position
-            results[to_score_idx[idx]] = out
-            # cache it (with truncation key)
-            key = to_score[idx].strip()[:200]
-            with _cache_lock:
-                if len(_results_cache) >= _RESULTS_CACHE_MAX:
-                    # simple eviction: drop one arbitrary item
-                    _results_cache.pop(next(iter(_results_cache)))
-                _results_cache[key] = out
+    metrics.inc('sentiment_cache_requests_total', len(texts) - len(to_score), result='hit')
+    metrics.inc('sentiment_cache_requests_total', len(to_score), result='miss')
+    metrics.inc('sentiment_tier_texts_total', len(texts) - len(to_score), tier='finbert')
+
+    if not to_score:
+        return results
+
+    if tier == 'auto':
+        reason = _fallback_reason(len(to_score))
+        if reason is not None:
+            metrics.inc('sentiment_tier_fallbacks_total', reason=reason)
+            tier = 'lexicon'
+    if tier == 'lexicon':
+        # Lexicon scores are cheap to recompute and not cached, so FinBERT can fill the cache later
+        with metrics.stage('lexicon_inference'):
+            scored = [dict(out, tier='lexicon') for out in lexicon.analyze_texts(to_score)]
+        metrics.inc('sentiment_tier_texts_total', len(to_score), tier='lexicon')
+        for idx, out in zip(to_score_idx, scored):
+            results[idx] = out
+        return results
+
+    # Queue wait + this caller's share of the batched forward passes
+    with metrics.stage('finbert_inference'):
+        scored = _batcher.submit(to_score)
+    metrics.inc('sentiment_tier_texts_total', len(to_score), tier='finbert')
+    for idx, out in enumerate(scored):
+        # write back to results list in correct position
+        results[to_score_idx[idx]] = out
+        # cache it (with truncation key)
+        key = to_score[idx].strip()[:200]
+        with _cache_lock:
+            if len(_results_cache) >= _RESULTS_CACHE_MAX:
+                # simple eviction: drop one arbitrary item
+                _results_cache.pop(next(iter(_results_cache)))
+            _results_cache[key] = out
 
     # final results ready
     return results
 
 
+metrics.gauge('sentiment_model_ready', lambda: 1.0 if is_ready() else 0.0,
+              'Whether the FinBERT pipeline is loaded in this process.')
+
+
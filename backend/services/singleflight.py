@@ -0,0 +1,122 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+When several clients ask for the same thing at the same time (dashboards
+opening together), only the first request runs the view; the others wait for
+it and receive a copy of its response. Work therefore scales with the number
+of distinct concurrent queries, not with the number of users.
+
+Requests are identical when method, path, query string (order-insensitive),
+JSON body (key-order-insensitive) and Accept/Accept-Encoding headers match. Set SINGLEFLIGHT_ENABLED=0 to
+disable. The leader's stage timings travel with the shared response, so a
+follower's Server-Timing shows the work it waited for.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+from flask import current_app, request
+
+from services import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Run fn once per key among concurrent callers; everyone gets the same result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared); shared is True when another caller did the work."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            with metrics.stage('singleflight_wait'):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Forget the key before waking waiters so later arrivals start a fresh call
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+_flight = SingleFlight()
+
+
+def enabled() -> bool:
+    return os.getenv('SINGLEFLIGHT_ENABLED', '1') == '1'
+
+
+def request_key() -> str:
+    """Canonical identity of the current Flask request."""
+    query = sorted((k, v) for k, values in request.args.lists() for v in values)
+    body = request.get_json(force=True, silent=True) if request.method in ('POST', 'PUT', 'PATCH') else None
+    if body is not None:
+        payload = json.dumps(body, sort_keys=True, separators=(',', ':'), default=str)
+    else:
+        payload = hashlib.sha256(request.get_data()).hexdigest()
+    # Callers negotiating different encodings must not share one response body
+    representation = [request.headers.get('Accept', ''), request.headers.get('Accept-Encoding', '')]
+    canonical = json.dumps([request.method, request.path, query, payload, representation], separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _snapshot(response) -> Tuple[bytes, int, List[Tuple[str, str]]]:
+    headers = [(k, v) for k, v in response.headers.items() if k.lower() != 'content-length']
+    return response.get_data(), response.status_code, headers
+
+
+def coalesce(view: Callable) -> Callable:
+    """Flask view decorator: identical concurrent requests share one execution of `view`."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        # Profiled requests must run the view themselves to produce a meaningful profile
+        if not enabled() or 'profiling.profiler' in request.environ:
+            return view(*args, **kwargs)
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+
+        def run():
+            mark = len(metrics.request_timings())
+            snapshot = _snapshot(current_app.make_response(view(*args, **kwargs)))
+            return snapshot, metrics.request_timings()[mark:]
+
+        ((body, status, headers), timings), shared = _flight.do(request_key(), run)
+        metrics.inc('singleflight_requests_total', route=route, role='follower' if shared else 'leader')
+        if shared:
+            metrics.add_request_timings(timings)
+        # Each caller gets its own Response object; after_request hooks may mutate it
+        return current_app.response_class(body, status=status, headers=headers)
+
+    return wrapper
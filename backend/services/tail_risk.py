@@ -0,0 +1,186 @@
+"""
+Rolling historical VaR and Expected Shortfall for every symbol at once.
+
+For a window of W daily returns and confidence level c, with
+k = ceil(n * (1 - c)) for the n returns observed in the window:
+
+    VaR = -(k-th smallest return)        ES = -(mean of the k smallest returns)
+
+(the same order-statistic definitions /api/portfolio_var uses for simulated
+P&L). Re-sorting every window costs O(T * W log W) per symbol. Only the K
+smallest returns of a window matter (K = ceil(W * (1 - min level)), 3 for
+99% and 13 for 95% over 250 days), so the windows are assembled from
+precomputed pieces instead (the van Herk / Gil-Werman decomposition used
+for sliding minima, generalized to the K smallest):
+
+    the dates are cut into blocks of W; for every position in a block the K
+    smallest of the block's prefix up to it and of its suffix from it are
+    built by inserting one return at a time into a sorted K-list;
+    the window ending at position i of block b is the suffix of block b-1
+    after i plus the prefix of block b through i, so its K smallest are one
+    merge of two sorted K-lists.
+
+Each update costs O(K) whatever W is, the W insertion steps run for all
+blocks and symbols at once, and the symbols are processed in column chunks
+so the prefix/suffix lists stay within TAIL_RISK_CHUNK_MB.
+
+Returns are simple daily returns; missing prices leave gaps that are not
+counted, and windows with fewer than `min_periods` returns are NaN.
+"""
+from __future__ import annotations
+
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from services import metrics
+
+
+DEFAULT_WINDOW = 250
+# Ten years of trading days; longer windows are rejected by the endpoint
+MAX_WINDOW = 2520
+DEFAULT_LEVELS = (0.95, 0.99)
+# Lowest level accepted: K (and the work per update) grows with the tail fraction
+MIN_LEVEL = 0.8
+
+
+def parse_levels(levels: Any) -> List[float]:
+    if levels is None:
+        return list(DEFAULT_LEVELS)
+    if not isinstance(levels, list) or not levels:
+        raise ValueError('levels must be a non-empty list of confidence levels')
+    out = sorted({float(v) for v in levels})
+    if not all(MIN_LEVEL <= v < 1.0 for v in out):
+        raise ValueError(f'confidence levels must be in [{MIN_LEVEL}, 1)')
+    return out
+
+
+def _tail_size(n: np.ndarray | int, level: float) -> np.ndarray | int:
+    """k = ceil(n * (1 - level)), at least 1 (rounded first so float error cannot push 100 * 0.05 up to 6)."""
+    return np.maximum(1, np.ceil(np.round(np.asarray(n) * (1.0 - level), 9))).astype(np.int64)
+
+
+def _insert(lists: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Insert `values` (...,) into ascending K-lists (..., K), keeping the K smallest."""
+    shifted = np.empty_like(lists)
+    shifted[..., 0] = -np.inf
+    shifted[..., 1:] = lists[..., :-1]
+    return np.minimum(lists, np.maximum(shifted, values[..., None]))
+
+
+def _smallest(x: np.ndarray, window: int, k: int) -> np.ndarray:
+    """(T, N, k) ascending k smallest of each trailing `window` rows of x (NaN-free; +inf = missing)."""
+    T, N = x.shape
+    blocks = -(-T // window)
+    padded = np.full((blocks * window, N), np.inf)
+    padded[:T] = x
+    xb = padded.reshape(blocks, window, N)
+
+    # merged[b, i] holds the prefix of block b through i (first k) and the suffix of block b-1
+    # after i (last k; empty for b = 0 and for i = window - 1), written in place as they are built
+    merged = np.empty((blocks, window, N, 2 * k))
+    cur = np.full((blocks, N, k), np.inf)
+    for i in range(window):
+        cur = _insert(cur, xb[:, i])
+        merged[:, i, :, :k] = cur
+    merged[0, :, :, k:] = np.inf
+    merged[:, window - 1, :, k:] = np.inf
+    cur = np.full((blocks - 1, N, k), np.inf)
+    for i in range(window - 1, 0, -1):
+        cur = _insert(cur, xb[:-1, i])
+        merged[1:, i - 1, :, k:] = cur
+    merged.sort(axis=-1)
+    return merged[..., :k].reshape(blocks * window, N, k)[:T]
+
+
+def rolling_var_es(returns: np.ndarray, window: int = DEFAULT_WINDOW, levels: Sequence[float] = DEFAULT_LEVELS,
+                   min_periods: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Rolling VaR and ES (positive = loss) of the columns of `returns`
+    (T x N, NaN = missing): {'var': (L, T, N), 'es': (L, T, N)} for the L
+    `levels`, row t covering returns t-window+1..t.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    T, N = returns.shape
+    if window < 2:
+        raise ValueError('window must be at least 2')
+    min_periods = window if min_periods is None else max(1, min(int(min_periods), window))
+    # A window longer than the data covers the same returns as one of T rows, without the padding
+    window = max(1, min(window, T))
+    valid = ~np.isnan(returns)
+    counts = np.cumsum(valid, axis=0)
+    counts[window:] -= counts[:-window].copy()
+    k_max = int(max(_tail_size(window, level) for level in levels))
+
+    var = np.full((len(levels), T, N), np.nan)
+    es = np.full((len(levels), T, N), np.nan)
+    budget = float(os.getenv('TAIL_RISK_CHUNK_MB', '128')) * 1e6
+    # _smallest pads to blocks * window rows; padded input, the merged prefix/suffix lists
+    # and the k-smallest copy take about (3 * k_max + 1) floats per padded row and column
+    padded_rows = -(-T // window) * window
+    step = int(max(1, min(N, budget // (8 * max(1, padded_rows) * (3 * k_max + 1))))) if T else max(1, N)
+    x = np.where(valid, returns, np.inf)
+    rows = np.arange(T)[:, None]
+    for lo in range(0, N, step):
+        hi = min(N, lo + step)
+        smallest = _smallest(x[:, lo:hi], window, k_max)
+        n = counts[:, lo:hi]
+        enough = n >= min_periods
+        cols = np.arange(hi - lo)[None, :]
+        ks = [_tail_size(np.maximum(n, 1), level) for level in levels]
+        for j, k in enumerate(ks):
+            var[j, :, lo:hi] = np.where(enough, -smallest[rows, cols, k - 1], np.nan)
+        # k never exceeds the returns in the window, so the +inf padding only reaches sums past every k used
+        np.cumsum(smallest, axis=-1, out=smallest)
+        for j, k in enumerate(ks):
+            es[j, :, lo:hi] = np.where(enough, -smallest[rows, cols, k - 1] / k, np.nan)
+    return {'var': var, 'es': es}
+
+
+def breach_rates(returns: np.ndarray, var: np.ndarray) -> np.ndarray:
+    """(L, N) share of days whose loss exceeded the previous day's VaR (should be near 1 - level)."""
+    nxt = returns[1:]
+    prev = var[:, :-1]
+    tested = ~np.isnan(prev) & ~np.isnan(nxt)[None]
+    breached = tested & (-nxt[None] > prev)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return breached.sum(axis=1) / tested.sum(axis=1)
+
+
+def tail_risk(prices: pd.DataFrame, window: int = DEFAULT_WINDOW, levels: Sequence[float] = DEFAULT_LEVELS,
+              min_periods: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Rolling VaR/ES frames per level for the columns of `prices` (adjusted
+    closes), plus each symbol's latest values and VaR breach rate.
+    """
+    prices = prices.sort_index()
+    returns = prices.pct_change(fill_method=None).iloc[1:]
+    values = returns.to_numpy(dtype=np.float64)
+    with metrics.stage('tail_risk'):
+        result = rolling_var_es(values, window, levels, min_periods)
+        rates = breach_rates(values, result['var'])
+    keys = [f'{level:g}' for level in levels]
+    frames = {
+        'var': {key: pd.DataFrame(result['var'][j], index=returns.index, columns=returns.columns)
+                for j, key in enumerate(keys)},
+        'es': {key: pd.DataFrame(result['es'][j], index=returns.index, columns=returns.columns)
+               for j, key in enumerate(keys)},
+    }
+    latest = {}
+    for c, symbol in enumerate(returns.columns):
+        rows = np.flatnonzero(~np.isnan(result['var'][0, :, c]))
+        if len(rows) == 0:
+            latest[symbol] = None
+            continue
+        t = rows[-1]
+        latest[symbol] = {
+            'date': returns.index[t].strftime('%Y-%m-%d'),
+            'var': {key: float(result['var'][j, t, c]) for j, key in enumerate(keys)},
+            'es': {key: float(result['es'][j, t, c]) for j, key in enumerate(keys)},
+            'breach_rate': {key: (None if math.isnan(rates[j, c]) else float(rates[j, c]))
+                            for j, key in enumerate(keys)},
+        }
+    return {'frames': frames, 'latest': latest, 'levels': keys, 'index': returns.index}
@@ -0,0 +1,180 @@
+"""
+Pre-inference reduction of headline batches.
+
+FinBERT is the costliest step of the news pipeline, and much of what the news
+providers return is either syndicated copies of the same story (slightly
+different titles, a " - Source" suffix) or search hits that never mention the
+company (Twitter). Before scoring:
+
+    relevant_articles()  drops articles whose title/snippet does not mention the
+                         ticker's entity (TICKER_QUERY_MAP name, short name or symbol)
+    reduce_texts()       groups near-duplicates with MinHash over character
+                         shingles + LSH banding; only one text per group is scored
+                         and the others inherit its score via the returned mapping
+
+NEWS_RELEVANCE_FILTER=0 disables the relevance check; TEXT_DEDUP_THRESHOLD
+(estimated Jaccard similarity, default 0.7) sets how close two texts must be
+to share a score (1.0 keeps only exact normalized duplicates).
+"""
+from __future__ import annotations
+
+import os
+import re
+import zlib
+from functools import lru_cache
+from itertools import combinations
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from services import metrics
+
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16  # 4 rows per band: pairs above ~0.5 similarity become candidates
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_rng = np.random.default_rng(20240607)
+_A = _rng.integers(1, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+# Trailing " - Reuters" / " | Moneycontrol" added by syndication
+_SOURCE_SUFFIX = re.compile(r'\s+[-|–—]\s+[^-|–—]{2,40}$')
+# Words dropped from company names to get the short form used in headlines
+_GENERIC_WORDS = {'limited', 'ltd', 'industries', 'company', 'services', 'technologies',
+                  'laboratories', 'enterprises', 'corporation', 'corp', 'inc'}
+# Long headlines differing in one of these words are similar but not the same story
+_POLARITY_WORDS = {'rise', 'rises', 'rising', 'fall', 'falls', 'falling', 'gain', 'gains', 'loss', 'losses',
+                   'up', 'down', 'high', 'low', 'higher', 'lower', 'beat', 'beats', 'miss', 'misses',
+                   'surge', 'surges', 'slump', 'slumps', 'jump', 'jumps', 'drop', 'drops', 'plunge', 'plunges',
+                   'rally', 'rallies', 'upgrade', 'upgrades', 'downgrade', 'downgrades', 'profit', 'not', 'no',
+                   'record', 'weak', 'strong', 'cut', 'cuts', 'raise', 'raises', 'positive', 'negative'}
+
+
+def dedup_threshold() -> float:
+    return float(os.getenv('TEXT_DEDUP_THRESHOLD', '0.7'))
+
+
+def relevance_enabled() -> bool:
+    return os.getenv('NEWS_RELEVANCE_FILTER', '1') == '1'
+
+
+def normalize(text: str) -> str:
+    text = _SOURCE_SUFFIX.sub('', (text or '').strip())
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+# ---- relevance ----------------------------------------------------------------
+
+@lru_cache(maxsize=1024)
+def entity_pattern(ticker: str) -> re.Pattern:
+    """Word-boundary regex matching the company's name, short name or symbol."""
+    from services.news import TICKER_QUERY_MAP
+
+    aliases = set()
+    name = normalize(TICKER_QUERY_MAP.get(ticker, '').replace('"', ''))
+    if name:
+        aliases.add(name)
+        words = name.split()
+        while len(words) > 1 and words[-1] in _GENERIC_WORDS:
+            words.pop()
+        aliases.add(' '.join(words))
+    symbol = normalize(ticker.split('.')[0])
+    if len(symbol.replace(' ', '')) >= 3:
+        aliases.add(symbol)
+    alternatives = '|'.join(re.escape(a) for a in sorted(aliases, key=len, reverse=True))
+    return re.compile(rf'\b(?:{alternatives})\b')
+
+
+def is_relevant(article: Dict[str, Any], ticker: str) -> bool:
+    pattern = entity_pattern(ticker)
+    return any(pattern.search(normalize(article.get(field) or '')) for field in ('title', 'snippet'))
+
+
+def relevant_articles(articles: List[Dict[str, Any]], ticker: str) -> List[Dict[str, Any]]:
+    """Articles that mention `ticker`'s company (all of them when the filter is disabled)."""
+    if not relevance_enabled():
+        return articles
+    kept = [a for a in articles if is_relevant(a, ticker)]
+    metrics.inc('sentiment_texts_filtered_total', len(articles) - len(kept), reason='irrelevant')
+    return kept
+
+
+# ---- near-duplicates ----------------------------------------------------------
+
+def shingles(text: str, k: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the character k-grams of normalized `text`."""
+    norm = normalize(text)
+    grams = {norm[i:i + k] for i in range(max(1, len(norm) - k + 1))}
+    return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(hashes: np.ndarray) -> np.ndarray:
+    """NUM_PERM-long MinHash signature of a shingle hash set."""
+    if hashes.size == 0:
+        return np.zeros(NUM_PERM, dtype=np.uint64)
+    # (a*x + b) mod p for every (permutation, shingle); a, x < 2**32 so nothing overflows uint64
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME
+    return permuted.min(axis=1)
+
+
+def _same_polarity(a: str, b: str) -> bool:
+    """False when the words that differ between `a` and `b` include a polarity word (rise/fall, beat/miss, ...)."""
+    return not (set(normalize(a).split()) ^ set(normalize(b).split())) & _POLARITY_WORDS
+
+
+def reduce_texts(texts: List[str]) -> Tuple[List[str], List[int]]:
+    """
+    Collapse near-duplicate texts.
+
+    Returns (representatives, mapping) where mapping[i] is the index in
+    representatives whose score texts[i] should take. Representatives are
+    the first text of each group, in input order.
+    """
+    threshold = dedup_threshold()
+    group = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while group[i] != i:
+            group[i] = group[group[i]]
+            i = group[i]
+        return i
+
+    def union(i: int, j: int) -> None:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            group[max(ri, rj)] = min(ri, rj)
+
+    # Exact duplicates after normalization
+    first_seen: Dict[str, int] = {}
+    for i, text in enumerate(texts):
+        union(i, first_seen.setdefault(normalize(text), i))
+
+    distinct = [i for i in range(len(texts)) if find(i) == i]
+    if threshold < 1.0 and len(distinct) > 1:
+        signatures = np.stack([minhash(shingles(texts[i])) for i in distinct])
+        rows = NUM_PERM // BANDS
+        candidates = set()
+        for band in range(BANDS):
+            buckets: Dict[bytes, List[int]] = {}
+            for pos, sig in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+                buckets.setdefault(sig.tobytes(), []).append(pos)
+            for members in buckets.values():
+                candidates.update(combinations(members, 2))
+        for p, q in candidates:
+            if np.mean(signatures[p] == signatures[q]) >= threshold and _same_polarity(texts[distinct[p]],
+                                                                                       texts[distinct[q]]):
+                union(distinct[p], distinct[q])
+
+    representatives: List[str] = []
+    slot: Dict[int, int] = {}
+    mapping = []
+    for i in range(len(texts)):
+        root = find(i)
+        if root not in slot:
+            slot[root] = len(representatives)
+            representatives.append(texts[root])
+        mapping.append(slot[root])
+    metrics.inc('sentiment_texts_filtered_total', len(texts) - len(representatives), reason='duplicate')
+    return representatives, mapping
@@ -1,11 +1,15 @@
-import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 
+from services.market_data import get_provider
+
 class YahooFinanceService:
-    """Service to fetch stock data from Yahoo Finance using Ticker"""
+    """Service to fetch stock data through the configured market-data provider (Yahoo Finance by default)"""
     
-    def __init__(self):
+    def __init__(self, provider=None):
+        # Market data source (see services/market_data.py); resolved lazily when not given
+        self._provider = provider
+
         # ==========================================
         # NIFTY 50 CONSTITUENTS (static list, update as needed)
         # Set self.stocks to this list to fetch all 50 names
@@ -44,6 +48,10 @@ class YahooFinanceService:
         print(f"  - Total symbols: {len(self.stocks) + 2}")
         print(f"  - Historical data: Last {self.historical_years} years")
     
+    @property
+    def provider(self):
+        return self._provider or get_provider()
+
     def get_stock_data(self, symbol):
         """
         Fetch current data for a single stock using Ticker
@@ -57,18 +65,15 @@ class YahooFinanceService:
         try:
             print(f"Fetching data for {symbol}...")
             
-            # Create Ticker object
-            ticker = yf.Ticker(symbol)
-            
             # Get stock info
-            info = ticker.info
+            info = self.provider.info(symbol)
             
             # Get recent history to determine last traded price and previous close
-            hist = ticker.history(period="5d", interval="1d")
+            hist = self.provider.history(symbol, period="5d", interval="1d")
             
             # Try to get intraday data for most recent price (if market is open)
             try:
-                intraday = ticker.history(period="1d", interval="1m")
+                intraday = self.provider.history(symbol, period="1d", interval="1m")
                 if not intraday.empty:
                     # Use most recent intraday close as current price
                     most_recent_price = float(intraday['Close'].iloc[-1])
@@ -142,6 +147,8 @@ class YahooFinanceService:
                 'bookValue': round(info.get('bookValue', 0), 2) if info.get('bookValue') else 0,
                 'priceToBook': round(info.get('priceToBook', 0), 2) if info.get('priceToBook') else 0,
                 'lastUpdate': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                # Trading session of the latest daily bar (the snapshot's session is the newest of these)
+                'lastTradeDate': hist.index[-1].strftime('%Y-%m-%d') if not hist.empty else None,
                 'currency': info.get('currency', 'INR')
             }
             
@@ -186,16 +193,15 @@ class YahooFinanceService:
         try:
             print(f"Fetching index data for {index_symbol}...")
             
-            ticker = yf.Ticker(index_symbol)
-            info = ticker.info
+            info = self.provider.info(index_symbol)
             
             # Get recent history to determine last traded price and previous close
-            hist = ticker.history(period="5d", interval="1d")
+            hist = self.provider.history(index_symbol, period="5d", interval="1d")
             
             # Try to get intraday data for most recent price (if market is open)
             # Use 5m interval for indices as 1m might not be available
             try:
-                intraday = ticker.history(period="1d", interval="5m")
+                intraday = self.provider.history(index_symbol, period="1d", interval="5m")
                 if not intraday.empty:
                     # Use most recent intraday close as current price
                     most_recent_price = float(intraday['Close'].iloc[-1])
@@ -345,10 +351,8 @@ class YahooFinanceService:
             
             print(f"Fetching {period} historical data for {symbol}...")
             
-            ticker = yf.Ticker(symbol)
-            
             # Download historical data
-            hist = ticker.history(period=period, interval=interval)
+            hist = self.provider.history(symbol, period=period, interval=interval)
             
             if hist.empty:
                 print(f"[ERR] No historical data found for {symbol}")
@@ -403,12 +407,14 @@ class YahooFinanceService:
         print(f"\n✓ Historical data fetched for {len(all_historical)}/5 symbols")
         return all_historical
     
-    def download_all_data_to_csv(self, output_dir='data'):
+    def download_all_data_to_csv(self, output_dir='data', file_format='csv'):
         """
         Download 20 years data for all 5 symbols and save to CSV files
         
         Args:
             output_dir (str): Directory to save CSV files
+            file_format (str): 'csv' (default) or 'parquet' (requires pyarrow);
+                               both can be replayed offline with MARKET_DATA_PROVIDER=file
         """
         import os
         
@@ -435,11 +441,14 @@ class YahooFinanceService:
                     
                     # Create filename
                     symbol_name = symbol.replace('.', '_').replace('^', '')
-                    filename = f"{symbol_name}_{self.historical_years}years.csv"
+                    filename = f"{symbol_name}_{self.historical_years}years.{file_format}"
                     filepath = os.path.join(output_dir, filename)
                     
-                    # Save to CSV
-                    df.to_csv(filepath, index=False)
+                    # Save to CSV (or Parquet)
+                    if file_format == 'parquet':
+                        df.to_parquet(filepath, index=False)
+                    else:
+                        df.to_csv(filepath, index=False)
                     
                     print(f"[OK] Saved to: {filepath}")
                     print(f"  Records: {len(historical)}")
@@ -0,0 +1,63 @@
+"""
+Endpoint checks against the Flask app itself, with the load-test stand-ins
+for yfinance in place of Yahoo Finance. The app runs as a follower (no
+refresh jobs) in a temporary working directory, without the price panel.
+"""
+import os
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    import yfinance
+
+    from loadtest.stubs import install_yfinance_stub
+
+    saved = {name: os.environ.get(name) for name in ('UPDATER_MODE', 'PRICE_PANEL_ENABLED', 'ARTICLE_STORE_ENABLED',
+                                                     'UPSTREAM_STATE_DIR', 'SINGLEFLIGHT_ENABLED')}
+    originals = (yfinance.Ticker, yfinance.download)
+    cwd = os.getcwd()
+    os.environ.update({'UPDATER_MODE': 'follower', 'PRICE_PANEL_ENABLED': '0', 'ARTICLE_STORE_ENABLED': '0',
+                       'UPSTREAM_STATE_DIR': '', 'SINGLEFLIGHT_ENABLED': '0'})
+    os.chdir(tmp_path_factory.mktemp('app'))
+    install_yfinance_stub()
+    try:
+        import app as appmod
+        yield appmod.app.test_client()
+        appmod.scheduler.shutdown(wait=False)
+    finally:
+        os.chdir(cwd)
+        yfinance.Ticker, yfinance.download = originals
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        sys.modules.pop('app', None)
+
+
+def test_portfolio_var_cache_keeps_ticker_order(client):
+    from services import result_cache
+
+    result_cache.clear()
+    body = {'tickers': ['AAA.NS', 'BBB.NS'], 'weights': [1, 0], 'paths': 2000}
+    first = client.post('/api/portfolio_var', json=body)
+    assert first.status_code == 200 and first.headers['X-Cache'] == 'MISS'
+    # Same list weights, swapped tickers: a different portfolio (BBB only), not a cache hit
+    swapped = client.post('/api/portfolio_var', json=dict(body, tickers=['BBB.NS', 'AAA.NS']))
+    assert swapped.headers['X-Cache'] == 'MISS'
+    result_cache.clear()
+    bbb_only = client.post('/api/portfolio_var', json={'tickers': ['BBB.NS', 'AAA.NS'], 'weights': [1, 0],
+                                                       'paths': 2000}).get_json()
+    assert swapped.get_json()['var'] == bbb_only['var']
+    assert swapped.get_json()['var'] != first.get_json()['var']
+    assert client.post('/api/portfolio_var', json=dict(body, tickers=['BBB.NS', 'AAA.NS'])).headers['X-Cache'] == 'HIT'
+
+
+@pytest.mark.parametrize('window', [10, 20000])
+def test_tail_risk_rejects_windows_out_of_range(client, window):
+    response = client.post('/api/tail_risk', json={'tickers': ['AAA.NS'], 'window': window})
+    assert response.status_code == 400
+    assert 'window must be between 20 and' in response.get_json()['message']
@@ -0,0 +1,137 @@
+"""
+Article store ingest and coverage: backfill on first sight or after a gap,
+one-day top-ups while contiguous, deduplication, the per-pass request
+budget, and when covers() lets a request read stored articles instead of
+the news providers.
+"""
+import time
+
+import pytest
+
+from services import article_store, metrics, news, sentiment
+
+_DAY = 86400.0
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv('ARTICLE_STORE_ENABLED', '1')
+    monkeypatch.setattr(article_store, 'DB_PATH', str(tmp_path / 'articles.db'))
+    monkeypatch.setattr(article_store._local, 'conn', None, raising=False)
+    monkeypatch.setattr(article_store, '_article_count', None)
+    monkeypatch.setattr(article_store, '_budget_carry', 0.0)
+    monkeypatch.setattr(sentiment, 'analyze_texts', lambda texts, tier='auto': [
+        {'label': 'positive', 'confidence': 0.9, 'score': 0.9} for _ in texts])
+    calls = []
+    feed = {}
+
+    def fetch(tickers, lookback_days=7, page_size=10):
+        calls.append((tickers[0], lookback_days))
+        return {tickers[0]: list(feed.get(tickers[0], []))}
+
+    monkeypatch.setattr(news, 'fetch_news_for_tickers', fetch)
+    yield calls, feed
+    article_store._connect().close()
+
+
+def _article(title, hours_ago=1.0, url=None):
+    published = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() - hours_ago * 3600))
+    return {'title': title, 'snippet': '', 'url': url, 'source': 'wire', 'published_at': published}
+
+
+def _age_coverage(ticker, days):
+    conn = article_store._connect()
+    with conn:
+        conn.execute('UPDATE coverage SET ingested_ts = ingested_ts - ? WHERE ticker = ?', (days * _DAY, ticker))
+
+
+def test_first_ingest_backfills_and_covers_the_lookback(store):
+    calls, feed = store
+    feed['ABCXYZ.NS'] = [_article('ABCXYZ profit rises', url='https://x/1'),
+                         _article('ABCXYZ wins order', url='https://x/2'),
+                         _article('Markets close flat', url='https://x/3')]  # irrelevant, dropped
+    stats = article_store.ingest(['ABCXYZ.NS'])
+    assert calls == [('ABCXYZ.NS', article_store.INGEST_LOOKBACK_DAYS)]
+    assert stats == {'fetched': 2, 'new': 2, 'scored': 2, 'skipped': 0}
+    assert article_store.covers(['ABCXYZ.NS'], article_store.INGEST_LOOKBACK_DAYS)
+    assert not article_store.covers(['ABCXYZ.NS'], article_store.INGEST_LOOKBACK_DAYS + 2)
+    assert not article_store.covers(['ABCXYZ.NS', 'OTHER.NS'], 1)
+    stored = article_store.articles(['ABCXYZ.NS'], 7)['ABCXYZ.NS']
+    assert {a['title'] for a in stored} == {'ABCXYZ profit rises', 'ABCXYZ wins order'}
+    assert all(a['score'] == 0.9 for a in stored)
+
+
+def test_contiguous_ingest_tops_up_one_day_without_duplicates(store):
+    calls, feed = store
+    feed['ABCXYZ.NS'] = [_article('ABCXYZ profit rises', url='https://x/1')]
+    article_store.ingest(['ABCXYZ.NS'])
+    feed['ABCXYZ.NS'].append(_article('ABCXYZ names new CEO', url='https://x/4'))
+    stats = article_store.ingest(['ABCXYZ.NS'])
+    assert calls[-1] == ('ABCXYZ.NS', 1)
+    assert stats['new'] == 1
+    # The earlier backfill still counts towards coverage
+    assert article_store.covers(['ABCXYZ.NS'], article_store.INGEST_LOOKBACK_DAYS)
+
+
+def test_gap_restarts_coverage_from_a_new_backfill(store):
+    calls, feed = store
+    feed['ABCXYZ.NS'] = [_article('ABCXYZ profit rises', url='https://x/1')]
+    article_store.ingest(['ABCXYZ.NS'])
+    _age_coverage('ABCXYZ.NS', 2)
+    # Stale coverage is not served
+    assert not article_store.covers(['ABCXYZ.NS'], 1)
+    article_store.ingest(['ABCXYZ.NS'])
+    assert calls[-1] == ('ABCXYZ.NS', article_store.INGEST_LOOKBACK_DAYS)
+    row = article_store._connect().execute('SELECT covered_from_ts, ingested_ts FROM coverage').fetchone()
+    assert row['ingested_ts'] - row['covered_from_ts'] == pytest.approx(article_store.INGEST_LOOKBACK_DAYS * _DAY)
+
+
+def test_coverage_expires_after_max_age(store, monkeypatch):
+    calls, feed = store
+    article_store.ingest(['ABCXYZ.NS'])
+    assert article_store.covers(['ABCXYZ.NS'], 1)
+    monkeypatch.setattr(article_store, 'MAX_AGE_SECONDS', 60.0)
+    _age_coverage('ABCXYZ.NS', 120 / _DAY)
+    assert not article_store.covers(['ABCXYZ.NS'], 1)
+
+
+def test_count_gauge_comes_from_the_ingester(store):
+    calls, feed = store
+    assert 'article_store_articles ' not in metrics.render()
+    feed['ABCXYZ.NS'] = [_article('ABCXYZ profit rises', url='https://x/1')]
+    article_store.ingest(['ABCXYZ.NS'])
+    assert 'article_store_articles 1' in metrics.render()
+
+
+def test_pass_budget_spreads_the_daily_requests():
+    # 90 a day over 48 half-hour passes: 1.875 per pass, fractions carried over
+    budgets = [article_store.pass_budget(30, 90) for _ in range(48)]
+    assert set(budgets) == {1, 2}
+    assert sum(budgets) == 90
+
+
+def test_budget_goes_to_the_least_recently_ingested_tickers(store):
+    calls, feed = store
+    tickers = ['AAA.NS', 'BBB.NS', 'CCC.NS']
+    stats = article_store.ingest(tickers, budget=2)
+    assert [t for t, _ in calls] == ['AAA.NS', 'BBB.NS']
+    assert stats['skipped'] == 1
+    article_store.ingest(tickers, budget=2)
+    # Never-ingested CCC first, then the older of AAA/BBB
+    assert [t for t, _ in calls[2:]] == ['CCC.NS', 'AAA.NS']
+    assert article_store.ingest(tickers, budget=0)['skipped'] == 3
+
+
+def test_tickers_with_unscored_headlines_are_not_covered(store, monkeypatch):
+    calls, feed = store
+    feed['ABCXYZ.NS'] = [_article('ABCXYZ profit rises', url='https://x/1')]
+
+    def fail(texts, tier='auto'):
+        raise RuntimeError('model not available')
+
+    monkeypatch.setattr(sentiment, 'analyze_texts', fail)
+    stats = article_store.ingest(['ABCXYZ.NS', 'QUIET.NS'], budget=2)
+    assert stats['new'] == 1 and stats['scored'] == 0
+    assert not article_store.covers(['ABCXYZ.NS'], 1)
+    # Nothing to score for a ticker without headlines
+    assert article_store.covers(['QUIET.NS'], 1)
@@ -0,0 +1,87 @@
+"""
+Backtest indicators and the Likely Up/Down rule: the vectorized arrays must
+equal the latest-day functions /api/predict uses at every date, and
+/api/analyze must label tickers with the same rule.
+"""
+import numpy as np
+import pytest
+
+from services import backtest
+from services.analysis import Analysis
+from services.analytics import compute_momentum, compute_rsi
+
+
+@pytest.fixture(scope='module')
+def prices(synthetic_prices):
+    return synthetic_prices(12, 600, ragged=0.3)
+
+
+@pytest.mark.parametrize('row', [30, 299, 599])
+def test_indicators_match_latest_day_functions(prices, row):
+    history = prices.iloc[:row + 1]
+    values = prices.to_numpy()
+    np.testing.assert_allclose(backtest.momentum(values, 7)[row], compute_momentum(history, 7).to_numpy(),
+                               rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(backtest.rsi(values, 14)[row], compute_rsi(history, 14).to_numpy(),
+                               rtol=1e-9, equal_nan=True)
+
+
+def test_classify_matches_predict_rule():
+    params = backtest.DEFAULT_PARAMS
+    cases = [
+        ((0.02, 55.0, 0.5), 'Likely Up'),
+        ((0.02, float('nan'), 0.5), 'Likely Up'),
+        ((0.02, 75.0, 0.5), 'Uncertain'),
+        ((0.02, 55.0, 0.1), 'Uncertain'),
+        ((-0.02, 45.0, -0.5), 'Likely Down'),
+        ((-0.02, 25.0, -0.5), 'Uncertain'),
+        ((float('nan'), 50.0, 0.5), 'Uncertain'),
+    ]
+    for (m, r, s), label in cases:
+        assert backtest.LABELS[int(backtest.classify(m, r, s, params))] == label
+    assert backtest.LABELS[int(backtest.classify(0.02, 55.0, None, params))] == 'Likely Up'
+
+
+def test_confusion_matrix_counts_every_scored_cell(prices):
+    params = backtest.parse_params({'horizon': 3})
+    result = backtest.evaluate(prices, params)
+    values = prices.to_numpy()
+    scored = ~np.isnan(backtest.momentum(values, 7)) & ~np.isnan(backtest.forward_returns(values, 3))
+    counts = np.array(result['confusion_matrix']['counts'])
+    assert counts.shape == (3, 2)
+    assert counts.sum() == result['observations'] == scored.sum()
+    assert result['calls'] == counts[:2].sum()
+
+
+def test_sweep_is_ranked_and_walk_forward_covers_test_blocks(prices):
+    combos = backtest.parse_grid({'momentum_window': [5, 10], 'rsi_upper': [65, 80]}, backtest.DEFAULT_PARAMS)
+    assert len(combos) == 4
+    result = backtest.sweep(prices, combos, objective='total_return', folds=3)
+    returns = [r['strategy']['total_return'] for r in result['results']]
+    assert returns == sorted(returns, reverse=True)
+    single = backtest.evaluate(prices, result['results'][0]['params'])
+    assert single['confusion_matrix'] == result['results'][0]['confusion_matrix']
+    folds = result['walk_forward']['folds']
+    assert len(folds) == 3
+    assert sum(f['out_of_sample']['observations'] for f in folds) == result['walk_forward']['out_of_sample']['observations']
+
+
+def test_parse_grid_rejects_unknown_and_oversized(monkeypatch):
+    with pytest.raises(ValueError):
+        backtest.parse_grid({'lookahead': [1]}, backtest.DEFAULT_PARAMS)
+    monkeypatch.setenv('BACKTEST_MAX_COMBINATIONS', '3')
+    with pytest.raises(ValueError):
+        backtest.parse_grid({'horizon': [1, 2], 'rsi_period': [9, 14]}, backtest.DEFAULT_PARAMS)
+
+
+def test_analyze_predictions_use_the_backtested_rule(prices):
+    tickers = list(prices.columns)
+    analysis = Analysis(tickers)
+    analysis.adj = prices  # cached_property: skip the market data fetch
+    sentiment = dict(zip(tickers, np.linspace(-0.6, 0.6, len(tickers))))
+    analysis.news_sentiment = (sentiment, {t: [] for t in tickers})
+    predictions = analysis.section_predictions()
+    mom, rsi_values = analysis.mom, analysis.rsi
+    for t in tickers:
+        expected = backtest.classify(mom[t], rsi_values[t], sentiment[t], backtest.DEFAULT_PARAMS)
+        assert predictions[t]['prediction'] == backtest.LABELS[int(expected)]
@@ -0,0 +1,77 @@
+"""
+Numerical equivalence of the BLAS correlation engine with pandas DataFrame.corr().
+
+Offline (no market data or API keys needed):
+    cd backend && python -m pytest -q test_correlation.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.analytics import compute_correlation_matrix
+from services.correlation import pairwise_correlation
+
+
+def ragged_returns(n_obs=400, n_cols=60, seed=7):
+    """Correlated returns with staggered listing dates and scattered gaps, like an NSE panel."""
+    rng = np.random.default_rng(seed)
+    factor = rng.standard_normal((n_obs, 1))
+    values = 0.6 * factor + rng.standard_normal((n_obs, n_cols))
+    listed = rng.integers(0, n_obs // 2, size=n_cols)
+    for j, first in enumerate(listed):
+        values[:first, j] = np.nan
+    values[rng.random((n_obs, n_cols)) < 0.05] = np.nan
+    return pd.DataFrame(values * 0.01, columns=[f'S{j}' for j in range(n_cols)])
+
+
+def assert_matches_pandas(ours, expected, atol):
+    ours = np.asarray(ours)
+    expected = expected.to_numpy()
+    np.testing.assert_array_equal(np.isnan(ours), np.isnan(expected))
+    np.testing.assert_allclose(ours, expected, atol=atol, rtol=0, equal_nan=True)
+
+
+def test_complete_data_matches_pandas():
+    rets = ragged_returns().dropna()
+    assert_matches_pandas(compute_correlation_matrix(rets), rets.corr(), atol=1e-12)
+
+
+def test_ragged_data_matches_pandas():
+    rets = ragged_returns()
+    assert_matches_pandas(compute_correlation_matrix(rets), rets.corr(), atol=1e-12)
+
+
+@pytest.mark.parametrize('min_periods', [1, 150, 300])
+def test_min_periods_matches_pandas(min_periods):
+    rets = ragged_returns()
+    assert_matches_pandas(compute_correlation_matrix(rets, min_periods=min_periods),
+                          rets.corr(min_periods=min_periods), atol=1e-12)
+
+
+def test_degenerate_columns_are_nan_like_pandas():
+    rets = ragged_returns(n_cols=8)
+    rets['S0'] = 0.002             # constant -> zero variance
+    rets['S1'] = np.nan            # never listed
+    rets.loc[rets.index[:-1], 'S2'] = np.nan  # a single observation
+    assert_matches_pandas(compute_correlation_matrix(rets), rets.corr(), atol=1e-12)
+
+
+def test_blockwise_equals_single_block():
+    values = ragged_returns(n_cols=97).to_numpy()
+    whole = pairwise_correlation(values)
+    for block_size in (1, 16, 50):
+        np.testing.assert_allclose(pairwise_correlation(values, block_size=block_size), whole,
+                                   atol=1e-13, rtol=0, equal_nan=True)
+
+
+def test_float32_mode_is_close_to_pandas():
+    rets = ragged_returns()
+    corr = compute_correlation_matrix(rets, dtype='float32')
+    assert corr.dtypes.eq(np.float64).all()
+    assert_matches_pandas(corr, rets.corr(), atol=1e-5)
+
+
+def test_result_is_symmetric_with_unit_diagonal():
+    corr = pairwise_correlation(ragged_returns().to_numpy(), block_size=16)
+    np.testing.assert_array_equal(corr, corr.T)
+    np.testing.assert_array_equal(np.diagonal(corr), 1.0)
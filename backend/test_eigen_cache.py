@@ -0,0 +1,63 @@
+"""
+Cached rolling eigen-spectra must equal a direct eigendecomposition of every
+window, compute only the windows not stored yet, and keep the cache
+directory within EIGEN_CACHE_MAX_MB.
+
+    cd backend && python -m pytest -q test_eigen_cache.py
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import eigen_cache
+
+
+def returns(n, t, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0.0, 0.01, size=(t, 1)) + rng.normal(0.0, 0.01, size=(t, n))
+    return pd.DataFrame(values, index=pd.bdate_range('2020-01-01', periods=t),
+                        columns=[f'S{seed}_{j}' for j in range(n)])
+
+
+@pytest.fixture(autouse=True)
+def fresh_memory():
+    eigen_cache.clear_memory()
+    yield
+    eigen_cache.clear_memory()
+
+
+def test_matches_direct_eigendecomposition_and_extends(tmp_path):
+    rets = returns(6, 140)
+    window = 30
+    first = eigen_cache.rolling_spectrum(rets.iloc[:120], window, directory=str(tmp_path))
+    assert first['computed'] == 90
+    full = eigen_cache.rolling_spectrum(rets, window, directory=str(tmp_path))
+    assert full['computed'] == 20
+    for k, i in enumerate(range(window, len(rets.index))):
+        expected = np.sort(np.linalg.eigvalsh(rets.iloc[i - window:i].corr().to_numpy()))[::-1]
+        np.testing.assert_allclose(full['spectrum'][k], expected, rtol=1e-9, atol=1e-12)
+        assert full['lambda1'][k] == pytest.approx(expected[0], rel=1e-9)
+    # Column order does not matter, and everything is cached now
+    again = eigen_cache.rolling_spectrum(rets[rets.columns[::-1]], window, directory=str(tmp_path))
+    assert again['computed'] == 0 and again['lambda1'] == full['lambda1']
+
+
+def test_least_recently_used_files_are_pruned(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    panels = [returns(4, 80, seed) for seed in range(4)]
+    eigen_cache.rolling_spectrum(panels[0], 20, directory=directory)
+    size = os.path.getsize(eigen_cache._path(eigen_cache.cache_key(panels[0].columns, 20), directory))
+    monkeypatch.setenv('EIGEN_CACHE_MAX_MB', str(2.5 * size / 1e6))
+    keys = [eigen_cache.cache_key(p.columns, 20) for p in panels]
+    eigen_cache.rolling_spectrum(panels[1], 20, directory=directory)
+    # Access times can tie on coarse filesystem clocks; age panel 0's file explicitly
+    oldest = eigen_cache._path(keys[0], directory)
+    os.utime(oldest, ns=(1, os.stat(oldest).st_mtime_ns))
+    eigen_cache.rolling_spectrum(panels[1], 20, directory=directory)  # a read marks panel 1 as recently used
+    eigen_cache.rolling_spectrum(panels[2], 20, directory=directory)
+    stored = {name[len('eigen-'):-len('.npz')] for name in os.listdir(directory)}
+    assert stored == {keys[1], keys[2]}
+    assert keys[0] not in eigen_cache._key_locks
+    assert eigen_cache.rolling_spectrum(panels[0], 20, directory=directory)['computed'] == 60
@@ -0,0 +1,115 @@
+"""
+Upstream governor: token bucket (per process and shared through its state
+file), backoff schedule, circuit breaker transitions, and which failures are
+retried.
+"""
+import time
+
+import pandas as pd
+import pytest
+
+from services import governor, market_data
+
+
+@pytest.fixture
+def gov(tmp_path, monkeypatch):
+    monkeypatch.setenv('UPSTREAM_STATE_DIR', str(tmp_path))
+    monkeypatch.setenv('UPSTREAM_BACKOFF_BASE_MS', '0')
+    monkeypatch.setenv('UPSTREAM_MAX_RETRIES', '2')
+    monkeypatch.setenv('UPSTREAM_BREAKER_THRESHOLD', '3')
+    monkeypatch.setenv('UPSTREAM_BREAKER_RESET_SECONDS', '0.2')
+    return governor.Governor('test')
+
+
+def test_token_bucket_allows_bursts_then_refills():
+    bucket = governor.TokenBucket(rate=20, burst=3)
+    assert all(bucket.acquire(0) for _ in range(3))
+    assert not bucket.acquire(0)
+    started = time.monotonic()
+    assert bucket.acquire(1)
+    assert 0.02 < time.monotonic() - started < 0.5
+
+
+def test_shared_bucket_is_one_budget_across_instances(tmp_path):
+    path = str(tmp_path / 'upstream-yfinance.bucket')
+    # Separate instances stand in for worker processes sharing the cache dir
+    a = governor.SharedTokenBucket(path, rate=0.01, burst=4)
+    b = governor.SharedTokenBucket(path, rate=0.01, burst=4)
+    taken = [a.acquire(0), b.acquire(0), a.acquire(0), b.acquire(0), a.acquire(0), b.acquire(0)]
+    assert taken == [True] * 4 + [False] * 2
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setenv('UPSTREAM_BACKOFF_BASE_MS', '100')
+    monkeypatch.setenv('UPSTREAM_BACKOFF_MAX_MS', '500')
+    monkeypatch.setenv('UPSTREAM_STATE_DIR', '')
+    monkeypatch.setattr(governor.random, 'uniform', lambda low, high: high)
+    g = governor.Governor('test')
+    assert [g.backoff(i) for i in range(5)] == pytest.approx([0.1, 0.2, 0.4, 0.5, 0.5])
+
+
+def test_breaker_opens_fails_fast_and_recovers_after_a_trial(gov):
+    def down():
+        raise ConnectionError('reset by peer')
+
+    with pytest.raises(ConnectionError):
+        gov.call(down)  # the first try and two retries reach the threshold
+    assert gov.breaker.state == governor.CircuitBreaker.OPEN
+    with pytest.raises(governor.CircuitOpenError):
+        gov.call(lambda: 'never called')
+
+    time.sleep(0.25)
+    assert gov.breaker.allow()  # the single half-open trial
+    assert gov.breaker.state == governor.CircuitBreaker.HALF_OPEN
+    assert not gov.breaker.allow()
+    gov.breaker.record_failure()
+    assert gov.breaker.state == governor.CircuitBreaker.OPEN
+
+    time.sleep(0.25)
+    assert gov.call(lambda: 'ok') == 'ok'
+    assert gov.breaker.state == governor.CircuitBreaker.CLOSED
+
+
+class _HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(status)
+        self.response = type('Response', (), {'status_code': status})()
+
+
+@pytest.mark.parametrize('error,retried', [
+    (ConnectionError('refused'), True),
+    (TimeoutError('read'), True),
+    (_HTTPError(429), True),
+    (_HTTPError(503), True),
+    (governor.EmptyResponseError('empty'), True),
+    (_HTTPError(404), False),
+    (ValueError('bad symbol'), False),
+    (KeyError('regularMarketPrice'), False),
+])
+def test_only_transient_failures_are_retried(gov, error, retried):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise error
+        return 'ok'
+
+    if retried:
+        assert gov.call(flaky) == 'ok'
+        assert len(attempts) == 2
+    else:
+        with pytest.raises(type(error)):
+            gov.call(flaky)
+        assert len(attempts) == 1
+    assert gov.breaker.state == governor.CircuitBreaker.CLOSED
+
+
+def test_empty_bulk_download_counts_as_a_failure(gov, monkeypatch):
+    import yfinance
+
+    monkeypatch.setattr(market_data, 'get_governor', lambda name: gov)
+    monkeypatch.setattr(yfinance, 'download', lambda **kwargs: pd.DataFrame())
+    with pytest.raises(governor.EmptyResponseError):
+        market_data.YFinanceProvider().download(['AAA.NS', 'BBB.NS'])
+    assert gov.breaker.state == governor.CircuitBreaker.OPEN
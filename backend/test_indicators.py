@@ -0,0 +1,69 @@
+"""
+IndicatorEngine series against pandas rolling windows and the latest-day
+RSI/momentum functions, bar-by-bar update() against a full run, and
+refresh() publication (appended bars, rebuilt history).
+"""
+import numpy as np
+import pytest
+
+from services import indicators
+from services.analytics import compute_momentum, compute_rsi
+
+
+@pytest.fixture(scope='module')
+def prices(synthetic_prices):
+    return synthetic_prices(8, 400, ragged=0.3)
+
+
+@pytest.fixture(scope='module')
+def series(prices):
+    return indicators.IndicatorEngine(list(prices.columns)).run(prices)
+
+
+def test_moving_averages_and_bands_match_pandas(prices, series):
+    np.testing.assert_allclose(series['sma_20'], prices.rolling(20).mean().to_numpy(), rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(series['sma_50'], prices.rolling(50).mean().to_numpy(), rtol=1e-9, equal_nan=True)
+    std = prices.rolling(20).std(ddof=0).to_numpy()
+    np.testing.assert_allclose(series['bb_upper'], prices.rolling(20).mean().to_numpy() + 2 * std,
+                               rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(series['macd_hist'], series['macd'] - series['macd_signal'], rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize('row', [30, 250, 399])
+def test_rsi_and_momentum_match_latest_day_functions(prices, series, row):
+    history = prices.iloc[:row + 1]
+    np.testing.assert_allclose(series['rsi_14'][row], compute_rsi(history, 14).to_numpy(), rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(series['rsi_wilder_14'][row], compute_rsi(history, 14, method='wilder').to_numpy(),
+                               rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(series['momentum_7'][row], compute_momentum(history, 7).to_numpy(),
+                               rtol=1e-12, equal_nan=True)
+
+
+def test_updates_reproduce_full_series(prices, series):
+    split = 300
+    engine = indicators.IndicatorEngine(list(prices.columns))
+    engine.run(prices.iloc[:split])
+    for i, (date, row) in enumerate(zip(prices.index[split:], prices.to_numpy()[split:])):
+        step = engine.update(date, row)
+        for name in indicators.NAMES:
+            np.testing.assert_allclose(step[name], series[name][split + i], rtol=1e-9, atol=1e-12, equal_nan=True,
+                                       err_msg=name)
+
+
+def test_refresh_applies_new_bars_and_rebuilds_revised_history(prices, series, tmp_path):
+    directory = str(tmp_path)
+    indicators.refresh(prices.iloc[:350], directory=directory)
+    indicators.refresh(prices, directory=directory)
+    published = indicators.IndicatorSeries.attach(directory)
+    assert len(published.dates) == len(prices.index)
+    for k, name in enumerate(indicators.NAMES):
+        np.testing.assert_allclose(published.values[k], series[name], rtol=1e-9, atol=1e-12, equal_nan=True,
+                                   err_msg=name)
+
+    revised = prices.copy()
+    revised.iloc[:, 0] *= 0.5
+    indicators.refresh(revised, directory=directory)
+    rebuilt = indicators.IndicatorSeries.attach(directory)
+    frames = rebuilt.frames(['sma_20'], [prices.columns[0]])
+    np.testing.assert_allclose(frames['sma_20'].to_numpy()[:, 0], 0.5 * series['sma_20'][:, 0],
+                               rtol=1e-9, equal_nan=True)
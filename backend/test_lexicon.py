@@ -0,0 +1,51 @@
+"""
+Lexicon sentiment tier: polarity from the word lists, negation within the
+three preceding tokens of the same text, and the Master Dictionary override.
+"""
+import pytest
+
+from services import lexicon
+
+
+@pytest.fixture(autouse=True)
+def builtin_lists(monkeypatch):
+    monkeypatch.delenv('LEXICON_PATH', raising=False)
+    monkeypatch.setattr(lexicon, '_vocab', None)
+
+
+def labels(texts):
+    return [r['label'] for r in lexicon.analyze_texts(texts)]
+
+
+def test_polarity_and_record_shape():
+    results = lexicon.analyze_texts(['Profit surges to a record high', 'Shares plunge after fraud probe',
+                                     'Board meeting on Tuesday', ''])
+    assert [r['label'] for r in results] == ['positive', 'negative', 'neutral', 'neutral']
+    assert results[0]['score'] == results[0]['confidence'] > 0
+    assert results[1]['score'] == -results[1]['confidence'] < 0
+    assert results[2] == {'label': 'neutral', 'confidence': 0.5, 'score': 0.0}
+    assert lexicon.analyze_texts([]) == []
+
+
+@pytest.mark.parametrize('text,label', [
+    ('Results were not good', 'negative'),
+    ('No growth expected this year', 'negative'),
+    ('Company has never defaulted on its debt', 'positive'),
+    ('Shares did not fall', 'positive'),
+    # Beyond the three-token window the negator no longer applies
+    ('Not that anyone asked but margins improved', 'positive'),
+])
+def test_negation_window(text, label):
+    assert labels([text]) == [label]
+
+
+def test_negation_does_not_cross_texts():
+    # The trailing "not" of the first text must not flip the start of the second
+    assert labels(['Is it good or not', 'Strong quarter']) == ['positive', 'positive']
+
+
+def test_master_dictionary_replaces_builtin_lists(tmp_path, monkeypatch):
+    path = tmp_path / 'master.csv'
+    path.write_text('Word,Positive,Negative\nWIDGETS,2009,0\nGLUT,0,2009\nPROFIT,0,0\n', encoding='utf-8')
+    monkeypatch.setenv('LEXICON_PATH', str(path))
+    assert labels(['Widgets everywhere', 'A glut of supply', 'Profit']) == ['positive', 'negative', 'neutral']
@@ -0,0 +1,37 @@
+"""
+Provider interface and the offline FileProvider: incomplete providers fail
+when built, and archives come back in the yf.download layout.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import market_data
+
+
+def test_incomplete_provider_fails_on_construction():
+    class NoInfo(market_data.MarketDataProvider):
+        def download(self, symbols, start=None, end=None, fields=market_data.DEFAULT_FIELDS):
+            return pd.DataFrame()
+
+        def history(self, symbol, period='1y', interval='1d'):
+            return pd.DataFrame()
+
+    with pytest.raises(TypeError):
+        NoInfo()
+
+
+def test_file_provider_reads_archives(tmp_path, synthetic_prices):
+    prices = synthetic_prices(2, 30, ragged=0.0)
+    for symbol in prices.columns:
+        close = prices[symbol].to_numpy()
+        pd.DataFrame({'date': prices.index, 'open': close, 'high': close * 1.01, 'low': close * 0.99,
+                      'close': close, 'volume': np.arange(len(close))}).to_csv(
+            tmp_path / f'{market_data.archive_key(symbol)}_20years.csv', index=False)
+    provider = market_data.FileProvider(str(tmp_path))
+    symbols = list(prices.columns) + ['MISSING.NS']
+    data = provider.download(symbols, start=str(prices.index[5].date()), end=str(prices.index[20].date()))
+    assert list(data.columns.get_level_values(0).unique()) == ['Adj Close']
+    np.testing.assert_allclose(data['Adj Close'][prices.columns].to_numpy(), prices.iloc[5:20].to_numpy())
+    assert provider.history('MISSING.NS').empty
+    assert provider.info(prices.columns[0])['regularMarketPrice'] == pytest.approx(prices.iloc[-1, 0])
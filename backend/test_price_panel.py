@@ -0,0 +1,33 @@
+"""
+Shared price panel: published slices read back exactly, and open-ended
+requests use the panel only while it holds the quote snapshot's latest session.
+"""
+import numpy as np
+import pandas as pd
+
+from services import leader, price_panel
+
+
+def test_open_ended_coverage_follows_the_snapshot_session(tmp_path, monkeypatch, synthetic_prices):
+    monkeypatch.setattr(leader, '_snapshot_session', None)
+    prices = synthetic_prices(3, 50, ragged=0.0)
+    directory = str(tmp_path / 'panel')
+    price_panel.publish(prices, directory)
+    panel = price_panel.PricePanel.attach(directory)
+    symbols = list(prices.columns)
+    np.testing.assert_array_equal(panel.frame(symbols[:2], start=str(prices.index[10].date())).to_numpy(),
+                                  prices.iloc[10:, :2].to_numpy())
+
+    last = prices.index[-1]
+    snapshot = str(tmp_path / 'cache_data.json')
+    leader.write_snapshot(snapshot, {'stocks': [], 'session': last.strftime('%Y-%m-%d')})
+    assert panel.covers(symbols)
+    # The leader's quotes moved on to a session the panel does not have yet
+    leader.write_snapshot(snapshot, {'stocks': [], 'session': (last + pd.Timedelta(days=1)).strftime('%Y-%m-%d')})
+    assert not panel.covers(symbols)
+    assert panel.covers(symbols, end=str((last + pd.Timedelta(days=1)).date()))
+    # A follower sees the same through the snapshot it reloads
+    leader.write_snapshot(snapshot, {'stocks': [], 'session': last.strftime('%Y-%m-%d')})
+    loaded, _ = leader.read_snapshot_if_changed(snapshot, None)
+    assert loaded['session'] == leader.snapshot_session() and panel.covers(symbols)
+    assert not panel.covers(symbols + ['NOPE.NS'])
@@ -0,0 +1,85 @@
+"""
+Analytics result cache: keys built from normalized parameters and the market
+data version, hits served byte-for-byte, and responses that must not be
+reused (errors, no-store) kept out.
+"""
+import pytest
+from flask import Flask, jsonify
+
+from services import leader, result_cache
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv('RESULT_CACHE_ENABLED', '1')
+    monkeypatch.setattr(result_cache, 'market_data_version', lambda: 'v1')
+    result_cache.clear()
+    flask_app = Flask(__name__)
+    runs = []
+
+    @flask_app.route('/api/corr', methods=['POST'])
+    @result_cache.cached_result(defaults={'tickers': [], 'window': 60}, unordered=('tickers',))
+    def corr():
+        runs.append(1)
+        return jsonify({'success': True, 'run': len(runs)})
+
+    @flask_app.route('/api/placeholder', methods=['POST'])
+    @result_cache.cached_result()
+    def placeholder():
+        runs.append(1)
+        response = jsonify({'success': True, 'run': len(runs)})
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    @flask_app.route('/api/failing', methods=['POST'])
+    @result_cache.cached_result()
+    def failing():
+        runs.append(1)
+        return jsonify({'success': False, 'message': 'upstream'}), 502
+
+    flask_app.runs = runs
+    yield flask_app
+    result_cache.clear()
+
+
+def test_key_ignores_parameter_order_defaults_and_debug_flags(app):
+    c = app.test_client()
+    first = c.post('/api/corr', json={'tickers': ['A', 'B'], 'window': 60})
+    assert first.headers['X-Cache'] == 'MISS'
+    for body in ({'tickers': ['B', 'A']}, {'window': '60', 'tickers': ['A', 'B'], 'debug': True},
+                 {'tickers': ['A', 'B'], 'profile': 1}):
+        again = c.post('/api/corr', json=body)
+        assert again.headers['X-Cache'] == 'HIT'
+        assert again.get_data() == first.get_data()
+    assert len(app.runs) == 1
+    assert c.post('/api/corr', json={'tickers': ['A', 'B'], 'window': 90}).headers['X-Cache'] == 'MISS'
+
+
+def test_key_changes_with_market_data_version(app, monkeypatch):
+    c = app.test_client()
+    c.post('/api/corr', json={'tickers': ['A']})
+    assert c.post('/api/corr', json={'tickers': ['A']}).headers['X-Cache'] == 'HIT'
+    monkeypatch.setattr(result_cache, 'market_data_version', lambda: 'v2')
+    response = c.post('/api/corr', json={'tickers': ['A']})
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['run'] == 2
+
+
+@pytest.mark.parametrize('route', ['/api/placeholder', '/api/failing'])
+def test_no_store_and_errors_are_not_cached(app, route):
+    c = app.test_client()
+    for _ in range(2):
+        assert c.post(route, json={}).headers['X-Cache'] == 'MISS'
+    assert len(app.runs) == 2
+
+
+def test_version_follows_snapshot_when_panel_disabled(tmp_path, monkeypatch):
+    monkeypatch.setenv('PRICE_PANEL_ENABLED', '0')
+    monkeypatch.setattr(leader, '_snapshot_version', None)
+    monkeypatch.setattr(leader, '_snapshot_session', None)
+    assert result_cache.market_data_version().startswith('day:')
+    path = str(tmp_path / 'snapshot.json')
+    version = leader.write_snapshot(path, {'stocks': {}})
+    assert result_cache.market_data_version() == f'snapshot:{version}'
+    leader.write_snapshot(path, {'stocks': {}, 'version': version})
+    assert result_cache.market_data_version() != f'snapshot:{version}'
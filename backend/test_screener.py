@@ -0,0 +1,60 @@
+"""
+Screener parsing, and screens answered through the sorted column indexes
+against a plain row-by-row filter of the same table.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import screener
+
+
+@pytest.fixture(scope='module')
+def table(synthetic_prices):
+    prices = synthetic_prices(60, 400, ragged=0.3)
+    quotes = [{'symbol': s, 'name': s.lower(), 'pe': float(i % 7) * 5, 'changePercent': (i % 11) - 5.0}
+              for i, s in enumerate(prices.columns[:45])]
+    return screener.build(prices, quotes)
+
+
+def _frame(table):
+    return pd.DataFrame(table.columns, index=table.symbols)
+
+
+@pytest.mark.parametrize('where', [
+    'rsi_14 < 50 and momentum_7 > 0',
+    'volatility <= 25% and rsi_wilder_14 >= 40',
+    'changePercent == 0',
+    'changePercent != 0 and pe > 10',
+    [{'field': 'rsi_14', 'op': 'between', 'value': [60, 40]}],
+])
+def test_screen_matches_row_filter(table, where):
+    predicates = screener.parse(where)
+    frame = _frame(table)
+    keep = pd.Series(True, index=frame.index)
+    for p in predicates:
+        col = frame[p.field]
+        keep &= {
+            '<': lambda: col < p.value, '<=': lambda: col <= p.value,
+            '>': lambda: col > p.value, '>=': lambda: col >= p.value,
+            '==': lambda: col == p.value, '!=': lambda: col.notna() & (col != p.value),
+            'between': lambda: col.between(min(p.value), max(p.value)),
+        }[p.op]()
+    result = table.screen(predicates)
+    assert [r['symbol'] for r in result['results']] == list(frame.index[keep.to_numpy()])
+    assert result['matched'] == keep.sum()
+
+
+def test_sort_puts_missing_last_and_respects_limit(table):
+    result = table.screen(screener.parse('momentum_7 > -1'), sort='pe', descending=True, limit=100)
+    pe = [r['pe'] for r in result['results']]
+    present = [v for v in pe if v is not None]
+    assert present == sorted(present, reverse=True)
+    assert pe[len(present):] == [None] * (len(pe) - len(present))
+    assert len(table.screen([], limit=5)['results']) == 5
+
+
+def test_parse_rejects_unknown_fields_and_syntax():
+    for bad in ('rsi < 30', 'rsi_14 ~ 30', 'rsi_14 < 30 or pe > 1', 7):
+        with pytest.raises(ValueError):
+            screener.parse(bad)
@@ -1,14 +1,92 @@
-import requests, json
-url='http://127.0.0.1:5000/api/sentiment-adjusted-corr'
-body={'tickers':['INFY.NS','SBIN.NS','TCS.NS'],'lookback_days':7,'alpha':0.3}
-res = requests.post(url,json=body)
-print('status',res.status_code)
-j=res.json()
-print('tickers',j.get('tickers'))
-print('sentiment',j.get('sentiment'))
-print('raw')
-for r in j.get('raw',[]):
-    print(r)
-print('adjusted')
-for r in j.get('adjusted',[]):
-    print(r)
+"""
+FinBERT micro-batching: concurrent callers are coalesced into shared batches
+bounded by max_batch, each gets its own results back in order, a failed
+forward pass is raised in every caller waiting on it, and the batch time
+reaches each caller's request timings.
+"""
+import threading
+import time
+
+from services import metrics
+from services.sentiment import MicroBatcher
+
+
+class FakeModel:
+    def __init__(self, delay=0.05, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self.lock:
+            self.batches.append(list(texts))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('CUDA out of memory')
+        return [{'label': 'positive', 'confidence': 1.0, 'score': float(len(t))} for t in texts]
+
+
+def submit_concurrently(batcher, requests):
+    barrier = threading.Barrier(len(requests))
+    outcomes = [None] * len(requests)
+
+    def run(i):
+        barrier.wait()
+        try:
+            outcomes[i] = batcher.submit(requests[i])
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(requests))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    return outcomes
+
+
+def test_concurrent_callers_share_batches_and_get_their_own_results():
+    model = FakeModel()
+    batcher = MicroBatcher(model, max_batch=8, max_wait=0.05)
+    requests = [[f'headline {i} {j}' + 'x' * j for j in range(3)] for i in range(6)]
+    outcomes = submit_concurrently(batcher, requests)
+    for texts, results in zip(requests, outcomes):
+        assert [r['score'] for r in results] == [float(len(t)) for t in texts]
+    assert sum(len(b) for b in model.batches) == 18
+    assert all(len(b) <= 8 for b in model.batches)
+    assert len(model.batches) < len(requests)
+    assert batcher.expected_wait(8) > 0
+
+
+def test_identical_texts_across_callers_are_scored_once():
+    model = FakeModel()
+    batcher = MicroBatcher(model, max_batch=32, max_wait=0.05)
+    outcomes = submit_concurrently(batcher, [['same', 'a'], ['same', 'b'], ['same']])
+    assert all(results[0]['score'] == 4.0 for results in outcomes)
+    assert sorted(t for b in model.batches for t in b) == ['a', 'b', 'same']
+
+
+def test_failed_batch_raises_in_every_waiting_caller():
+    model = FakeModel(fail=True)
+    batcher = MicroBatcher(model, max_batch=32, max_wait=0.05)
+    outcomes = submit_concurrently(batcher, [['one'], ['two', 'three'], ['four']])
+    assert all(isinstance(o, RuntimeError) and 'out of memory' in str(o) for o in outcomes)
+    # The worker survives the failure
+    model.fail = False
+    assert batcher.submit(['five'])[0]['score'] == 4.0
+
+
+def test_single_caller_is_not_held_past_max_wait():
+    batcher = MicroBatcher(FakeModel(delay=0), max_batch=32, max_wait=0.01)
+    started = time.monotonic()
+    batcher.submit(['alone'])
+    assert time.monotonic() - started < 0.5
+
+
+def test_batch_time_reaches_the_callers_request_timings():
+    batcher = MicroBatcher(FakeModel(delay=0.05), max_batch=32, max_wait=0.01)
+    metrics.begin_request_timings()
+    batcher.submit(['a', 'b'])
+    timings = dict(metrics.end_request_timings())
+    assert timings['finbert_batch'] >= 0.05
@@ -0,0 +1,118 @@
+"""
+Single-flight coalescing: concurrent callers with one key share one
+execution and its result or exception; the coalesce decorator gives every
+identical concurrent request a copy of one response, with the leader's stage
+timings in its Server-Timing.
+"""
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from services import metrics, singleflight
+
+
+def _concurrently(n, fn):
+    barrier = threading.Barrier(n)
+    outcomes = [None] * n
+
+    def run(i):
+        barrier.wait()
+        try:
+            outcomes[i] = ('ok', fn())
+        except Exception as e:
+            outcomes[i] = ('error', e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    return outcomes
+
+
+def test_concurrent_callers_run_once_and_share_the_result():
+    flight = singleflight.SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'value': 42}
+
+    outcomes = _concurrently(8, lambda: flight.do('k', work))
+    assert len(calls) == 1
+    assert [o[1][0] for o in outcomes] == [{'value': 42}] * 8
+    assert sorted(o[1][1] for o in outcomes) == [False] + [True] * 7
+    assert flight.in_flight() == 0
+    # Later calls start over
+    assert flight.do('k', lambda: 7) == (7, False)
+
+
+def test_every_waiter_sees_the_exception():
+    flight = singleflight.SingleFlight()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.2)
+        raise RuntimeError('upstream down')
+
+    outcomes = _concurrently(6, lambda: flight.do('k', fail))
+    assert len(calls) == 1
+    assert all(kind == 'error' and str(e) == 'upstream down' for kind, e in outcomes)
+    assert flight.in_flight() == 0
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv('SINGLEFLIGHT_ENABLED', '1')
+    flask_app = Flask(__name__)
+    runs = []
+
+    @flask_app.before_request
+    def begin():
+        metrics.begin_request_timings()
+
+    @flask_app.after_request
+    def server_timing(response):
+        response.headers['Server-Timing'] = metrics.server_timing_header(metrics.end_request_timings())
+        return response
+
+    @flask_app.route('/api/slow', methods=['POST'])
+    @singleflight.coalesce
+    def slow():
+        runs.append(1)
+        with metrics.stage('compute'):
+            time.sleep(0.2)
+        return jsonify({'success': True, 'runs': len(runs)})
+
+    flask_app.runs = runs
+    return flask_app
+
+
+def test_identical_requests_share_one_response(app):
+    def post(body):
+        with app.test_client() as c:
+            return c.post('/api/slow', json=body).get_json()
+
+    outcomes = _concurrently(5, lambda: post({'tickers': ['A', 'B'], 'window': 60}))
+    assert len(app.runs) == 1
+    assert all(o == ('ok', {'success': True, 'runs': 1}) for o in outcomes)
+    # Key order in the body does not matter; different bodies run separately
+    outcomes = _concurrently(4, lambda: post({'window': 60, 'tickers': ['A', 'B']}))
+    assert len(app.runs) == 2
+    post({'tickers': ['A'], 'window': 60})
+    assert len(app.runs) == 3
+
+
+def test_followers_report_the_leaders_stages(app):
+    def post():
+        with app.test_client() as c:
+            return c.post('/api/slow', json={'tickers': ['T']}).headers['Server-Timing']
+
+    headers = [o[1] for o in _concurrently(4, post)]
+    assert len(app.runs) == 1
+    assert all('compute;dur=' in h for h in headers)
+    assert sum('singleflight_wait' in h for h in headers) == 3
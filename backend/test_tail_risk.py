@@ -0,0 +1,92 @@
+"""
+Rolling historical VaR/ES from the block prefix/suffix K-smallest lists
+against sorting every window (gaps, min_periods, column chunks), plus the
+per-symbol summary and level validation.
+"""
+import math
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from services import tail_risk
+
+
+def naive(returns, window, level, min_periods):
+    T, N = returns.shape
+    var = np.full((T, N), np.nan)
+    es = np.full((T, N), np.nan)
+    for t in range(T):
+        for c in range(N):
+            x = returns[max(0, t - window + 1):t + 1, c]
+            x = np.sort(x[~np.isnan(x)])
+            if len(x) < min_periods or len(x) == 0:
+                continue
+            k = max(1, math.ceil(round(len(x) * (1 - level), 9)))
+            var[t, c] = -x[k - 1]
+            es[t, c] = -x[:k].mean()
+    return var, es
+
+
+@pytest.fixture(scope='module')
+def returns():
+    rng = np.random.default_rng(7)
+    x = rng.standard_t(4, size=(300, 5)) * 0.01
+    x[rng.random(x.shape) < 0.1] = np.nan
+    x[:40, 2] = np.nan
+    return x
+
+
+@pytest.mark.parametrize('window,min_periods', [(60, None), (37, 20), (250, 100)])
+def test_matches_sorting_every_window(returns, window, min_periods):
+    levels = [0.9, 0.95, 0.99]
+    result = tail_risk.rolling_var_es(returns, window, levels, min_periods)
+    for j, level in enumerate(levels):
+        var, es = naive(returns, window, level, window if min_periods is None else min_periods)
+        np.testing.assert_allclose(result['var'][j], var, rtol=1e-12, equal_nan=True)
+        np.testing.assert_allclose(result['es'][j], es, rtol=1e-12, equal_nan=True)
+
+
+def test_column_chunks_do_not_change_results(returns, monkeypatch):
+    full = tail_risk.rolling_var_es(returns, 60, [0.95], 30)
+    monkeypatch.setenv('TAIL_RISK_CHUNK_MB', '0.01')
+    chunked = tail_risk.rolling_var_es(returns, 60, [0.95], 30)
+    np.testing.assert_array_equal(chunked['var'], full['var'])
+    np.testing.assert_array_equal(chunked['es'], full['es'])
+
+
+def test_tail_risk_frames_latest_and_breach_rates(synthetic_prices):
+    prices = synthetic_prices(6, 1500, ragged=0.3)
+    result = tail_risk.tail_risk(prices, window=250)
+    assert result['levels'] == ['0.95', '0.99']
+    var95 = result['frames']['var']['0.95']
+    assert var95.shape == (len(prices.index) - 1, 6)
+    for symbol, latest in result['latest'].items():
+        if latest is None:
+            continue
+        assert latest['es']['0.95'] >= latest['var']['0.95'] > 0
+        assert latest['var']['0.99'] >= latest['var']['0.95']
+        assert 0.0 <= latest['breach_rate']['0.95'] < 0.15
+
+
+@pytest.mark.parametrize('levels', [[], [0.5], [1.0], 'x'])
+def test_parse_levels_rejects(levels):
+    with pytest.raises(ValueError):
+        tail_risk.parse_levels(levels)
+
+
+def test_window_longer_than_the_data_is_clamped(returns, monkeypatch):
+    T = len(returns)
+    expected = tail_risk.rolling_var_es(returns, T, [0.8, 0.95], 30)
+    monkeypatch.setenv('TAIL_RISK_CHUNK_MB', '2')
+    peaks = []
+    for window in (T, 8 * T, 80 * T):
+        tracemalloc.start()
+        result = tail_risk.rolling_var_es(returns, window, [0.8, 0.95], 30)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        np.testing.assert_array_equal(result['var'], expected['var'])
+        np.testing.assert_array_equal(result['es'], expected['es'])
+    # Working memory follows the data, not the requested window
+    assert max(peaks) < 1.2 * peaks[0]
+    assert max(peaks) < 4e6
@@ -0,0 +1,64 @@
+"""
+Headline reduction before FinBERT: relevance by entity, exact and MinHash/LSH
+near-duplicate grouping, and the polarity guard that keeps look-alike
+headlines with opposite meaning apart.
+"""
+import pytest
+
+from services import news, text_filter
+
+
+@pytest.fixture(autouse=True)
+def threshold(monkeypatch):
+    monkeypatch.setenv('TEXT_DEDUP_THRESHOLD', '0.7')
+
+
+def test_exact_duplicates_after_normalization():
+    texts = ['Infosys shares rise 3% - Reuters', 'INFOSYS shares rise 3%', 'infosys shares rise 3% | Mint']
+    representatives, mapping = text_filter.reduce_texts(texts)
+    assert representatives == texts[:1]
+    assert mapping == [0, 0, 0]
+
+
+def test_near_duplicates_share_a_representative():
+    texts = [
+        'Reliance Industries to invest Rs 75,000 crore in new energy projects over three years',
+        'Tata Motors unveils electric SUV lineup ahead of festive season',
+        'Reliance Industries to invest Rs 75,000 crore in new-energy projects over next three years',
+        'Reliance Industries will invest Rs 75,000 crore in new energy projects over three years',
+    ]
+    representatives, mapping = text_filter.reduce_texts(texts)
+    assert representatives == texts[:2]
+    assert mapping == [0, 1, 0, 0]
+
+
+def test_polarity_guard_keeps_opposite_headlines_apart():
+    texts = ['HDFC Bank quarterly net profit beats street estimates on strong loan growth in the quarter',
+             'HDFC Bank quarterly net profit misses street estimates on strong loan growth in the quarter']
+    # Similar enough to be grouped on text alone
+    signatures = [text_filter.minhash(text_filter.shingles(t)) for t in texts]
+    assert (signatures[0] == signatures[1]).mean() >= 0.7
+    representatives, mapping = text_filter.reduce_texts(texts)
+    assert representatives == texts
+    assert mapping == [0, 1]
+
+
+def test_threshold_one_keeps_only_exact_duplicates(monkeypatch):
+    monkeypatch.setenv('TEXT_DEDUP_THRESHOLD', '1.0')
+    texts = ['Wipro wins large deal from European bank', 'Wipro wins a large deal from European bank',
+             'Wipro wins large deal from European bank']
+    assert text_filter.reduce_texts(texts) == (texts[:2], [0, 1, 0])
+
+
+def test_relevant_articles_match_name_short_name_or_symbol(monkeypatch):
+    monkeypatch.setenv('NEWS_RELEVANCE_FILTER', '1')
+    text_filter.entity_pattern.cache_clear()
+    monkeypatch.setitem(news.TICKER_QUERY_MAP, 'ZZTEST.NS', '"Zeta Widgets Limited"')
+    articles = [{'title': 'Zeta Widgets Limited posts record quarter'},
+                {'title': 'Zeta Widgets shares jump'},
+                {'title': 'Sector wrap', 'snippet': 'ZZTEST gained 2%'},
+                {'title': 'Zeta Global partners with a bank'},
+                {'title': 'Markets close flat'}]
+    kept = text_filter.relevant_articles(articles, 'ZZTEST.NS')
+    text_filter.entity_pattern.cache_clear()
+    assert kept == articles[:3]
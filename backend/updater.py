@@ -0,0 +1,27 @@
+"""
+Dedicated data updater process.
+
+Runs the upstream refresh jobs (quotes, indices, price panel) and publishes
+snapshots to cache/ without serving HTTP. Start web workers with
+UPDATER_MODE=follower so none of them fetch anything themselves:
+
+    python updater.py
+    UPDATER_MODE=follower gunicorn -c gunicorn.conf.py app:app
+"""
+import os
+import time
+
+os.environ['UPDATER_MODE'] = 'leader'
+# The updater serves no sentiment requests; FinBERT is only loaded if the article ingester needs it
+os.environ.setdefault('SENTIMENT_PRELOAD', 'off')
+
+import app  # noqa: E402  (importing the app starts the leader's scheduler)
+
+
+if __name__ == '__main__':
+    print("[INFO] Data updater running; press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        app.scheduler.shutdown(wait=False)
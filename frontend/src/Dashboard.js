@@ -368,6 +368,16 @@ const Dashboard = () => {
         console.warn('Volatility predict failed', e);
       }
 
+      // Rolling historical VaR/ES per ticker (non-fatal)
+      let tailRisk = null;
+      try {
+        const tailRes = await fetch(`${API_URL}/tail_risk`, body({ tickers: tickersList, start, end }));
+        const tailJson = await tailRes.json();
+        if (tailJson.success) tailRisk = tailJson;
+      } catch (e) {
+        console.warn('Tail risk failed', e);
+      }
+
       // Optionally trigger training (async) - commented out by default
       // await fetch(`${API_URL}/train-volatility`, body({ tickers: tickersList, start, end, label_pct: 0.75 }));
 
@@ -395,6 +405,7 @@ const Dashboard = () => {
         predictions: predictions.predictions
       };
       if (volResult) result.volatility = volResult;
+      if (tailRisk) result.tail_risk = tailRisk;
       setAnalysis(result);
     } catch (err) {
       console.error('Analysis error', err);
@@ -712,7 +723,7 @@ const Dashboard = () => {
 
                 {/* Volatility */}
                 <div className="mt-4">
-                  <VolatilityPanel volatility={analysis.volatility} modelInfo={analysis.model_info} />
+                  <VolatilityPanel volatility={analysis.volatility} tailRisk={analysis.tail_risk} apiUrl={API_URL} modelInfo={analysis.model_info} />
                 </div>
 
                 {/* Hybrid ARIMA + GARCH Forecast */}
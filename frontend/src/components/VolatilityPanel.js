@@ -1,43 +1,145 @@
-import React from 'react';
+import React, { useState } from 'react';
+import Sparkline from './Sparkline';
 
-const VolatilityPanel = ({ volatility }) => {
-  if (!volatility) return null;
+const pct = (v) => (v === null || v === undefined ? '—' : `${(v * 100).toFixed(2)}%`);
 
-  const probs = volatility.probabilities || [];
-  const features = volatility.features ? Object.values(volatility.features)[0] : {};
+// Rolling historical VaR/ES (from /api/tail_risk) for the analyzed tickers, with a whole-universe view on demand
+const TailRisk = ({ tailRisk, apiUrl }) => {
+  const [universe, setUniverse] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState('');
+  const level = (tailRisk.levels || ['0.95'])[0];
+  const other = (tailRisk.levels || [])[1];
+
+  const loadUniverse = async () => {
+    setLoading(true);
+    setError('');
+    try {
+      const res = await fetch(`${apiUrl}/tail_risk`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ universe: true, latest: true, window: tailRisk.window }),
+      });
+      const json = await res.json();
+      if (!json.success) throw new Error(json.message || 'Tail risk failed');
+      const rows = Object.entries(json.latest || {})
+        .filter(([, v]) => v)
+        .sort(([, a], [, b]) => b.var[level] - a.var[level]);
+      setUniverse(rows);
+    } catch (e) {
+      setError(e.message || 'Error');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const row = (symbol, latest, series) => (
+    <tr key={symbol} className="border-t">
+      <td className="py-1 pr-2 font-medium">{symbol}</td>
+      <td className="py-1 pr-2">{pct(latest.var[level])}</td>
+      <td className="py-1 pr-2">{pct(latest.es[level])}</td>
+      {other && <td className="py-1 pr-2">{pct(latest.var[other])}</td>}
+      {other && <td className="py-1 pr-2">{pct(latest.es[other])}</td>}
+      <td className="py-1 pr-2 text-gray-500">{pct(latest.breach_rate[level])}</td>
+      {series !== undefined && <td className="py-1">{series && series.length > 1 && <Sparkline data={series} stroke="#dc2626" />}</td>}
+    </tr>
+  );
+
+  const header = (withTrend) => (
+    <thead>
+      <tr className="text-xs text-gray-500 text-left">
+        <th className="pr-2">Symbol</th>
+        <th className="pr-2">VaR {level}</th>
+        <th className="pr-2">ES {level}</th>
+        {other && <th className="pr-2">VaR {other}</th>}
+        {other && <th className="pr-2">ES {other}</th>}
+        <th className="pr-2">Breaches</th>
+        {withTrend && <th>VaR {level} trend</th>}
+      </tr>
+    </thead>
+  );
+
+  return (
+    <div className="mt-4">
+      <div className="flex items-center justify-between">
+        <h4 className="text-md font-semibold">Tail risk (historical, {tailRisk.window}d, 1-day loss)</h4>
+        <button
+          className="text-sm px-3 py-1 rounded bg-gray-100 hover:bg-gray-200 disabled:opacity-50"
+          onClick={loadUniverse}
+          disabled={loading}
+        >
+          {loading ? 'Loading…' : 'Whole universe'}
+        </button>
+      </div>
+      <table className="w-full mt-2 text-sm">
+        {header(true)}
+        <tbody>
+          {Object.entries(tailRisk.latest || {})
+            .filter(([, v]) => v)
+            .map(([symbol, latest]) => {
+              const series = ((tailRisk.var || {})[level] || {})[symbol] || [];
+              return row(symbol, latest, series.filter((v) => v !== null).slice(-250));
+            })}
+        </tbody>
+      </table>
+      {error && <div className="text-sm text-red-600 mt-2">{error}</div>}
+      {universe && (
+        <div className="mt-3 max-h-80 overflow-y-auto">
+          <div className="text-sm text-gray-600">Universe, riskiest first ({universe.length} symbols)</div>
+          <table className="w-full mt-1 text-sm">
+            {header(false)}
+            <tbody>{universe.map(([symbol, latest]) => row(symbol, latest))}</tbody>
+          </table>
+        </div>
+      )}
+    </div>
+  );
+};
+
+const VolatilityPanel = ({ volatility, tailRisk, apiUrl }) => {
+  if (!volatility && !tailRisk) return null;
+
+  const probs = (volatility && volatility.probabilities) || [];
+  const features = volatility && volatility.features ? Object.values(volatility.features)[0] : {};
   return (
     <div className="bg-white rounded-2xl p-6 shadow-sm">
       <h3 className="text-lg font-semibold mb-3">Volatility (snapshot)</h3>
-      <div className="mb-3">
-        <div className="text-sm text-gray-600">Predicted regime</div>
-        <div className="text-2xl font-bold">{volatility.predicted_label === 1 ? 'High Volatility' : 'Low/Normal'}</div>
-      </div>
-      {/* Model metadata removed with RandomForest; keep features & probabilities if present */}
-      <div className="mb-3">
-        <div className="text-sm text-gray-600">Probabilities</div>
-        <div className="flex gap-3 mt-2">
-          <div className="p-3 bg-gray-100 rounded">
-            <div className="text-xs text-gray-500">Low</div>
-            <div className="font-semibold">{(probs[0] * 100 || 0).toFixed(1)}%</div>
+      {volatility && (
+        <>
+          <div className="mb-3">
+            <div className="text-sm text-gray-600">Predicted regime</div>
+            <div className="text-2xl font-bold">{volatility.predicted_label === 1 ? 'High Volatility' : 'Low/Normal'}</div>
           </div>
-          <div className="p-3 bg-gray-100 rounded">
-            <div className="text-xs text-gray-500">High</div>
-            <div className="font-semibold">{(probs[1] * 100 || 0).toFixed(1)}%</div>
+          {/* Model metadata removed with RandomForest; keep features & probabilities if present */}
+          <div className="mb-3">
+            <div className="text-sm text-gray-600">Probabilities</div>
+            <div className="flex gap-3 mt-2">
+              <div className="p-3 bg-gray-100 rounded">
+                <div className="text-xs text-gray-500">Low</div>
+                <div className="font-semibold">{(probs[0] * 100 || 0).toFixed(1)}%</div>
+              </div>
+              <div className="p-3 bg-gray-100 rounded">
+                <div className="text-xs text-gray-500">High</div>
+                <div className="font-semibold">{(probs[1] * 100 || 0).toFixed(1)}%</div>
+              </div>
+            </div>
           </div>
-        </div>
-      </div>
 
-      <div>
-        <div className="text-sm text-gray-600">Feature snapshot (latest)</div>
-        <div className="mt-2 grid grid-cols-2 gap-2 text-sm text-gray-700">
-          {Object.entries(features || {}).map(([k, v]) => (
-            <div key={k} className="p-2 bg-gray-50 rounded">
-              <div className="text-xs text-gray-500">{k}</div>
-              <div className="font-medium">{Number(v).toFixed(4)}</div>
+          <div>
+            <div className="text-sm text-gray-600">Feature snapshot (latest)</div>
+            <div className="mt-2 grid grid-cols-2 gap-2 text-sm text-gray-700">
+              {Object.entries(features || {}).map(([k, v]) => (
+                <div key={k} className="p-2 bg-gray-50 rounded">
+                  <div className="text-xs text-gray-500">{k}</div>
+                  <div className="font-medium">{Number(v).toFixed(4)}</div>
+                </div>
+              ))}
             </div>
-          ))}
-        </div>
-      </div>
+          </div>
+        </>
+      )}
+
+      {tailRisk && <TailRisk tailRisk={tailRisk} apiUrl={apiUrl} />}
     </div>
   );
 };